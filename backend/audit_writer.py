@@ -0,0 +1,196 @@
+"""
+Buffered audit log writer.
+
+With AUDIT_ASYNC_WRITES enabled, log_activity() only enqueues the record and a
+background thread inserts queued records in batches with fast_executemany,
+flushing when a batch fills up or AUDIT_FLUSH_INTERVAL seconds after its first
+record. The queue is bounded: when it is full, callers wait up to
+AUDIT_ENQUEUE_TIMEOUT seconds for room and the record is dropped (and counted)
+after that, so a slow database cannot stall request handling.
+
+While a client follows GET /api/logs/stream, a batch is inserted with a single
+set-based statement that returns the new rows, and they are published to the
+log stream once the batch commits.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from database import get_db_connection
+from log_stream import log_stream, LOG_OUTPUT
+
+AUDIT_ASYNC_WRITES = os.getenv("AUDIT_ASYNC_WRITES", "false").lower() == "true"
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_ENQUEUE_TIMEOUT = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT", "0.05"))
+
+AUDIT_INSERT_SQL = """
+    INSERT INTO audit2_logs (
+        user_id, username, action, resource, details, severity, module,
+        before_data, after_data, status
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# AUDIT_INSERT_SQL returning the inserted row for the log stream
+AUDIT_INSERT_RETURNING_SQL = f"""
+    INSERT INTO audit2_logs (
+        user_id, username, action, resource, details, severity, module,
+        before_data, after_data, status
+    )
+    {LOG_OUTPUT}
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# A whole batch of AUDIT_INSERT_SQL rows, as a JSON array of arrays
+AUDIT_INSERT_BATCH_RETURNING_SQL = f"""
+    INSERT INTO audit2_logs (
+        user_id, username, action, resource, details, severity, module,
+        before_data, after_data, status
+    )
+    {LOG_OUTPUT}
+    SELECT user_id, username, action, resource, details, severity, module,
+           before_data, after_data, status
+    FROM OPENJSON(?) WITH (
+        user_id INT '$[0]', username NVARCHAR(50) '$[1]', action NVARCHAR(100) '$[2]',
+        resource NVARCHAR(100) '$[3]', details NVARCHAR(MAX) '$[4]', severity NVARCHAR(20) '$[5]',
+        module NVARCHAR(50) '$[6]', before_data NVARCHAR(MAX) '$[7]', after_data NVARCHAR(MAX) '$[8]',
+        status NVARCHAR(20) '$[9]'
+    )
+"""
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Bounded queue of audit rows drained by a single background thread"""
+
+    def __init__(
+        self,
+        enabled: bool = AUDIT_ASYNC_WRITES,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+        enqueue_timeout: float = AUDIT_ENQUEUE_TIMEOUT
+    ):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._queued = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the background thread"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def enqueue(self, record: tuple) -> bool:
+        """Queue one row of AUDIT_INSERT_SQL parameters; False if it was dropped"""
+        try:
+            self._queue.put(record, timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._queued += 1
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            self._flush(batch)
+
+        # Drain whatever was queued behind the stop marker
+        leftover = []
+        while True:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not _STOP:
+                leftover.append(record)
+        for start in range(0, len(leftover), self.batch_size):
+            self._flush(leftover[start:start + self.batch_size])
+
+    def _flush(self, batch: list):
+        try:
+            inserted = None
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                if log_stream.listening:
+                    cursor.execute(AUDIT_INSERT_BATCH_RETURNING_SQL, json.dumps(batch))
+                    inserted = cursor.fetchall()
+                else:
+                    cursor.fast_executemany = True
+                    cursor.executemany(AUDIT_INSERT_SQL, batch)
+                conn.commit()
+            if inserted:
+                log_stream.publish(inserted)
+            with self._lock:
+                self._flushed += len(batch)
+                self._batches += 1
+        except Exception as e:
+            with self._lock:
+                self._failed += len(batch)
+            print(f"Audit writer failed to flush {len(batch)} records: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "running": self.running,
+                "pending": self._queue.qsize(),
+                "queued": self._queued,
+                "flushed": self._flushed,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "batches": self._batches,
+            }
+
+
+audit_writer = AuditWriter()
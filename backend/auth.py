@@ -1,12 +1,18 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 from dotenv import load_dotenv
+import logging
 import secrets
+import threading
+import time
 
 load_dotenv()
 
@@ -18,8 +24,24 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7
 MAX_FAILED_ATTEMPTS = 5
 LOCKOUT_DURATION_MINUTES = 15
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified tokens remembered so repeat requests skip signature checks (0 disables)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+logger = logging.getLogger(__name__)
+
+# Password hashing. Hashes with fewer rounds than BCRYPT_ROUNDS are upgraded on login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool runs hashes in parallel and also
+# caps how many can burn CPU at once (a login burst queues here instead of
+# starving the event loop or the DB executor)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+# Bulk imports hash on their own, smaller pool, so thousands of queued hashes
+# never sit ahead of a login's verify_password_async
+BULK_IMPORT_HASH_WORKERS = int(os.getenv("BULK_IMPORT_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+bulk_hash_executor = ThreadPoolExecutor(max_workers=BULK_IMPORT_HASH_WORKERS, thread_name_prefix="bcrypt-import")
 
 # JWT Bearer token
 security = HTTPBearer()
@@ -32,6 +54,23 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def hash_password_async(password: str, executor: ThreadPoolExecutor = password_executor) -> str:
+    """get_password_hash on the password executor (or `executor`)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, pwd_context.hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the password executor. Returns (valid, new_hash); new_hash
+    is set when the stored hash uses outdated settings and should be replaced.
+    """
+    if not hashed_password:
+        return False, None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -52,31 +91,60 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+class VerifiedTokenCache:
+    """Bounded LRU of decoded token payloads; entries are dropped once `exp` passes"""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            payload = self._entries.get(token)
+            if payload is None:
+                return None
+            if payload.get("exp", 0) <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return payload
+
+    def put(self, token: str, payload: dict):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[token] = payload
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache()
+
 def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
     """Verify and decode a JWT token"""
-    try:
-        print(f"DEBUG: Verifying token with SECRET_KEY: {SECRET_KEY[:10]}...")
-        print(f"DEBUG: Using algorithm: {ALGORITHM}")
-        print(f"DEBUG: Expected token type: {token_type}")
-        
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"DEBUG: JWT decode successful")
-        print(f"DEBUG: Payload type: {payload.get('type')}")
-        print(f"DEBUG: Payload sub: {payload.get('sub')}")
-        print(f"DEBUG: Payload username: {payload.get('username')}")
-        
-        if payload.get("type") != token_type:
-            print(f"DEBUG: Token type mismatch - expected {token_type}, got {payload.get('type')}")
+    payload = verified_tokens.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            logger.debug("JWT verification failed: %s", e)
             return None
-        
-        print(f"DEBUG: Token verification successful")
-        return payload
-    except JWTError as e:
-        print(f"DEBUG: JWT Error: {str(e)}")
-        return None
-    except Exception as e:
-        print(f"DEBUG: Unexpected error: {str(e)}")
+        except Exception as e:
+            logger.debug("Unexpected error verifying token: %s", e)
+            return None
+        verified_tokens.put(token, payload)
+    
+    if payload.get("type") != token_type:
+        logger.debug("Token type mismatch - expected %s, got %s", token_type, payload.get("type"))
         return None
+    
+    return payload
 
 def generate_reset_token() -> str:
     """Generate a secure password reset token"""
@@ -90,42 +158,28 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        print(f"DEBUG: Received credentials: {credentials.credentials[:20]}...")
-        payload = verify_token(credentials.credentials, "access")
-        print(f"DEBUG: verify_token returned: {payload is not None}")
-        
-        if payload is None:
-            print("DEBUG: Payload is None, raising credentials exception")
-            raise credentials_exception
-        
-        user_id_str: str = payload.get("sub")
-        username: str = payload.get("username")
-        print(f"DEBUG: Extracted user_id_str: {user_id_str}, username: {username}")
-        
-        if user_id_str is None or username is None:
-            print("DEBUG: Missing user_id or username, raising credentials exception")
-            raise credentials_exception
-            
-        try:
-            user_id = int(user_id_str)  # Convert string back to integer
-        except (ValueError, TypeError):
-            print("DEBUG: Invalid user_id format, raising credentials exception")
-            raise credentials_exception
-            
-        print("DEBUG: Authentication successful")
-        return {
-            "id": user_id,
-            "sub": user_id_str,  # Keep string version for logging
-            "username": username,
-            "permissions": payload.get("permissions", [])
-        }
-    except JWTError as e:
-        print(f"DEBUG: JWTError in get_current_user: {str(e)}")
+    payload = verify_token(credentials.credentials, "access")
+    if payload is None:
+        raise credentials_exception
+    
+    user_id_str: str = payload.get("sub")
+    username: str = payload.get("username")
+    if user_id_str is None or username is None:
+        logger.debug("Token is missing sub or username")
         raise credentials_exception
-    except Exception as e:
-        print(f"DEBUG: Unexpected error in get_current_user: {str(e)}")
+        
+    try:
+        user_id = int(user_id_str)  # Convert string back to integer
+    except (ValueError, TypeError):
+        logger.debug("Token has a non-integer sub")
         raise credentials_exception
+        
+    return {
+        "id": user_id,
+        "sub": user_id_str,  # Keep string version for logging
+        "username": username,
+        "permissions": payload.get("permissions", [])
+    }
 
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
     """Get the current active user (additional validation can be added here)"""
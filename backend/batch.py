@@ -0,0 +1,118 @@
+"""
+In-process batch requests (POST /api/batch).
+
+Each sub-request is a GET that is dispatched straight to the app's router, so
+it skips the HTTP round trip and the per-request middleware: the sub-requests
+run concurrently inside the batch request's unit of work and share its
+pooled connection (queries take turns on it) and its Authorization header,
+whose token has already been verified and cached by the batch request.
+
+The combined response is assembled from the sub-responses' raw bodies,
+without decoding and re-encoding them.
+"""
+import asyncio
+import os
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+import orjson
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.types import ASGIApp, Message, Scope
+
+from models import BatchItem, BatchRequest
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+
+# Streaming endpoints: a sub-response is buffered whole and never sees a
+# disconnect, so an export would sit in memory and the log stream never ends
+STREAMING_PATHS = ("/api/logs/stream", "/api/logs/export")
+
+# Request headers a sub-request may set itself; everything else comes from the batch
+FORWARDED_HEADERS = ("if-none-match", "accept")
+# Response headers passed back for each sub-request
+RETURNED_HEADERS = ("etag", "cache-control", "content-type")
+
+
+def check_batch(batch: BatchRequest, max_requests: int = BATCH_MAX_REQUESTS):
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Batch has no requests")
+    if len(batch.requests) > max_requests:
+        raise HTTPException(status_code=400, detail=f"Batch has more than {max_requests} requests")
+    for item in batch.requests:
+        path = urlsplit(item.path).path.rstrip("/")
+        if not path.startswith("/api/") or path == "/api/batch" or path in STREAMING_PATHS:
+            raise HTTPException(status_code=400, detail=f"Cannot batch {item.path}")
+
+
+def _error(status_code: int, detail) -> dict:
+    return {"status": status_code, "headers": {}, "body": orjson.dumps({"detail": detail})}
+
+
+async def dispatch(app: ASGIApp, parent: Scope, item: BatchItem) -> dict:
+    """Run one GET sub-request through `app` (the router); its status, headers and raw body"""
+    url = urlsplit(item.path)
+    headers = [
+        (name, value) for name, value in parent["headers"]
+        if name not in (b"content-type", b"content-length", b"accept-encoding")
+        and name.decode("latin-1") not in FORWARDED_HEADERS
+    ]
+    headers += [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in item.headers.items() if name.lower() in FORWARDED_HEADERS
+    ]
+    scope = {
+        **{key: parent[key] for key in ("app", "http_version", "scheme", "server", "client", "root_path") if key in parent},
+        "type": "http",
+        "method": "GET",
+        "path": url.path,
+        "raw_path": url.path.encode("latin-1"),
+        "query_string": url.query.encode("latin-1"),
+        "headers": headers,
+    }
+
+    async def receive() -> Message:
+        # No body; then stay "connected" until the sub-response is complete
+        await asyncio.Event().wait()
+
+    start: Optional[Message] = None
+    body = bytearray()
+
+    async def send(message: Message):
+        nonlocal start
+        if message["type"] == "http.response.start":
+            start = message
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except StarletteHTTPException as e:
+        # Raised by the endpoints and by the router itself (404, 405)
+        return _error(e.status_code, e.detail)
+    except RequestValidationError as e:
+        return _error(422, e.errors())
+    except Exception as e:
+        return _error(500, f"Internal error: {str(e)}")
+
+    response_headers = {}
+    for name, value in start["headers"]:
+        name = name.decode("latin-1")
+        if name in RETURNED_HEADERS:
+            response_headers[name] = value.decode("latin-1")
+    return {"status": start["status"], "headers": response_headers, "body": bytes(body)}
+
+
+def encode_results(results: List[dict]) -> bytes:
+    """{"responses": [...]} with JSON bodies embedded as they are and anything else as a string"""
+    parts = []
+    for result in results:
+        body = result["body"]
+        if not body:
+            body = b"null"
+        elif not result["headers"].get("content-type", "application/json").startswith("application/json"):
+            body = orjson.dumps(body.decode("utf-8", errors="replace"))
+        meta = orjson.dumps({"status": result["status"], "headers": result["headers"]})
+        parts.append(meta[:-1] + b',"body":' + body + b"}")
+    return b'{"responses":[' + b",".join(parts) + b"]}"
@@ -0,0 +1,163 @@
+"""
+Parsing and validation for bulk user imports (POST /api/users/bulk).
+
+The upload is the raw request body, CSV with a header row or NDJSON (one JSON
+object per line), with the fields of POST /api/users: username, email,
+full_name, password, and optionally is_active and role_ids (in CSV, role ids
+separated by ';'). It is read as it streams in, up to BULK_IMPORT_MAX_BYTES,
+and every row is validated and checked for duplicates within the file before
+the database is involved. What is left is inserted set-based in
+BULK_IMPORT_CHUNK_SIZE batches.
+"""
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from models import BulkImportRowResult, UserCreateWithPassword
+
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "10000"))
+BULK_IMPORT_MAX_BYTES = int(os.getenv("BULK_IMPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+MEDIA_TYPES = {
+    "text/csv": FORMAT_CSV,
+    "application/csv": FORMAT_CSV,
+    "application/x-ndjson": FORMAT_NDJSON,
+    "application/ndjson": FORMAT_NDJSON,
+    "application/jsonl": FORMAT_NDJSON,
+}
+
+# Column sizes of the users table; longer values would fail the whole chunk
+MAX_LENGTHS = {"username": 50, "email": 100, "full_name": 100}
+
+CREATED = "created"
+INVALID = "invalid"
+DUPLICATE = "duplicate"
+EXISTS = "exists"
+
+
+class ImportRow(NamedTuple):
+    row: int
+    user: UserCreateWithPassword
+
+
+def upload_format(content_type: Optional[str], requested: Optional[str] = None) -> str:
+    """The upload format, from the `format` query parameter or the Content-Type"""
+    if requested:
+        if requested not in (FORMAT_CSV, FORMAT_NDJSON):
+            raise HTTPException(status_code=400, detail=f"Unsupported import format: {requested}")
+        return requested
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type not in MEDIA_TYPES:
+        raise HTTPException(status_code=415, detail="Upload CSV (text/csv) or NDJSON (application/x-ndjson)")
+    return MEDIA_TYPES[media_type]
+
+
+async def read_upload(chunks: AsyncIterator[bytes], max_bytes: int = BULK_IMPORT_MAX_BYTES) -> str:
+    """The request body, refused as soon as it grows past max_bytes"""
+    body = bytearray()
+    async for chunk in chunks:
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Import is larger than {max_bytes} bytes")
+    try:
+        return body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Import must be UTF-8 encoded")
+
+
+def _csv_records(text: str):
+    reader = csv.DictReader(io.StringIO(text))
+    for record in reader:
+        if None in record:
+            yield reader.line_num, ValueError("more values than header columns")
+            continue
+        record = {key.strip(): value.strip() for key, value in record.items() if key and value is not None}
+        if record.get("role_ids") is not None:
+            record["role_ids"] = [part.strip() for part in record["role_ids"].split(";") if part.strip()]
+        if record.get("is_active") == "":
+            del record["is_active"]
+        yield reader.line_num, record
+
+
+def _ndjson_records(text: str):
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"invalid JSON: {e}")
+            continue
+        yield line_number, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+
+def _error_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+    )
+
+
+def parse_upload(text: str, upload: str, known_role_ids,
+                 max_rows: int = BULK_IMPORT_MAX_ROWS) -> Tuple[List[ImportRow], List[BulkImportRowResult]]:
+    """
+    Validate every row of the upload. Returns the rows to import and the
+    results of the rows rejected already: invalid ones, unknown role ids and
+    usernames or emails repeated within the file (the first one is kept).
+    Rows are numbered by their line in the file.
+    """
+    records = _csv_records(text) if upload == FORMAT_CSV else _ndjson_records(text)
+    rows: List[ImportRow] = []
+    rejected: List[BulkImportRowResult] = []
+    seen_usernames: Dict[str, int] = {}
+    seen_emails: Dict[str, int] = {}
+
+    for count, (row, record) in enumerate(records, 1):
+        if count > max_rows:
+            raise HTTPException(status_code=413, detail=f"Import has more than {max_rows} rows")
+        if isinstance(record, Exception):
+            rejected.append(BulkImportRowResult(row=row, status=INVALID, error=str(record)))
+            continue
+        try:
+            user = UserCreateWithPassword(**record)
+        except ValidationError as e:
+            username = record.get("username")
+            rejected.append(BulkImportRowResult(
+                row=row, username=username if isinstance(username, str) else None,
+                status=INVALID, error=_error_message(e)
+            ))
+            continue
+
+        too_long = [field for field, length in MAX_LENGTHS.items() if len(getattr(user, field)) > length]
+        if too_long:
+            rejected.append(BulkImportRowResult(
+                row=row, username=user.username, status=INVALID, error=f"too long: {', '.join(too_long)}"
+            ))
+            continue
+
+        unknown = [role_id for role_id in user.role_ids or [] if role_id not in known_role_ids]
+        if unknown:
+            rejected.append(BulkImportRowResult(
+                row=row, username=user.username, status=INVALID, error=f"unknown role ids: {unknown}"
+            ))
+            continue
+
+        # Matched case-insensitively, like the database collation does
+        username_key, email_key = user.username.casefold(), user.email.casefold()
+        first = seen_usernames.get(username_key) or seen_emails.get(email_key)
+        if first is not None:
+            rejected.append(BulkImportRowResult(
+                row=row, username=user.username, status=DUPLICATE, error=f"username or email repeats row {first}"
+            ))
+            continue
+        seen_usernames[username_key] = row
+        seen_emails[email_key] = row
+        rows.append(ImportRow(row, user))
+    return rows, rejected
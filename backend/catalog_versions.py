@@ -0,0 +1,128 @@
+"""
+Change versions and ETags for the RBAC catalogs.
+
+catalog_versions (migration 0008) holds a counter per catalog: "roles" (roles
+and their permission assignments), "permissions" and "user_roles". Every
+endpoint that changes one of them calls bump() in the same transaction, so a
+version only moves when the change commits.
+
+The catalog GET endpoints are wrapped in conditional_get(): their strong ETag
+is made of the versions of the catalogs they read, and a request whose
+If-None-Match still matches gets a 304 before the endpoint runs, with no SQL
+and no serialization. The versions are cached in memory; this worker's own
+writes refresh them once committed, and CATALOG_VERSION_TTL bounds how long a
+change made by another worker can go unnoticed.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from database import get_db_connection, run_db, DatabaseTimeoutError
+
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", "5"))
+
+ROLES = "roles"
+PERMISSIONS = "permissions"
+USER_ROLES = "user_roles"
+CATALOGS = (ROLES, PERMISSIONS, USER_ROLES)
+
+
+def bump(cursor, *names: str):
+    """Move the versions of `names` on, inside the caller's transaction"""
+    placeholders = ", ".join("?" for _ in names)
+    cursor.execute(
+        f"UPDATE catalog_versions SET version = version + 1, updated_at = GETDATE() WHERE name IN ({placeholders})",
+        *names
+    )
+
+
+def if_none_match(header: Optional[str]) -> set:
+    """The entity tags listed in an If-None-Match header"""
+    if not header:
+        return set()
+    return {tag.strip() for tag in header.split(",") if tag.strip()}
+
+
+class CatalogVersions:
+    def __init__(self, ttl: float = CATALOG_VERSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self.loads = 0
+
+    @property
+    def fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self):
+        """Reload the versions (blocking; run on the DB executor)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name, version FROM catalog_versions")
+            versions = {row[0]: row[1] for row in cursor.fetchall()}
+        with self._lock:
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def invalidate(self):
+        """Reload on next use; called once a bump has committed"""
+        with self._lock:
+            self._loaded_at = None
+
+    def etag(self, *names: str) -> str:
+        """Strong ETag for a response built from the catalogs in `names`"""
+        if not self.fresh:
+            self.load()
+        versions = self._versions
+        return '"' + ".".join(f"{name}-{versions.get(name, 0)}" for name in names) + '"'
+
+
+catalog_versions = CatalogVersions()
+
+
+def conditional_get(*names: str):
+    """
+    Decorator for a catalog GET endpoint (applied over offload_db): adds the
+    ETag of `names` to its responses and answers a matching If-None-Match with
+    304. Called directly, without a request, it just runs the endpoint.
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, request: Optional[Request] = None, response: Optional[Response] = None, **kwargs):
+            if request is None:
+                return await endpoint(*args, **kwargs)
+
+            # Read before the data, so a concurrent change can only make the tag older than the body
+            if catalog_versions.fresh:
+                etag = catalog_versions.etag(*names)
+            else:
+                try:
+                    etag = await run_db(catalog_versions.etag, *names)
+                except DatabaseTimeoutError as e:
+                    raise HTTPException(status_code=504, detail=str(e))
+
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            tags = if_none_match(request.headers.get("if-none-match"))
+            if etag in tags or "*" in tags:
+                return Response(status_code=304, headers=headers)
+
+            response.headers.update(headers)
+            return await endpoint(*args, **kwargs)
+
+        # FastAPI reads the parameters from the signature: keep the endpoint's
+        # and ask for the request and the response object as well
+        signature = inspect.signature(endpoint)
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter("response", inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        ])
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+"""
+Response compression.
+
+CompressionMiddleware gzip- or deflate-encodes responses of at least
+COMPRESSION_MIN_SIZE bytes for clients that accept it, streaming responses
+included (each chunk is compressed as it is sent). Responses that already
+carry a Content-Encoding, are compressed formats themselves (gzip exports) or
+are event streams, where compression would hold events back, pass through
+untouched.
+"""
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+
+# zlib window bits per content coding: gzip framing, or the zlib format HTTP calls deflate
+ENCODINGS = {"gzip": 31, "deflate": 15}
+
+EXCLUDED_MEDIA_TYPES = ("application/gzip", "application/zip", "text/event-stream", "image/", "video/", "audio/")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """The coding to use for an Accept-Encoding header, preferring gzip; None for identity"""
+    accepted = set()
+    for item in (accept_encoding or "").lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    for coding in ENCODINGS:
+        if coding in accepted or "*" in accepted:
+            return coding
+    return None
+
+
+def compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return not media_type.startswith(EXCLUDED_MEDIA_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE, level: int = COMPRESSION_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self.app, coding, self.minimum_size, self.level)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app: ASGIApp, coding: str, minimum_size: int, level: int):
+        self.app = app
+        self.coding = coding
+        self.minimum_size = minimum_size
+        self.level = level
+        self.send: Send = None
+        self.start: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk decides whether to compress
+            self.start = message
+            self.passthrough = not compressible(Headers(raw=message["headers"]))
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._flush_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._flush_start()
+                await self.send(message)
+                return
+            self.compressor = zlib.compressobj(self.level, zlib.DEFLATED, ENCODINGS[self.coding])
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers["Content-Encoding"] = self.coding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            data = self.compressor.compress(body)
+            if not more_body:
+                data += self.compressor.flush()
+                headers["Content-Length"] = str(len(data))
+            await self._flush_start()
+        else:
+            data = self.compressor.compress(body)
+            if not more_body:
+                data += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _flush_start(self):
+        if self.start is not None:
+            await self.send(self.start)
+            self.start = None
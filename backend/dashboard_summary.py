@@ -0,0 +1,116 @@
+"""
+In-memory dashboard summary.
+
+The counters behind /api/dashboard/summary are seeded from the database once,
+then kept current by the write paths (user create/update/delete and audit log
+writes call the hooks below after their transaction commits), so serving the
+summary costs no queries. A background job reconciles them with the database
+every SUMMARY_RECONCILE_INTERVAL seconds to pick up writes from other workers
+and anything the hooks did not see.
+
+Recent logs are kept as hourly buckets, so the 7-day window is accurate to the
+hour between reconciliations.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from database import get_db_connection
+
+SUMMARY_RECONCILE_INTERVAL = float(os.getenv("SUMMARY_RECONCILE_INTERVAL", "60"))
+RECENT_LOG_DAYS = 7
+
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class DashboardSummaryCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_users = 0
+        self.active_users = 0
+        self.total_logs = 0
+        self._hourly_logs: Dict[datetime, int] = {}
+        self.last_reconciled: Optional[datetime] = None
+
+    @property
+    def seeded(self) -> bool:
+        return self.last_reconciled is not None
+
+    def reconcile(self):
+        """Reload every counter from the database (blocking; run on the DB executor)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # The audit table total comes from partition metadata rather than a full scan
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(SUM(CASE WHEN is_active = 1 THEN 1 ELSE 0 END), 0)
+                FROM users;
+
+                SELECT COALESCE(SUM(p.rows), 0)
+                FROM sys.partitions p
+                WHERE p.object_id IN (OBJECT_ID('audit2_logs'), OBJECT_ID('audit2_logs_archive'))
+                  AND p.index_id IN (0, 1);
+
+                SELECT DATEADD(hour, DATEDIFF(hour, 0, timestamp), 0) AS hour, COUNT(*)
+                FROM audit2_logs
+                WHERE timestamp >= DATEADD(hour, -?, DATEADD(hour, DATEDIFF(hour, 0, GETDATE()), 0))
+                GROUP BY DATEADD(hour, DATEDIFF(hour, 0, timestamp), 0);
+            """, RECENT_LOG_DAYS * 24)
+            total_users, active_users = cursor.fetchone()
+            cursor.nextset()
+            total_logs = cursor.fetchone()[0]
+            cursor.nextset()
+            hourly_logs = {row[0]: row[1] for row in cursor.fetchall()}
+
+        with self._lock:
+            self.total_users = total_users
+            self.active_users = active_users
+            self.total_logs = total_logs
+            self._hourly_logs = hourly_logs
+            self.last_reconciled = datetime.now()
+
+    def invalidate(self):
+        """Force a reload on the next read, e.g. after bulk data changes"""
+        with self._lock:
+            self.last_reconciled = None
+
+    # Incremental updates, called once the corresponding write has committed
+
+    def user_created(self, is_active: bool):
+        with self._lock:
+            self.total_users += 1
+            self.active_users += 1 if is_active else 0
+
+    def user_deleted(self, was_active: bool):
+        with self._lock:
+            self.total_users -= 1
+            self.active_users -= 1 if was_active else 0
+
+    def user_activation_changed(self, is_active: bool):
+        with self._lock:
+            self.active_users += 1 if is_active else -1
+
+    def logs_written(self, count: int = 1, at: Optional[datetime] = None):
+        hour = _hour(at or datetime.now())
+        with self._lock:
+            self.total_logs += count
+            self._hourly_logs[hour] = self._hourly_logs.get(hour, 0) + count
+
+    def summary(self) -> dict:
+        cutoff = _hour(datetime.now()) - timedelta(days=RECENT_LOG_DAYS)
+        with self._lock:
+            # Drop buckets that have aged out of the window
+            for hour in [hour for hour in self._hourly_logs if hour < cutoff]:
+                del self._hourly_logs[hour]
+            return {
+                "total_users": self.total_users,
+                "active_users": self.active_users,
+                "total_logs": self.total_logs,
+                "recent_logs": sum(self._hourly_logs.values()),
+                "last_updated": self.last_reconciled,
+            }
+
+
+dashboard_summary = DashboardSummaryCache()
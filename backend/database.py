@@ -1,7 +1,17 @@
 import pyodbc
 import os
+import asyncio
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from contextlib import contextmanager
+from typing import Optional
+from fastapi import HTTPException
 
 load_dotenv()
 
@@ -11,6 +21,19 @@ DATABASE = os.getenv("SQL_DATABASE", "master")
 USERNAME = os.getenv("SQL_USERNAME", "dashboard_user")
 PASSWORD = os.getenv("SQL_PASSWORD", "StrongPassword123!")
 DRIVER = os.getenv("SQL_DRIVER", "ODBC Driver 17 for SQL Server")
+CONNECT_TIMEOUT = int(os.getenv("SQL_CONNECT_TIMEOUT", "30"))
+
+# Connection pool configuration
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "1800"))  # max connection age in seconds, 0 disables
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "30"))  # only ping connections idle this long
+
+# Blocking database work runs on its own executor, sized to the pool by default
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(POOL_MAX_SIZE)))
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "30"))  # seconds per call, 0 disables
 
 # Connection string for SQL Server
 if USERNAME and PASSWORD:
@@ -20,26 +43,444 @@ else:
     # Use Windows Authentication
     CONNECTION_STRING = f"DRIVER={{{DRIVER}}};SERVER={SERVER};DATABASE={DATABASE};Trusted_Connection=yes;TrustServerCertificate=yes;"
 
+# Connections are pooled below, so the ODBC driver manager's own pooling is turned off
+pyodbc.pooling = False
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the borrow timeout"""
+
+class _PoolEntry:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+class ConnectionPool:
+    """Bounded pool of pyodbc connections with health checks and usage statistics"""
+
+    def __init__(
+        self,
+        connection_string: str,
+        min_size: int = POOL_MIN_SIZE,
+        max_size: int = POOL_MAX_SIZE,
+        timeout: float = POOL_TIMEOUT,
+        recycle: float = POOL_RECYCLE,
+        pre_ping: bool = POOL_PRE_PING,
+        ping_interval: float = POOL_PING_INTERVAL
+    ):
+        self.connection_string = connection_string
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        # Set by close(); borrowed connections are then closed instead of pooled
+        self._closed = False
+
+        self._borrows = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+
+    def _connect(self) -> _PoolEntry:
+        conn = pyodbc.connect(self.connection_string, timeout=CONNECT_TIMEOUT)
+        with self._cond:
+            self._created += 1
+        return _PoolEntry(conn)
+
+    def _close(self, entry: _PoolEntry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, entry: _PoolEntry, now: float) -> bool:
+        return self.recycle > 0 and now - entry.created_at >= self.recycle
+
+    def _is_alive(self, entry: _PoolEntry) -> bool:
+        try:
+            cursor = entry.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self, entry: Optional[_PoolEntry]) -> _PoolEntry:
+        """Validate an idle entry (or open a new one) outside the pool lock"""
+        now = time.monotonic()
+        if entry is not None and self._is_expired(entry, now):
+            self._close(entry)
+            entry = None
+            with self._cond:
+                self._recycled += 1
+        elif entry is not None and self.pre_ping and now - entry.last_used >= self.ping_interval:
+            if not self._is_alive(entry):
+                self._close(entry)
+                entry = None
+                with self._cond:
+                    self._discarded += 1
+        if entry is None:
+            entry = self._connect()
+        return entry
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrow a connection, waiting up to `timeout` seconds for one to be free"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    entry = None
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available within {timeout:.1f}s "
+                        f"(pool size {self.max_size})"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+        try:
+            entry = self._checkout(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        wait_time = time.monotonic() - started
+        with self._cond:
+            self._in_use[id(entry.conn)] = entry
+            self._borrows += 1
+            if waited:
+                self._waits += 1
+            self._wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+        return entry.conn
+
+    def release(self, conn, discard: bool = False):
+        """Return a borrowed connection, resetting its session state first"""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+            closed = self._closed
+        if entry is None:
+            return
+
+        if not discard:
+            try:
+                # Drop anything the borrower left uncommitted and restore defaults
+                conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+                conn.timeout = 0
+            except Exception:
+                discard = True
+
+        now = time.monotonic()
+        recycle = not discard and self._is_expired(entry, now)
+        if discard or recycle or closed:
+            self._close(entry)
+
+        with self._cond:
+            if discard:
+                self._discarded += 1
+                self._size -= 1
+            elif recycle:
+                self._recycled += 1
+                self._size -= 1
+            elif closed:
+                self._size -= 1
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+            self._cond.notify()
+
+    def warm(self):
+        """Open connections until the pool holds at least `min_size` of them, reopening a closed pool"""
+        with self._cond:
+            self._closed = False
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def close(self):
+        """Close every idle connection; borrowed ones are closed when released"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for entry in idle:
+            self._close(entry)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "borrows": self._borrows,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._wait_time * 1000 / self._borrows, 3) if self._borrows else 0.0,
+                "max_wait_ms": round(self._max_wait_time * 1000, 3),
+                "created": self._created,
+                "recycled": self._recycled,
+                "discarded": self._discarded
+            }
+
+connection_pool = ConnectionPool(CONNECTION_STRING)
+
+def _is_disconnect(error: Exception) -> bool:
+    """True for ODBC errors that leave the connection unusable (SQLSTATE class 08)"""
+    return (
+        isinstance(error, pyodbc.Error)
+        and bool(error.args)
+        and str(error.args[0]).startswith("08")
+    )
+
+class UnitOfWork:
+    """
+    One connection and transaction shared by everything a request does.
+
+    The connection is borrowed lazily on first use. Handlers keep calling
+    conn.commit() as before, but on the shared connection that only marks the
+    work for commit: the real commit happens once, in finish(), when the request
+    is done. The transaction is committed if the request succeeded or anything
+    asked for a commit (e.g. a failed-login record written just before a 401),
+    and rolled back otherwise.
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.lock = threading.RLock()
+        self.commit_requested = False
+        self.discard = False
+        # Names of caches whose data this transaction has changed (see rbac.changed())
+        self.changed = set()
+        self._after_commit = []
+
+    @property
+    def pending(self) -> bool:
+        """True while there is a connection or callbacks left for finish()"""
+        return self.conn is not None or bool(self._after_commit)
+
+    def connection(self):
+        if self.conn is None:
+            self.conn = connection_pool.acquire()
+        return self.conn
+
+    def after_commit(self, callback):
+        self._after_commit.append(callback)
+
+    def finish(self, success: bool):
+        """Commit or roll back, run after-commit callbacks and return the connection"""
+        # Waits for a handler still running on another thread (e.g. after a timeout)
+        with self.lock:
+            callbacks, self._after_commit = self._after_commit, []
+            if self.conn is None:
+                committed = True
+            else:
+                committed = False
+                try:
+                    if (success or self.commit_requested) and not self.discard:
+                        self.conn.commit()
+                        committed = True
+                    else:
+                        self.conn.rollback()
+                except Exception as e:
+                    self.discard = self.discard or _is_disconnect(e)
+                    raise
+                finally:
+                    connection_pool.release(self.conn, discard=self.discard)
+                    self.conn = None
+
+        if committed:
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"After-commit callback failed: {str(e)}")
+
+
+class _SharedConnection:
+    """The unit of work's connection as handed to handlers; commit() is deferred"""
+
+    def __init__(self, uow: UnitOfWork):
+        self._uow = uow
+
+    def cursor(self):
+        return self._uow.conn.cursor()
+
+    def commit(self):
+        self._uow.commit_requested = True
+
+    def rollback(self):
+        # Discards everything the request has done so far
+        self._uow.conn.rollback()
+        self._uow.commit_requested = False
+
+    def __getattr__(self, name):
+        return getattr(self._uow.conn, name)
+
+
+current_unit_of_work: contextvars.ContextVar[Optional[UnitOfWork]] = contextvars.ContextVar(
+    "current_unit_of_work", default=None
+)
+
+def after_commit(callback):
+    """
+    Run `callback` once the current request's transaction has committed (and not
+    at all if it rolls back). Outside a request it runs immediately, since the
+    caller has already committed on its own connection.
+    """
+    uow = current_unit_of_work.get()
+    if uow is None:
+        callback()
+    else:
+        uow.after_commit(callback)
+
 @contextmanager
-def get_db_connection():
-    """Context manager for database connections"""
-    conn = None
+def get_db_connection(shared: bool = True):
+    """
+    Context manager that borrows a database connection.
+
+    Inside a request this is the request's shared unit-of-work connection;
+    pass shared=False for work that must outlive the request, like a
+    streaming response. Otherwise a connection is borrowed from the pool.
+    """
+    uow = current_unit_of_work.get() if shared else None
+    if uow is not None:
+        with uow.lock:
+            conn = uow.connection()
+            _apply_query_timeout(conn)
+            try:
+                yield _SharedConnection(uow)
+            except Exception as e:
+                uow.discard = uow.discard or _is_disconnect(e)
+                raise e
+        return
+
+    conn = connection_pool.acquire()
+    _apply_query_timeout(conn)
+    discard = False
     try:
-        conn = pyodbc.connect(CONNECTION_STRING, timeout=30)
         yield conn
     except Exception as e:
-        if conn:
-            conn.rollback()
+        discard = _is_disconnect(e)
         raise e
     finally:
-        if conn:
-            conn.close()
+        connection_pool.release(conn, discard=discard)
+
+def _apply_query_timeout(conn):
+    query_timeout = getattr(_call_state, "query_timeout", None)
+    if query_timeout:
+        conn.timeout = int(math.ceil(query_timeout))
 
 def get_db():
-    """Dependency function for FastAPI"""
+    """Dependency function for FastAPI; the request's shared connection"""
     with get_db_connection() as conn:
         yield conn
 
+def get_pool_stats() -> dict:
+    """Current connection pool usage (in-use, idle, wait times, churn)"""
+    return connection_pool.stats()
+
+class DatabaseTimeoutError(Exception):
+    """Raised when a call on the DB executor exceeds its timeout"""
+
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+_call_state = threading.local()
+
+def _run_with_query_timeout(call, timeout):
+    # Connections borrowed by this call pick the timeout up in get_db_connection,
+    # so SQL Server cancels the statement instead of leaving it running
+    _call_state.query_timeout = timeout
+    try:
+        return call()
+    finally:
+        _call_state.query_timeout = None
+
+async def run_db(func, *args, timeout: Optional[float] = DB_QUERY_TIMEOUT, **kwargs):
+    """Run blocking database work on the DB executor and await its result"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    future = loop.run_in_executor(db_executor, _run_with_query_timeout, call, timeout)
+    if not timeout:
+        return await future
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        raise DatabaseTimeoutError(f"Database operation exceeded {timeout:g}s")
+
+def offload_db(timeout: Optional[float] = DB_QUERY_TIMEOUT):
+    """Decorator turning a blocking endpoint into an async one that runs on the DB executor"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await run_db(func, *args, timeout=timeout, **kwargs)
+            except DatabaseTimeoutError as e:
+                raise HTTPException(status_code=504, detail=str(e))
+        return wrapper
+    return decorator
+
+# Unit-of-work commits run on their own threads: finishing never waits for a
+# connection, so a request can always hand its connection back even when every
+# DB executor thread is blocked waiting for one
+commit_executor = ThreadPoolExecutor(max_workers=max(2, DB_EXECUTOR_WORKERS // 4), thread_name_prefix="db-commit")
+
+async def finish_unit_of_work(uow: UnitOfWork, success: bool):
+    if uow.pending:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(commit_executor, uow.finish, success)
+
+async def checkpoint():
+    """
+    Commit the current request's work so far and give its connection back to the
+    pool. Call it before slow non-database work (like password hashing) so the
+    request does not sit on a connection; later queries borrow a fresh one.
+    """
+    uow = current_unit_of_work.get()
+    if uow is not None:
+        await finish_unit_of_work(uow, True)
+
 def test_connection():
     """Test database connection"""
     try:
@@ -51,211 +492,3 @@ def test_connection():
     except Exception as e:
         return {"status": "error", "message": f"Database connection failed: {str(e)}"}
 print(test_connection())
-def create_tables():
-    """Create database tables if they don't exist"""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Create roles table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='roles' AND xtype='U')
-                CREATE TABLE roles (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    name NVARCHAR(50) UNIQUE NOT NULL,
-                    display_name NVARCHAR(100) NOT NULL,
-                    description NVARCHAR(255) NULL,
-                    is_active BIT DEFAULT 1,
-                    created_at DATETIME2 DEFAULT GETDATE(),
-                    updated_at DATETIME2 DEFAULT GETDATE()
-                )
-            """)
-            
-            # Create permissions table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='permissions' AND xtype='U')
-                CREATE TABLE permissions (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    name NVARCHAR(50) UNIQUE NOT NULL,
-                    display_name NVARCHAR(100) NOT NULL,
-                    description NVARCHAR(255) NULL,
-                    resource NVARCHAR(50) NOT NULL,
-                    action NVARCHAR(50) NOT NULL,
-                    created_at DATETIME2 DEFAULT GETDATE()
-                )
-            """)
-            
-            # Create role_permissions junction table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='role_permissions' AND xtype='U')
-                CREATE TABLE role_permissions (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    role_id INT NOT NULL,
-                    permission_id INT NOT NULL,
-                    created_at DATETIME2 DEFAULT GETDATE(),
-                    FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE CASCADE,
-                    FOREIGN KEY (permission_id) REFERENCES permissions(id) ON DELETE CASCADE,
-                    UNIQUE(role_id, permission_id)
-                )
-            """)
-            
-            # Update users table to reference roles
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='users' AND xtype='U')
-                CREATE TABLE users (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    username NVARCHAR(50) UNIQUE NOT NULL,
-                    email NVARCHAR(100) UNIQUE NOT NULL,
-                    full_name NVARCHAR(100) NOT NULL,
-                    role_id INT NULL,
-                    is_active BIT DEFAULT 1,
-                    created_at DATETIME2 DEFAULT GETDATE(),
-                    last_login DATETIME2 NULL,
-                    department NVARCHAR(100) NULL,
-                    position NVARCHAR(100) NULL,
-                    phone NVARCHAR(20) NULL,
-                    FOREIGN KEY (role_id) REFERENCES roles(id)
-                )
-            """)
-            
-            # Check if additional columns exist, if not add them
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'users' AND COLUMN_NAME = 'role_id')
-                BEGIN
-                    ALTER TABLE users ADD role_id INT NULL
-                    ALTER TABLE users ADD CONSTRAINT FK_users_roles 
-                        FOREIGN KEY (role_id) REFERENCES roles(id)
-                END
-            """)
-            
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'users' AND COLUMN_NAME = 'department')
-                BEGIN
-                    ALTER TABLE users ADD department NVARCHAR(100) NULL
-                END
-            """)
-            
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'users' AND COLUMN_NAME = 'position')
-                BEGIN
-                    ALTER TABLE users ADD position NVARCHAR(100) NULL
-                END
-            """)
-            
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'users' AND COLUMN_NAME = 'phone')
-                BEGIN
-                    ALTER TABLE users ADD phone NVARCHAR(20) NULL
-                END
-            """)
-            
-            # Create user_roles junction table for multiple roles per user
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='user_roles' AND xtype='U')
-                CREATE TABLE user_roles (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    user_id INT NOT NULL,
-                    role_id INT NOT NULL,
-                    assigned_at DATETIME2 DEFAULT GETDATE(),
-                    assigned_by INT NULL,
-                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE CASCADE,
-                    FOREIGN KEY (assigned_by) REFERENCES users(id),
-                    UNIQUE(user_id, role_id)
-                )
-            """)
-            
-            # Create enhanced audit logs table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='audit2_logs' AND xtype='U')
-                CREATE TABLE audit2_logs (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    user_id INT NULL,
-                    username NVARCHAR(50) NULL,
-                    action NVARCHAR(100) NOT NULL,
-                    resource NVARCHAR(100) NULL,
-                    details NTEXT NULL,
-                    ip_address NVARCHAR(45) NULL,
-                    user_agent NVARCHAR(500) NULL,
-                    timestamp DATETIME2 DEFAULT GETDATE(),
-                    status NVARCHAR(20) DEFAULT 'success',
-                    severity NVARCHAR(20) DEFAULT 'info',
-                    session_id NVARCHAR(100) NULL,
-                    request_id NVARCHAR(100) NULL,
-                    module NVARCHAR(50) NULL,
-                    before_data NTEXT NULL,
-                    after_data NTEXT NULL
-                )
-            """)
-            
-            # Add missing columns to existing audit2_logs table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'severity')
-                BEGIN
-                    ALTER TABLE audit2_logs ADD severity NVARCHAR(20) DEFAULT 'info'
-                END
-            """)
-            
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'session_id')
-                BEGIN
-                    ALTER TABLE audit2_logs ADD session_id NVARCHAR(100) NULL
-                END
-            """)
-            
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'request_id')
-                BEGIN
-                    ALTER TABLE audit2_logs ADD request_id NVARCHAR(100) NULL
-                END
-            """)
-            
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'module')
-                BEGIN
-                    ALTER TABLE audit2_logs ADD module NVARCHAR(50) NULL
-                END
-            """)
-            
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'before_data')
-                BEGIN
-                    ALTER TABLE audit2_logs ADD before_data NTEXT NULL
-                END
-            """)
-            
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
-                              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'after_data')
-                BEGIN
-                    ALTER TABLE audit2_logs ADD after_data NTEXT NULL
-                END
-            """)
-            
-            # Create dashboard metrics table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='dashboard_metrics' AND xtype='U')
-                CREATE TABLE dashboard_metrics (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    metric_name NVARCHAR(100) NOT NULL,
-                    metric_value FLOAT NOT NULL,
-                    metric_type NVARCHAR(50) NOT NULL,
-                    category NVARCHAR(50) NOT NULL,
-                    timestamp DATETIME2 DEFAULT GETDATE(),
-                    description NVARCHAR(200) NULL
-                )
-            """)
-            
-            conn.commit()
-            return {"status": "success", "message": "Tables created successfully"}
-    except Exception as e:
-        return {"status": "error", "message": f"Failed to create tables: {str(e)}"}
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Streaming audit log export.
+
+Rows are pulled from the cursor in fetchmany() batches and rendered batch by
+batch, so an export holds at most one batch in memory whatever the date range.
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from database import get_db_connection
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+LOG_EXPORT_FIELDS = [
+    "id", "user_id", "username", "action", "resource", "details", "ip_address",
+    "user_agent", "timestamp", "status", "severity", "session_id", "request_id",
+    "module", "before_data", "after_data"
+]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def fetch_batches(sql: str, params: Sequence, batch_size: Optional[int] = None) -> Iterator[List]:
+    """
+    Run `sql` and yield its rows in batches, holding a pooled connection until
+    the generator is exhausted or closed.
+
+    The query runs as soon as the generator is created, so connection and SQL
+    errors surface to the caller instead of halfway through a response.
+    """
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+
+    def batches():
+        # Not the request's shared connection: the stream outlives the request handler
+        with get_db_connection(shared=False) as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, *params)
+            yield None
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+    generator = batches()
+    next(generator)
+    return generator
+
+
+def log_record(row) -> dict:
+    record = dict(zip(LOG_EXPORT_FIELDS, row))
+    record["severity"] = record["severity"] or "info"
+    return record
+
+
+def csv_chunks(batches: Iterable[List]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=LOG_EXPORT_FIELDS)
+    writer.writeheader()
+    for rows in batches:
+        writer.writerows(log_record(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(batches: Iterable[List]) -> Iterator[str]:
+    for rows in batches:
+        yield "".join(json.dumps(log_record(row), default=str) + "\n" for row in rows)
+
+
+def json_chunks(batches: Iterable[List]) -> Iterator[str]:
+    """A single JSON array, streamed element by element"""
+    separator = "["
+    for rows in batches:
+        chunk = []
+        for row in rows:
+            chunk.append(separator)
+            chunk.append(json.dumps(log_record(row), default=str))
+            separator = ","
+        yield "".join(chunk)
+    yield "[]" if separator == "[" else "]"
+
+
+def encode_chunks(chunks: Iterable[str], gzip: bool = False) -> Iterator[bytes]:
+    """UTF-8 encode the rendered chunks, optionally gzip-compressing on the fly"""
+    if not gzip:
+        for chunk in chunks:
+            if chunk:
+                yield chunk.encode("utf-8")
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+RENDERERS = {
+    "csv": csv_chunks,
+    "json": json_chunks,
+    "ndjson": ndjson_chunks,
+}
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Audit log partition maintenance and retention.
+
+audit2_logs and audit2_logs_archive are partitioned by month on the same
+partition scheme (migration 0006). The retention job:
+
+- keeps LOG_PARTITION_MONTHS_AHEAD empty months ready at the end, so new
+  boundaries are always split off an empty partition;
+- switches months older than LOG_RETENTION_MONTHS from audit2_logs into
+  audit2_logs_archive, a metadata-only move that leaves the hot table (and its
+  indexes and counts) covering only recent months;
+- if LOG_ARCHIVE_RETENTION_MONTHS is set, truncates archived months older than
+  that, along with their search tokens and rollups, and merges away their
+  empty partitions.
+
+Endpoints whose `days` window reaches past the hot months read the
+audit2_logs_all view instead (see log_source()).
+
+Run `python log_retention.py` to apply the policy by hand.
+"""
+import os
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from database import get_db_connection
+from log_rollups import forget_rollups
+from log_search import forget_tokens
+
+LOG_RETENTION_MONTHS = int(os.getenv("LOG_RETENTION_MONTHS", "12"))
+# 0 keeps archived months forever
+LOG_ARCHIVE_RETENTION_MONTHS = int(os.getenv("LOG_ARCHIVE_RETENTION_MONTHS", "0"))
+LOG_PARTITION_MONTHS_AHEAD = int(os.getenv("LOG_PARTITION_MONTHS_AHEAD", "3"))
+LOG_RETENTION_INTERVAL = float(os.getenv("LOG_RETENTION_INTERVAL", "3600"))
+
+PARTITION_FUNCTION = "pf_audit_monthly"
+PARTITION_SCHEME = "ps_audit_monthly"
+RETENTION_LOCK = "audit_log_retention"
+
+# Whole days guaranteed to still be in audit2_logs: the current month plus
+# LOG_RETENTION_MONTHS full months, each at least 28 days long
+HOT_DAYS = LOG_RETENTION_MONTHS * 28
+
+# Lower bound of the first partition, which has no boundary below it
+EARLIEST = datetime(1, 1, 1)
+
+
+class Partition(NamedTuple):
+    number: int
+    upper_bound: datetime
+    rows: int
+    archived_rows: int
+
+
+class RetentionPlan(NamedTuple):
+    split: List[datetime]
+    switch: List[int]
+    truncate: List[int]
+    merge: List[datetime]
+
+
+def log_source(days: int) -> str:
+    """The table or view to read a `days` window of audit logs from"""
+    return "audit2_logs" if days <= HOT_DAYS else "audit2_logs_all"
+
+
+def month_start(moment: datetime, months: int = 0) -> datetime:
+    """First day of the month `months` months after (or before) `moment`'s month"""
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def load_partitions(cursor) -> List[Partition]:
+    """Every partition with an upper boundary, with row counts for both tables"""
+    cursor.execute("""
+        SELECT p.partition_number, CAST(rv.value AS DATETIME2),
+               SUM(CASE WHEN p.object_id = OBJECT_ID('audit2_logs') THEN p.rows ELSE 0 END),
+               SUM(CASE WHEN p.object_id = OBJECT_ID('audit2_logs_archive') THEN p.rows ELSE 0 END)
+        FROM sys.partitions p
+        JOIN sys.indexes i ON i.object_id = p.object_id AND i.index_id = p.index_id
+        JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+        JOIN sys.partition_range_values rv ON rv.function_id = ps.function_id AND rv.boundary_id = p.partition_number
+        WHERE p.object_id IN (OBJECT_ID('audit2_logs'), OBJECT_ID('audit2_logs_archive')) AND p.index_id = 1
+        GROUP BY p.partition_number, rv.value
+        ORDER BY p.partition_number
+    """)
+    return [Partition(*row) for row in cursor.fetchall()]
+
+
+def plan_retention(
+    partitions: List[Partition],
+    now: datetime,
+    retention_months: int = LOG_RETENTION_MONTHS,
+    archive_retention_months: int = LOG_ARCHIVE_RETENTION_MONTHS,
+    months_ahead: int = LOG_PARTITION_MONTHS_AHEAD
+) -> RetentionPlan:
+    """
+    What the retention job has to do. With RANGE RIGHT boundaries, partition
+    n holds the month just before boundary n, so a partition is entirely
+    older than a cutoff when its upper bound is at or before it.
+    """
+    last = partitions[-1].upper_bound if partitions else month_start(now)
+    split = []
+    while last < month_start(now, months_ahead):
+        last = month_start(last, 1)
+        split.append(last)
+
+    hot_cutoff = month_start(now, -retention_months)
+    # The archive partition has to be empty to switch into it
+    switch = [p.number for p in partitions if p.upper_bound <= hot_cutoff and p.rows and not p.archived_rows]
+
+    truncate, merge = [], []
+    if archive_retention_months:
+        archive_cutoff = month_start(now, -archive_retention_months)
+        expired = [p for p in partitions if p.upper_bound <= archive_cutoff]
+        truncate = [p.number for p in expired if p.archived_rows]
+
+        def emptied(partition: Partition) -> bool:
+            return not partition.rows and (not partition.archived_rows or partition.number in truncate)
+
+        # Leading expired partitions left empty in both tables collapse into
+        # one; merging the boundary between two empty partitions moves no data
+        for current, following in zip(expired, expired[1:]):
+            if not (emptied(current) and emptied(following)):
+                break
+            merge.append(current.upper_bound)
+    return RetentionPlan(split, switch, truncate, merge)
+
+
+def apply_retention() -> Optional[RetentionPlan]:
+    """Run one pass of the retention policy; None if another worker is running it"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DECLARE @result INT;
+            EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = 0;
+            SELECT @result;
+        """, RETENTION_LOCK)
+        if cursor.fetchone()[0] < 0:
+            return None
+
+        try:
+            cursor.execute("SELECT GETDATE()")
+            now = cursor.fetchone()[0]
+            partitions = load_partitions(cursor)
+            plan = plan_retention(
+                partitions, now,
+                LOG_RETENTION_MONTHS, LOG_ARCHIVE_RETENTION_MONTHS, LOG_PARTITION_MONTHS_AHEAD
+            )
+
+            for boundary in plan.split:
+                cursor.execute(f"ALTER PARTITION SCHEME {PARTITION_SCHEME} NEXT USED [PRIMARY]")
+                cursor.execute(f"ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() SPLIT RANGE ('{boundary:%Y-%m-%d}')")
+            for number in plan.switch:
+                cursor.execute(
+                    f"ALTER TABLE audit2_logs SWITCH PARTITION {int(number)} TO audit2_logs_archive PARTITION {int(number)}"
+                )
+            upper_bounds = {partition.number: partition.upper_bound for partition in partitions}
+            for number in plan.truncate:
+                cursor.execute(
+                    f"SELECT MIN(id), MAX(id) FROM audit2_logs_archive WHERE $PARTITION.{PARTITION_FUNCTION}(timestamp) = ?",
+                    number
+                )
+                first_id, last_id = cursor.fetchone()
+                cursor.execute(f"TRUNCATE TABLE audit2_logs_archive WITH (PARTITIONS ({int(number)}))")
+                # Search tokens and rollups derived from the purged month go with it
+                if first_id is not None:
+                    forget_tokens(cursor, first_id, last_id)
+                forget_rollups(cursor, upper_bounds.get(number - 1, EARLIEST), upper_bounds[number])
+            for boundary in plan.merge:
+                cursor.execute(f"ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() MERGE RANGE ('{boundary:%Y-%m-%d}')")
+            conn.commit()
+
+            if plan.switch or plan.truncate:
+                print(f"Audit log retention: archived partitions {plan.switch}, truncated {plan.truncate}")
+            return plan
+        finally:
+            conn.rollback()
+            cursor.execute("EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", RETENTION_LOCK)
+
+
+if __name__ == "__main__":
+    print(apply_retention())
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Hourly and daily audit log rollups.
+
+audit_log_rollup_hourly and audit_log_rollup_daily hold log counts per bucket
+and (action, username, module, severity, status). A background job rolls up
+each hour once it is LOG_ROLLUP_GRACE seconds old, so transactions still open
+at the hour boundary have committed, and every day once its last hour is in.
+audit_log_rollup_state records how far the rollups reach (rolled_up_until)
+and the newest log id they have seen (rolled_up_through_id).
+
+Logs can still be committed after their hour was rolled up: backdated imports,
+sample data, or an audit writer flush delayed past the grace period. Each run
+therefore first looks at the logs added since rolled_up_through_id and
+re-aggregates the hours (and complete days) they fall into below
+rolled_up_until, so late rows are counted at the next run.
+
+/api/logs/stats reads whole days from the daily table, whole hours from the
+hourly table and only the uneven edges of the window (the start of the window
+and everything since the last rolled-up hour) from the logs themselves,
+through audit2_logs_all so archived months are included.
+
+Run `python log_rollups.py` to backfill existing history ahead of the
+background job, or `python log_rollups.py --rebuild` to recompute it.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database import get_db_connection
+
+LOG_ROLLUP_INTERVAL = float(os.getenv("LOG_ROLLUP_INTERVAL", "60"))
+LOG_ROLLUP_GRACE = int(os.getenv("LOG_ROLLUP_GRACE", "300"))
+# Hours rolled up per transaction, so a backfill commits as it goes
+LOG_ROLLUP_CHUNK_HOURS = int(os.getenv("LOG_ROLLUP_CHUNK_HOURS", "24"))
+
+ROLLUP_STATE_NAME = "audit2_logs"
+ROLLUP_LOCK = "audit_log_rollup"
+
+Range = Tuple[datetime, datetime]
+
+ROLLUP_HOURS_SQL = """
+    INSERT INTO audit_log_rollup_hourly (bucket, action, username, module, severity, status, log_count)
+    SELECT DATEADD(hour, DATEDIFF(hour, 0, timestamp), 0), action, username, module, severity, status, COUNT(*)
+    FROM audit2_logs_all
+    WHERE timestamp >= ? AND timestamp < ?
+    GROUP BY DATEADD(hour, DATEDIFF(hour, 0, timestamp), 0), action, username, module, severity, status
+"""
+
+ROLLUP_DAYS_SQL = """
+    INSERT INTO audit_log_rollup_daily (bucket, action, username, module, severity, status, log_count)
+    SELECT CAST(bucket AS DATE), action, username, module, severity, status, SUM(log_count)
+    FROM audit_log_rollup_hourly
+    WHERE bucket >= ? AND bucket < ?
+    GROUP BY CAST(bucket AS DATE), action, username, module, severity, status
+"""
+
+_RAW_SLICE = """
+    SELECT CAST(timestamp AS DATE), action, username, module, severity, status, COUNT(*)
+    FROM audit2_logs_all WHERE timestamp >= ? AND timestamp < ?
+    GROUP BY CAST(timestamp AS DATE), action, username, module, severity, status"""
+_HOURLY_SLICE = """
+    SELECT CAST(bucket AS DATE), action, username, module, severity, status, log_count
+    FROM audit_log_rollup_hourly WHERE bucket >= ? AND bucket < ?"""
+_DAILY_SLICE = """
+    SELECT bucket, action, username, module, severity, status, log_count
+    FROM audit_log_rollup_daily WHERE bucket >= ? AND bucket < ?"""
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(moment: datetime) -> datetime:
+    hour = floor_hour(moment)
+    return hour if hour == moment else hour + timedelta(hours=1)
+
+
+def floor_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_day(moment: datetime) -> datetime:
+    day = floor_day(moment)
+    return day if day == moment else day + timedelta(days=1)
+
+
+def plan_slices(start: datetime, end: datetime, rolled_up_until: Optional[datetime]) -> Dict[str, List[Range]]:
+    """
+    Split [start, end) into the ranges to read from each source: whole days
+    from the daily rollup, whole hours from the hourly rollup and the rest
+    from the raw table. Only time before rolled_up_until can come from rollups.
+    """
+    slices: Dict[str, List[Range]] = {"raw": [], "hourly": [], "daily": []}
+    rolled = min(rolled_up_until, end) if rolled_up_until else None
+    first_hour = ceil_hour(start)
+    if rolled is None or first_hour >= rolled:
+        slices["raw"].append((start, end))
+        return slices
+
+    if start < first_hour:
+        slices["raw"].append((start, first_hour))
+
+    first_day = ceil_day(first_hour)
+    last_day = floor_day(rolled)
+    if first_day < last_day:
+        if first_hour < first_day:
+            slices["hourly"].append((first_hour, first_day))
+        slices["daily"].append((first_day, last_day))
+        if last_day < rolled:
+            slices["hourly"].append((last_day, rolled))
+    else:
+        slices["hourly"].append((first_hour, rolled))
+
+    if rolled < end:
+        slices["raw"].append((rolled, end))
+    return slices
+
+
+def stats_query(slices: Dict[str, List[Range]]) -> Tuple[str, list]:
+    """
+    One batch computing the /api/logs/stats result sets (totals, top actions,
+    top users, daily activity) over the union of the planned slices
+    """
+    parts, params = [], []
+    for source, sql in (("daily", _DAILY_SLICE), ("hourly", _HOURLY_SLICE), ("raw", _RAW_SLICE)):
+        for range_start, range_end in slices[source]:
+            parts.append(sql)
+            params.extend([range_start, range_end])
+
+    query = f"""
+        SET NOCOUNT ON;
+        IF OBJECT_ID('tempdb..#log_stats') IS NOT NULL DROP TABLE #log_stats;
+
+        SELECT day, action, username, module, severity, status, SUM(log_count) AS log_count
+        INTO #log_stats
+        FROM ({" UNION ALL ".join(parts)}
+        ) AS slices (day, action, username, module, severity, status, log_count)
+        GROUP BY day, action, username, module, severity, status;
+
+        SELECT
+            COALESCE(SUM(log_count), 0),
+            COALESCE(SUM(CASE WHEN severity = 'critical' THEN log_count END), 0),
+            COALESCE(SUM(CASE WHEN severity = 'high' THEN log_count END), 0),
+            COALESCE(SUM(CASE WHEN severity = 'medium' THEN log_count END), 0),
+            COALESCE(SUM(CASE WHEN severity = 'low' THEN log_count END), 0),
+            COALESCE(SUM(CASE WHEN severity = 'info' OR severity IS NULL THEN log_count END), 0),
+            COALESCE(SUM(CASE WHEN status = 'success' THEN log_count END), 0),
+            COALESCE(SUM(CASE WHEN status = 'failed' THEN log_count END), 0),
+            COUNT(DISTINCT username),
+            COUNT(DISTINCT module)
+        FROM #log_stats;
+
+        SELECT TOP 10 action, SUM(log_count) AS count
+        FROM #log_stats
+        GROUP BY action
+        ORDER BY count DESC;
+
+        SELECT TOP 10 username, SUM(log_count) AS count
+        FROM #log_stats
+        WHERE username IS NOT NULL
+        GROUP BY username
+        ORDER BY count DESC;
+
+        SELECT CONVERT(VARCHAR, day, 23), SUM(log_count),
+               COALESCE(SUM(CASE WHEN severity = 'critical' THEN log_count END), 0)
+        FROM #log_stats
+        GROUP BY day
+        ORDER BY day DESC;
+
+        DROP TABLE #log_stats;
+        SET NOCOUNT OFF;
+    """
+    return query, params
+
+
+def _ranges(starts: List[datetime], step: timedelta) -> List[Range]:
+    """Consecutive bucket starts merged into [start, end) ranges"""
+    ranges: List[Range] = []
+    for start in sorted(starts):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], start + step)
+        else:
+            ranges.append((start, start + step))
+    return ranges
+
+
+def late_hours(cursor, since_id: int, through_id: int, rolled_up_until: datetime) -> List[datetime]:
+    """Hours before rolled_up_until that logs since_id < id <= through_id were written into"""
+    cursor.execute("""
+        SELECT DISTINCT DATEADD(hour, DATEDIFF(hour, 0, timestamp), 0)
+        FROM audit2_logs_all
+        WHERE id > ? AND id <= ? AND timestamp < ?
+    """, since_id, through_id, rolled_up_until)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def reaggregate(cursor, hours: List[datetime], rolled_up_until: datetime):
+    """Recompute the hourly rollups of `hours` and the daily rollups of their complete days"""
+    for start, end in _ranges(hours, timedelta(hours=1)):
+        cursor.execute("DELETE FROM audit_log_rollup_hourly WHERE bucket >= ? AND bucket < ?", start, end)
+        cursor.execute(ROLLUP_HOURS_SQL, start, end)
+    # Days are only in the daily table once their last hour is rolled up
+    days = {floor_day(hour) for hour in hours if floor_day(hour) < floor_day(rolled_up_until)}
+    for start, end in _ranges(list(days), timedelta(days=1)):
+        cursor.execute(
+            "DELETE FROM audit_log_rollup_daily WHERE bucket >= CAST(? AS DATE) AND bucket < CAST(? AS DATE)",
+            start, end
+        )
+        cursor.execute(ROLLUP_DAYS_SQL, start, end)
+
+
+def rollup_position(cursor) -> Tuple[datetime, Optional[datetime]]:
+    """(database time now, rolled_up_until or None before the first rollup)"""
+    cursor.execute(
+        "SELECT GETDATE(), (SELECT rolled_up_until FROM audit_log_rollup_state WHERE name = ?)",
+        ROLLUP_STATE_NAME
+    )
+    now, rolled_up_until = cursor.fetchone()
+    return now, rolled_up_until
+
+
+def roll_up_logs() -> int:
+    """
+    Re-aggregate the hours that received logs since the last run, then roll up
+    every complete hour not rolled up yet, committing every
+    LOG_ROLLUP_CHUNK_HOURS hours. Returns the number of hours covered, or 0 if
+    another worker is already rolling up.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DECLARE @result INT;
+            EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = 0;
+            SELECT @result;
+        """, ROLLUP_LOCK)
+        if cursor.fetchone()[0] < 0:
+            return 0
+
+        try:
+            now, rolled_up_until = rollup_position(cursor)
+            target = floor_hour(now - timedelta(seconds=LOG_ROLLUP_GRACE))
+            # Read before rolling up, so rows added meanwhile are looked at again next run
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM audit2_logs_all")
+            newest_id = cursor.fetchone()[0]
+
+            hours = 0
+            if rolled_up_until is None:
+                # Start from the oldest log, so the first run is the backfill
+                cursor.execute("SELECT MIN(timestamp) FROM audit2_logs_all")
+                oldest = cursor.fetchone()[0]
+                rolled_up_until = min(floor_hour(oldest), target) if oldest else target
+                cursor.execute(
+                    "INSERT INTO audit_log_rollup_state (name, rolled_up_until, rolled_up_through_id) VALUES (?, ?, ?)",
+                    ROLLUP_STATE_NAME, rolled_up_until, newest_id
+                )
+                conn.commit()
+            else:
+                cursor.execute(
+                    "SELECT rolled_up_through_id FROM audit_log_rollup_state WHERE name = ?", ROLLUP_STATE_NAME
+                )
+                through_id = cursor.fetchone()[0]
+                if newest_id > through_id:
+                    late = late_hours(cursor, through_id, newest_id, rolled_up_until)
+                    reaggregate(cursor, late, rolled_up_until)
+                    cursor.execute(
+                        "UPDATE audit_log_rollup_state SET rolled_up_through_id = ?, updated_at = GETDATE() WHERE name = ?",
+                        newest_id, ROLLUP_STATE_NAME
+                    )
+                    conn.commit()
+                    hours += len(late)
+
+            while rolled_up_until < target:
+                chunk_end = min(target, rolled_up_until + timedelta(hours=LOG_ROLLUP_CHUNK_HOURS))
+                cursor.execute(ROLLUP_HOURS_SQL, rolled_up_until, chunk_end)
+                # Days whose last hour is in this chunk
+                if floor_day(rolled_up_until) < floor_day(chunk_end):
+                    cursor.execute(ROLLUP_DAYS_SQL, floor_day(rolled_up_until), floor_day(chunk_end))
+                cursor.execute(
+                    "UPDATE audit_log_rollup_state SET rolled_up_until = ?, updated_at = GETDATE() WHERE name = ?",
+                    chunk_end, ROLLUP_STATE_NAME
+                )
+                conn.commit()
+                hours += int((chunk_end - rolled_up_until).total_seconds() // 3600)
+                rolled_up_until = chunk_end
+            return hours
+        finally:
+            conn.rollback()
+            cursor.execute("EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", ROLLUP_LOCK)
+
+
+def forget_rollups(cursor, start: datetime, end: datetime):
+    """Delete the rollups of [start, end), whose logs retention has purged"""
+    cursor.execute("""
+        DELETE FROM audit_log_rollup_hourly WHERE bucket >= ? AND bucket < ?;
+        DELETE FROM audit_log_rollup_daily WHERE bucket >= CAST(? AS DATE) AND bucket < CAST(? AS DATE);
+    """, start, end, start, end)
+
+
+def reset_rollups():
+    """Drop all rolled-up data; the next roll_up_logs() starts from the oldest log"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DELETE FROM audit_log_rollup_state WHERE name = ?;
+            TRUNCATE TABLE audit_log_rollup_hourly;
+            TRUNCATE TABLE audit_log_rollup_daily;
+        """, ROLLUP_STATE_NAME)
+        conn.commit()
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv[1:]:
+        reset_rollups()
+    print(f"Rolled up {roll_up_logs()} hours of audit logs")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Audit log search index.
+
+A background job tokenizes new audit logs into audit_log_tokens: the
+lowercase trigrams of action, username and details. It reads them through
+audit2_logs_all, so logs that retention has already switched into the archive
+are indexed too; long search windows read the archive. A substring filter such
+as action LIKE '%login%' is then narrowed to the ids holding every trigram of
+the term, which are index seeks, and the LIKE only rechecks those candidates.
+`q` searches action, username and details the same way. Every row holding a
+substring also holds its trigrams, so a search matches the same rows whether
+or not they have been indexed yet.
+
+Rows the indexer has not reached yet (id above indexed_through_id) and terms
+shorter than a trigram fall back to plain LIKE, with %, _ and [ escaped so
+they match literally, as the trigrams do. Each run also drops the tokens
+of logs that retention has purged.
+
+Run `python log_search.py` to index existing logs ahead of the background job.
+"""
+import os
+from itertools import takewhile
+from typing import List, Optional, Set, Tuple
+
+from database import get_db_connection
+
+SEARCH_INDEX_INTERVAL = float(os.getenv("SEARCH_INDEX_INTERVAL", "10"))
+SEARCH_INDEX_BATCH_SIZE = int(os.getenv("SEARCH_INDEX_BATCH_SIZE", "2000"))
+# Rows younger than this are left for the next run, so a transaction that took
+# an id earlier but commits later is not skipped
+SEARCH_INDEX_GRACE = int(os.getenv("SEARCH_INDEX_GRACE", "60"))
+
+SEARCH_STATE_NAME = "audit2_logs"
+SEARCH_INDEX_LOCK = "audit_log_search_index"
+
+FIELD_ACTION = "a"
+FIELD_USERNAME = "u"
+FIELD_DETAILS = "d"
+
+INDEXED_THROUGH_SQL = (
+    "(SELECT COALESCE(MAX(indexed_through_id), 0) FROM audit_log_search_state "
+    f"WHERE name = '{SEARCH_STATE_NAME}')"
+)
+
+INSERT_TOKEN_SQL = "INSERT INTO audit_log_tokens (field, token, log_id) VALUES (?, ?, ?)"
+
+# Tokens of logs below the oldest one still kept (in audit2_logs or its archive)
+PRUNE_TOKENS_SQL = """
+    DELETE TOP (?) FROM audit_log_tokens
+    WHERE log_id < COALESCE((SELECT MIN(id) FROM audit2_logs_all), ?)
+"""
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    text = (text or "").lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def log_tokens(log_id: int, action: Optional[str], username: Optional[str], details: Optional[str]) -> List[tuple]:
+    """audit_log_tokens rows for one log"""
+    rows = [(FIELD_ACTION, gram, log_id) for gram in trigrams(action)]
+    rows += [(FIELD_USERNAME, gram, log_id) for gram in trigrams(username)]
+    rows += [(FIELD_DETAILS, gram, log_id) for gram in trigrams(details)]
+    return rows
+
+
+def _ids_with_all(field: str, tokens: Set[str]) -> Tuple[str, list]:
+    placeholders = ", ".join("?" for _ in tokens)
+    sql = (
+        f"SELECT log_id FROM audit_log_tokens WHERE field = ? AND token IN ({placeholders}) "
+        "GROUP BY log_id HAVING COUNT(*) = ?"
+    )
+    return sql, [field, *sorted(tokens), len(tokens)]
+
+
+def _narrowed(recheck: str, recheck_params: list, candidates: List[Tuple[str, list]]) -> Tuple[str, list]:
+    """`recheck` limited to indexed candidate ids plus the rows not indexed yet"""
+    if not candidates:
+        return recheck, recheck_params
+    union = " UNION ".join(sql for sql, _ in candidates)
+    params = [param for _, candidate_params in candidates for param in candidate_params]
+    return (
+        f"{recheck} AND (audit2_logs.id > {INDEXED_THROUGH_SQL} OR audit2_logs.id IN ({union}))",
+        recheck_params + params
+    )
+
+
+def contains_pattern(term: str) -> str:
+    """LIKE pattern (with ESCAPE '\\') matching `term` literally anywhere in a value"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("[", "\\[")
+    return f"%{escaped}%"
+
+
+def substring_condition(column: str, field: str, term: str) -> Tuple[str, list]:
+    """WHERE condition for `column` containing `term`, like `column LIKE '%term%'`"""
+    grams = trigrams(term)
+    candidates = [_ids_with_all(field, grams)] if grams else []
+    return _narrowed(f"{column} LIKE ? ESCAPE '\\'", [contains_pattern(term)], candidates)
+
+
+def text_search_conditions(q: str) -> Tuple[List[str], list]:
+    """
+    WHERE conditions for a free-text query: every term has to appear in the
+    action, the username or the details of the log
+    """
+    conditions, params = [], []
+    for term in q.split():
+        grams = trigrams(term)
+        candidates = []
+        if grams:
+            candidates = [_ids_with_all(field, grams) for field in (FIELD_ACTION, FIELD_USERNAME, FIELD_DETAILS)]
+        pattern = contains_pattern(term)
+        condition, condition_params = _narrowed(
+            "(action LIKE ? ESCAPE '\\' OR username LIKE ? ESCAPE '\\' OR details LIKE ? ESCAPE '\\')",
+            [pattern, pattern, pattern], candidates
+        )
+        conditions.append(condition)
+        params.extend(condition_params)
+    return conditions, params
+
+
+def forget_tokens(cursor, first_id: int, last_id: int):
+    """Delete the tokens of logs in [first_id, last_id] that no longer exist"""
+    cursor.execute("""
+        DELETE t FROM audit_log_tokens t
+        WHERE t.log_id BETWEEN ? AND ?
+          AND NOT EXISTS (SELECT 1 FROM audit2_logs_all l WHERE l.id = t.log_id)
+    """, first_id, last_id)
+
+
+def prune_tokens(conn) -> int:
+    """Delete the tokens of purged logs, committing each batch; the number deleted"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {INDEXED_THROUGH_SQL}")
+    # With every log purged, everything indexed so far is stale
+    fallback = cursor.fetchone()[0] + 1
+    pruned = 0
+    while True:
+        cursor.execute(PRUNE_TOKENS_SQL, SEARCH_INDEX_BATCH_SIZE, fallback)
+        conn.commit()
+        pruned += max(cursor.rowcount, 0)
+        if cursor.rowcount < SEARCH_INDEX_BATCH_SIZE:
+            return pruned
+
+
+def index_logs() -> int:
+    """
+    Tokenize audit logs the index has not reached yet, committing every
+    SEARCH_INDEX_BATCH_SIZE rows. Returns the number of logs indexed, or 0 if
+    another worker is already indexing.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DECLARE @result INT;
+            EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = 0;
+            SELECT @result;
+        """, SEARCH_INDEX_LOCK)
+        if cursor.fetchone()[0] < 0:
+            return 0
+
+        try:
+            indexed = 0
+            while True:
+                cursor.execute(f"SELECT {INDEXED_THROUGH_SQL}, DATEADD(second, -?, GETDATE())", SEARCH_INDEX_GRACE)
+                indexed_through, cutoff = cursor.fetchone()
+                cursor.execute("""
+                    SELECT TOP (?) id, timestamp, action, username, details
+                    FROM audit2_logs_all
+                    WHERE id > ?
+                    ORDER BY id
+                """, SEARCH_INDEX_BATCH_SIZE, indexed_through)
+                rows = cursor.fetchall()
+                ready = list(takewhile(lambda row: row[1] is None or row[1] < cutoff, rows))
+                if not ready:
+                    break
+
+                tokens = [token for row in ready for token in log_tokens(row[0], row[2], row[3], row[4])]
+                if tokens:
+                    cursor.fast_executemany = True
+                    cursor.executemany(INSERT_TOKEN_SQL, tokens)
+                cursor.execute("""
+                    UPDATE audit_log_search_state SET indexed_through_id = ?, updated_at = GETDATE() WHERE name = ?;
+                    IF @@ROWCOUNT = 0
+                        INSERT INTO audit_log_search_state (name, indexed_through_id) VALUES (?, ?);
+                """, ready[-1][0], SEARCH_STATE_NAME, SEARCH_STATE_NAME, ready[-1][0])
+                conn.commit()
+                indexed += len(ready)
+
+                if len(ready) < SEARCH_INDEX_BATCH_SIZE:
+                    break
+
+            prune_tokens(conn)
+            return indexed
+        finally:
+            conn.rollback()
+            cursor.execute("EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", SEARCH_INDEX_LOCK)
+
+
+if __name__ == "__main__":
+    print(f"Indexed {index_logs()} audit logs")
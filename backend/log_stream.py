@@ -0,0 +1,218 @@
+"""
+Live audit-log tail (GET /api/logs/stream).
+
+Audit writes publish the rows they inserted to an in-process broker once their
+transaction commits, and the broker hands each row to every connected client
+whose filters match. Each client has a bounded queue that is only touched on
+the event loop, so a writer never waits for a client: when a client falls
+LOG_STREAM_QUEUE_SIZE events behind, its stream is ended and the browser's
+EventSource reconnects with the last id it received, which is caught up from
+the database (at most LOG_STREAM_CATCHUP_LIMIT rows) before the live tail
+resumes. Idle streams get a comment line every LOG_STREAM_HEARTBEAT seconds
+to keep proxies from closing them.
+
+Log ids are assigned at insert but can commit out of order, so a stream never
+skips a live entry just because its id is below one already sent; it only
+skips the entries the catch-up already sent. The catch-up itself reads ids
+above Last-Event-ID, so a log with a lower id that commits while the client
+is disconnected is not replayed; it is still returned by GET /api/logs.
+
+Writes only return their rows (OUTPUT INSERTED ...) while a client is
+connected, so the write path is unchanged when nobody is listening.
+"""
+import asyncio
+import os
+import threading
+from typing import AsyncIterator, Iterable, List, Optional
+
+import orjson
+
+LOG_STREAM_QUEUE_SIZE = int(os.getenv("LOG_STREAM_QUEUE_SIZE", "256"))
+LOG_STREAM_HEARTBEAT = float(os.getenv("LOG_STREAM_HEARTBEAT", "15"))
+LOG_STREAM_CATCHUP_LIMIT = int(os.getenv("LOG_STREAM_CATCHUP_LIMIT", "500"))
+# Reconnect delay the client is told to use, in milliseconds
+LOG_STREAM_RETRY = int(os.getenv("LOG_STREAM_RETRY", "3000"))
+
+# Entry fields in the order of LOG_OUTPUT and LOG_SELECT; payloads are not streamed
+LOG_FIELDS = (
+    "id", "user_id", "username", "action", "resource", "details", "ip_address",
+    "user_agent", "timestamp", "status", "severity", "session_id", "request_id", "module",
+)
+
+LOG_OUTPUT = """
+    OUTPUT INSERTED.id, INSERTED.user_id, INSERTED.username, INSERTED.action, INSERTED.resource,
+           INSERTED.details, INSERTED.ip_address, INSERTED.user_agent,
+           CAST(INSERTED.timestamp AS VARCHAR(30)), INSERTED.status,
+           COALESCE(INSERTED.severity, 'info'), COALESCE(INSERTED.session_id, ''),
+           COALESCE(INSERTED.request_id, ''), COALESCE(INSERTED.module, '')
+"""
+
+LOG_SELECT = """
+    SELECT id, user_id, username, action, resource, details, ip_address,
+           user_agent, CAST(timestamp AS VARCHAR(30)) as timestamp, status,
+           COALESCE(severity, 'info') as severity,
+           COALESCE(session_id, '') as session_id,
+           COALESCE(request_id, '') as request_id,
+           COALESCE(module, '') as module
+"""
+
+_OVERFLOW = object()
+_CLOSED = object()
+
+
+def log_entry(row) -> dict:
+    """A LOG_OUTPUT / LOG_SELECT row in the shape of a GET /api/logs entry"""
+    entry = dict(zip(LOG_FIELDS, row))
+    entry["before_data"] = None
+    entry["after_data"] = None
+    return entry
+
+
+class LogFilter:
+    """The GET /api/logs filters a stream can use, applied to entries in memory"""
+
+    def __init__(self, severity: Optional[str] = None, module: Optional[str] = None,
+                 action: Optional[str] = None, username: Optional[str] = None,
+                 status: Optional[str] = None):
+        self.severity = severity
+        self.module = module
+        self.action = action.lower() if action else None
+        self.username = username.lower() if username else None
+        self.status = status
+
+    def matches(self, entry: dict) -> bool:
+        # Same semantics as the SQL filters: equality, and case-insensitive substrings
+        if self.severity and entry["severity"] != self.severity:
+            return False
+        if self.module and entry["module"] != self.module:
+            return False
+        if self.status and entry["status"] != self.status:
+            return False
+        if self.action and self.action not in (entry["action"] or "").lower():
+            return False
+        if self.username and self.username not in (entry["username"] or "").lower():
+            return False
+        return True
+
+
+class Subscription:
+    def __init__(self, log_filter: LogFilter, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.filter = log_filter
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def _push(self, item):
+        # Runs on the subscriber's event loop
+        if self.closed:
+            return
+        if item is _CLOSED or self.queue.full():
+            # Too far behind (or shutting down): drop what is queued and end the stream
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_CLOSED if item is _CLOSED else _OVERFLOW)
+        else:
+            self.queue.put_nowait(item)
+
+    def push(self, item):
+        """Hand an item to the subscriber from any thread, without waiting"""
+        try:
+            self.loop.call_soon_threadsafe(self._push, item)
+        except RuntimeError:
+            # The loop is already closed
+            self.closed = True
+
+
+class LogStreamBroker:
+    def __init__(self, queue_size: int = LOG_STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._published = 0
+        self._overflows = 0
+
+    @property
+    def listening(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, log_filter: LogFilter) -> Subscription:
+        """Register a client; call from the event loop that will read its queue"""
+        subscription = Subscription(log_filter, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not subscription]
+
+    def publish(self, rows: Iterable[tuple]):
+        """Deliver committed LOG_OUTPUT rows to the matching subscribers (any thread)"""
+        entries = sorted((log_entry(row) for row in rows), key=lambda entry: entry["id"])
+        if not entries:
+            return
+        subscribers = self._subscribers
+        with self._lock:
+            self._published += len(entries)
+        for subscription in subscribers:
+            for entry in entries:
+                if subscription.filter.matches(entry):
+                    subscription.push(entry)
+
+    def close(self):
+        """End every open stream, e.g. on shutdown"""
+        for subscription in self._subscribers:
+            subscription.push(_CLOSED)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self._published,
+                "overflows": self._overflows,
+            }
+
+    def _overflowed(self):
+        with self._lock:
+            self._overflows += 1
+
+
+def format_event(entry: dict) -> bytes:
+    return b"id: %d\ndata: %s\n\n" % (entry["id"], orjson.dumps(entry))
+
+
+async def event_stream(broker: LogStreamBroker, subscription: Subscription, backlog: List[dict],
+                       heartbeat: float = LOG_STREAM_HEARTBEAT) -> AsyncIterator[bytes]:
+    """
+    SSE body: the caught-up `backlog`, then live entries from `subscription`,
+    which has to be subscribed before the backlog was read so nothing falls in
+    between (live entries the backlog already sent are skipped by id).
+    """
+    # Each entry is published once, so an id only has to be skipped once
+    sent = {entry["id"] for entry in backlog}
+    try:
+        yield b"retry: %d\n\n" % LOG_STREAM_RETRY
+        for entry in backlog:
+            yield format_event(entry)
+
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield b": heartbeat\n\n"
+                continue
+            if item is _OVERFLOW:
+                broker._overflowed()
+                return
+            if item is _CLOSED:
+                return
+            if item["id"] in sent:
+                sent.discard(item["id"])
+                continue
+            yield format_event(item)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+log_stream = LogStreamBroker()
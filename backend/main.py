@@ -1,27 +1,58 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer
-from typing import List, Optional
+from typing import Annotated, List, Optional, Union
 from datetime import datetime, timedelta
+import asyncio
+import json
 import uvicorn
 import pyodbc
 
-from database import get_db_connection, test_connection, create_tables
+from database import (
+    get_db_connection, test_connection, connection_pool, get_pool_stats,
+    db_executor, commit_executor, run_db, offload_db, UnitOfWork, current_unit_of_work,
+    finish_unit_of_work, after_commit, checkpoint
+)
+from logging_config import configure_logging
+from migrations import run_migrations
+from pagination import paginate, where_clause, next_cursor
+from rbac import rbac
+from dashboard_summary import dashboard_summary, SUMMARY_RECONCILE_INTERVAL
+from user_index import user_index
+from compression import CompressionMiddleware
+from batch import check_batch, dispatch, encode_results
+from bulk_import import (upload_format, read_upload, parse_upload, ImportRow,
+                         BULK_IMPORT_CHUNK_SIZE, CREATED, EXISTS)
+from catalog_versions import (catalog_versions, conditional_get, bump as bump_catalogs,
+                              ROLES, PERMISSIONS, USER_ROLES, CATALOGS)
+from log_rollups import roll_up_logs, rollup_position, plan_slices, stats_query, LOG_ROLLUP_INTERVAL
+from log_retention import apply_retention, log_source, LOG_RETENTION_INTERVAL
+from log_search import (index_logs, substring_condition, text_search_conditions,
+                        FIELD_ACTION, FIELD_USERNAME, SEARCH_INDEX_INTERVAL)
+from audit_writer import audit_writer, AUDIT_INSERT_SQL, AUDIT_INSERT_RETURNING_SQL
+from log_stream import (log_stream, event_stream, log_entry, LogFilter, LOG_OUTPUT, LOG_SELECT,
+                        LOG_STREAM_CATCHUP_LIMIT)
+from log_export import fetch_batches, encode_chunks, RENDERERS, EXPORT_MEDIA_TYPES
 from auth import (
-    verify_password, get_password_hash, create_access_token, create_refresh_token,
+    verify_password_async, hash_password_async, create_access_token, create_refresh_token,
     verify_token, generate_reset_token, get_current_user, get_current_active_user,
     require_permission, require_admin, ACCESS_TOKEN_EXPIRE_MINUTES, MAX_FAILED_ATTEMPTS,
-    LOCKOUT_DURATION_MINUTES
+    LOCKOUT_DURATION_MINUTES, password_executor, bulk_hash_executor
 )
 from models import (
     # User models
-    UserCreate, UserUpdate, UserResponse, UserCreateWithPassword, UserUpdateWithPassword,
+    UserCreate, UserUpdate, UserResponse, UserPage, UserCreateWithPassword, UserUpdateWithPassword,
     # Role models
-    RoleCreate, RoleUpdate, RoleResponse,
+    RoleCreate, RoleUpdate, RoleResponse, RolePage,
     # Permission models
-    PermissionCreate, PermissionUpdate, PermissionResponse,
+    PermissionCreate, PermissionUpdate, PermissionResponse, PermissionPage,
     # Assignment models
     RolePermissionAssign, UserRoleAssign, UserRoleResponse,
+    # Bulk import models
+    BulkImportReport, BulkImportRowResult,
+    # Batch request models
+    BatchRequest,
     PermissionCheck, PermissionCheckResponse,
     # Authentication models
     LoginRequest, LoginResponse, RefreshTokenRequest, PasswordResetRequest,
@@ -32,10 +63,15 @@ from models import (
     DashboardSummary
 )
 
-# Create tables on startup
-create_tables()
+configure_logging()
+
+# Bring the schema up to date on startup (a single query when already current)
+migration_status = run_migrations()
+if migration_status["status"] != "success":
+    print(migration_status["message"])
 
-app = FastAPI(title="Dashboard Backend with RBAC", version="1.0.0")
+# orjson renders the (already validated) response content several times faster than json.dumps
+app = FastAPI(title="Dashboard Backend with RBAC", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -46,91 +82,277 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/deflate for large list responses (logs, users); small ones are sent as they are
+app.add_middleware(CompressionMiddleware)
+
+@app.middleware("http")
+async def unit_of_work(request, call_next):
+    # One connection and transaction per request, shared by every handler and
+    # helper it calls; committed once here, after the handler has finished
+    uow = UnitOfWork()
+    token = current_unit_of_work.set(uow)
+    try:
+        response = await call_next(request)
+    except Exception:
+        await finish_unit_of_work(uow, False)
+        raise
+    finally:
+        current_unit_of_work.reset(token)
+    
+    try:
+        await finish_unit_of_work(uow, response.status_code < 400)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"detail": f"Database error: {str(e)}"})
+    return response
+
+@app.on_event("startup")
+async def warm_connection_pool():
+    try:
+        connection_pool.warm()
+    except Exception as e:
+        print(f"Could not pre-open database connections: {e}")
+
+@app.on_event("startup")
+async def warm_user_index():
+    try:
+        await run_db(user_index.load, timeout=None)
+    except Exception as e:
+        print(f"Could not load the user search index: {e}")
+
+@app.on_event("startup")
+async def start_audit_writer():
+    if audit_writer.enabled:
+        audit_writer.start()
+
+async def reconcile_dashboard_summary():
+    while True:
+        await asyncio.sleep(SUMMARY_RECONCILE_INTERVAL)
+        try:
+            await run_db(dashboard_summary.reconcile)
+        except Exception as e:
+            print(f"Could not reconcile dashboard summary: {e}")
+
+async def roll_up_audit_logs():
+    while True:
+        try:
+            await run_db(roll_up_logs, timeout=None)
+        except Exception as e:
+            print(f"Could not roll up audit logs: {e}")
+        await asyncio.sleep(LOG_ROLLUP_INTERVAL)
+
+async def index_audit_logs():
+    while True:
+        try:
+            await run_db(index_logs, timeout=None)
+        except Exception as e:
+            print(f"Could not index audit logs: {e}")
+        await asyncio.sleep(SEARCH_INDEX_INTERVAL)
+
+async def apply_log_retention():
+    while True:
+        try:
+            await run_db(apply_retention, timeout=None)
+        except Exception as e:
+            print(f"Could not apply audit log retention: {e}")
+        await asyncio.sleep(LOG_RETENTION_INTERVAL)
+
+@app.on_event("startup")
+async def start_background_jobs():
+    app.state.background_jobs = [
+        asyncio.create_task(reconcile_dashboard_summary()),
+        asyncio.create_task(roll_up_audit_logs()),
+        asyncio.create_task(index_audit_logs()),
+        asyncio.create_task(apply_log_retention()),
+    ]
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    for job in getattr(app.state, "background_jobs", []):
+        job.cancel()
+
+@app.on_event("shutdown")
+async def close_connection_pool():
+    # Flush buffered audit records while the pool can still serve them
+    audit_writer.stop()
+    log_stream.close()
+    db_executor.shutdown(wait=False)
+    commit_executor.shutdown(wait=False)
+    password_executor.shutdown(wait=False)
+    bulk_hash_executor.shutdown(wait=False)
+    connection_pool.close()
+
 @app.get("/")
 async def root():
     return {"message": "Dashboard Backend with RBAC is running!"}
 
 @app.get("/api/health")
 async def health_check():
-    db_status = test_connection()
+    db_status = await run_db(test_connection)
     return {
         "status": "healthy",
         "message": "Backend is running",
-        "database": db_status
+        "database": db_status,
+        "pool": get_pool_stats(),
+        "audit_writer": audit_writer.stats(),
+        "log_stream": log_stream.stats()
     }
 
+@app.post("/api/batch")
+async def batch_requests(
+    batch: BatchRequest,
+    request: Request,
+    current_user: dict = Depends(get_current_active_user)
+):
+    # Sub-requests are GETs run concurrently in this request (see batch.py); the
+    # batch succeeds as a whole and each result carries its own status
+    check_batch(batch)
+    results = await asyncio.gather(*(dispatch(app.router, request.scope, item) for item in batch.requests))
+    return Response(content=encode_results(results), media_type="application/json")
+
+# ============================================================================
+# QUERY HELPERS
+# ============================================================================
+
+# SQL Server accepts at most 2100 parameters per statement
+SQL_IN_BATCH_SIZE = 1000
+
+def in_batches(values, size: int = SQL_IN_BATCH_SIZE):
+    """Split ids into chunks small enough for an `IN (?, ?, ...)` list"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def role_from_row(row, permissions=None) -> RoleResponse:
+    """Build a RoleResponse from (id, name, display_name, description, is_active, created_at, updated_at)"""
+    return RoleResponse(
+        id=row[0],
+        name=row[1],
+        display_name=row[2],
+        description=row[3],
+        is_active=bool(row[4]),
+        created_at=row[5],
+        updated_at=row[6],
+        permissions=permissions or []
+    )
+
+def permission_from_row(row) -> PermissionResponse:
+    """Build a PermissionResponse from (id, name, display_name, description, resource, action, created_at)"""
+    return PermissionResponse(
+        id=row[0],
+        name=row[1],
+        display_name=row[2],
+        description=row[3],
+        resource=row[4],
+        action=row[5],
+        created_at=row[6]
+    )
+
+def load_role_permissions(cursor, role_ids) -> dict:
+    """Permissions for many roles in one round trip per batch, keyed by role id"""
+    permissions = {role_id: [] for role_id in role_ids}
+    for batch in in_batches(permissions.keys()):
+        placeholders = ", ".join("?" for _ in batch)
+        cursor.execute(f"""
+            SELECT rp.role_id, p.id, p.name, p.display_name, p.description, p.resource, p.action, p.created_at
+            FROM permissions p
+            INNER JOIN role_permissions rp ON p.id = rp.permission_id
+            WHERE rp.role_id IN ({placeholders})
+            ORDER BY rp.role_id, p.id
+        """, *batch)
+        for row in cursor.fetchall():
+            permissions[row[0]].append(permission_from_row(row[1:]))
+    return permissions
+
+def load_user_roles(cursor, user_ids) -> dict:
+    """Roles for many users in one round trip per batch, keyed by user id"""
+    roles = {user_id: [] for user_id in user_ids}
+    for batch in in_batches(roles.keys()):
+        placeholders = ", ".join("?" for _ in batch)
+        cursor.execute(f"""
+            SELECT ur.user_id, r.id, r.name, r.display_name, r.description, r.is_active, r.created_at, r.updated_at
+            FROM roles r
+            INNER JOIN user_roles ur ON r.id = ur.role_id
+            WHERE ur.user_id IN ({placeholders})
+            ORDER BY ur.user_id, r.id
+        """, *batch)
+        for row in cursor.fetchall():
+            roles[row[0]].append(role_from_row(row[1:]))
+    return roles
+
+def sync_links(cursor, table: str, owner_column: str, owner_id: int, member_column: str, member_ids):
+    """
+    Make the rows of junction `table` for `owner_id` link exactly `member_ids`,
+    deleting and inserting only the differences (at most one statement each,
+    none when nothing changed). Returns the sorted (added, removed) ids.
+    """
+    # UPDLOCK/HOLDLOCK keeps a concurrent sync of the same owner from reading
+    # the same set and inserting the same rows
+    cursor.execute(
+        f"SELECT {member_column} FROM {table} WITH (UPDLOCK, HOLDLOCK) WHERE {owner_column} = ?", owner_id
+    )
+    current = {row[0] for row in cursor.fetchall()}
+    wanted = set(member_ids)
+    added, removed = sorted(wanted - current), sorted(current - wanted)
+
+    if removed:
+        cursor.execute(f"""
+            DELETE FROM {table}
+            WHERE {owner_column} = ? AND {member_column} IN (SELECT CAST(value AS INT) FROM OPENJSON(?))
+        """, owner_id, json.dumps(removed))
+    if added:
+        cursor.execute(f"""
+            INSERT INTO {table} ({owner_column}, {member_column})
+            SELECT ?, CAST(value AS INT) FROM OPENJSON(?)
+        """, owner_id, json.dumps(added))
+    return added, removed
+
 # ============================================================================
 # ROLE MANAGEMENT ENDPOINTS
 # ============================================================================
 
-@app.get("/api/roles", response_model=List[RoleResponse])
-async def get_roles(
+@app.get("/api/roles", response_model=Union[List[RoleResponse], RolePage])
+@conditional_get(ROLES, PERMISSIONS)
+@offload_db()
+def get_roles(
     skip: int = 0,
     limit: int = Query(default=100, le=1000),
-    active_only: bool = False
+    active_only: bool = False,
+    page_cursor: Annotated[Optional[str], Query(alias="cursor")] = None
 ):
+    # Passing `cursor` ("" for the first page) switches to keyset pagination
+    where_conditions = []
+    params = []
+    if active_only:
+        where_conditions.append("is_active = 1")
+    page_sql = paginate(where_conditions, params, page_cursor, skip, limit,
+                        order_by="display_name", key_columns=["display_name", "id"])
+    
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id, name, display_name, description, is_active, created_at, updated_at
+                FROM roles 
+                {where_clause(where_conditions)}
+                {page_sql}
+            """, params)
             
-            if active_only:
-                cursor.execute("""
-                    SELECT id, name, display_name, description, is_active, created_at, updated_at
-                    FROM roles 
-                    WHERE is_active = 1
-                    ORDER BY display_name
-                    OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
-                """, skip, limit)
-            else:
-                cursor.execute("""
-                    SELECT id, name, display_name, description, is_active, created_at, updated_at
-                    FROM roles 
-                    ORDER BY display_name
-                    OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
-                """, skip, limit)
+            role_rows = cursor.fetchall()
+            if page_cursor is not None:
+                role_rows, next_page = next_cursor(role_rows, limit, key=lambda row: (row[2], row[0]))
             
-            roles = []
-            for row in cursor.fetchall():
-                role = RoleResponse(
-                    id=row[0],
-                    name=row[1],
-                    display_name=row[2],
-                    description=row[3],
-                    is_active=bool(row[4]),
-                    created_at=row[5],
-                    updated_at=row[6],
-                    permissions=[]
-                )
-                
-                # Get permissions for this role
-                cursor.execute("""
-                    SELECT p.id, p.name, p.display_name, p.description, p.resource, p.action, p.created_at
-                    FROM permissions p
-                    INNER JOIN role_permissions rp ON p.id = rp.permission_id
-                    WHERE rp.role_id = ?
-                """, row[0])
-                
-                permissions = []
-                for perm_row in cursor.fetchall():
-                    permissions.append(PermissionResponse(
-                        id=perm_row[0],
-                        name=perm_row[1],
-                        display_name=perm_row[2],
-                        description=perm_row[3],
-                        resource=perm_row[4],
-                        action=perm_row[5],
-                        created_at=perm_row[6]
-                    ))
-                
-                role.permissions = permissions
-                roles.append(role)
+            # Get permissions for every role on the page in one query
+            permissions = load_role_permissions(cursor, [row[0] for row in role_rows])
             
+            roles = [role_from_row(row, permissions[row[0]]) for row in role_rows]
+            if page_cursor is not None:
+                return RolePage(items=roles, next_cursor=next_page)
             return roles
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@app.get("/api/roles/{role_id}", response_model=RoleResponse)
-async def get_role(role_id: int):
+def load_role(role_id: int) -> RoleResponse:
+    """Load a role with its permissions (blocking; call from the DB executor)"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -143,44 +365,21 @@ async def get_role(role_id: int):
             if not row:
                 raise HTTPException(status_code=404, detail="Role not found")
             
-            role = RoleResponse(
-                id=row[0],
-                name=row[1],
-                display_name=row[2],
-                description=row[3],
-                is_active=bool(row[4]),
-                created_at=row[5],
-                updated_at=row[6],
-                permissions=[]
-            )
-            
             # Get permissions for this role
-            cursor.execute("""
-                SELECT p.id, p.name, p.display_name, p.description, p.resource, p.action, p.created_at
-                FROM permissions p
-                INNER JOIN role_permissions rp ON p.id = rp.permission_id
-                WHERE rp.role_id = ?
-            """, role_id)
-            
-            permissions = []
-            for perm_row in cursor.fetchall():
-                permissions.append(PermissionResponse(
-                    id=perm_row[0],
-                    name=perm_row[1],
-                    display_name=perm_row[2],
-                    description=perm_row[3],
-                    resource=perm_row[4],
-                    action=perm_row[5],
-                    created_at=perm_row[6]
-                ))
+            permissions = load_role_permissions(cursor, [role_id])
             
-            role.permissions = permissions
-            return role
+            return role_from_row(row, permissions[role_id])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@app.get("/api/roles/{role_id}", response_model=RoleResponse)
+@offload_db()
+def get_role(role_id: int):
+    return load_role(role_id)
+
 @app.post("/api/roles", response_model=RoleResponse)
-async def create_role(role: RoleCreate, current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def create_role(role: RoleCreate, current_user: dict = Depends(get_current_active_user)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -213,7 +412,10 @@ async def create_role(role: RoleCreate, current_user: dict = Depends(get_current
                 status="success"
             )
             
+            bump_catalogs(cursor, ROLES)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
             
             return RoleResponse(
                 id=row[0],
@@ -229,7 +431,8 @@ async def create_role(role: RoleCreate, current_user: dict = Depends(get_current
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.put("/api/roles/{role_id}", response_model=RoleResponse)
-async def update_role(role_id: int, role_update: RoleUpdate, current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def update_role(role_id: int, role_update: RoleUpdate, current_user: dict = Depends(get_current_active_user)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -292,15 +495,19 @@ async def update_role(role_id: int, role_update: RoleUpdate, current_user: dict
                     status="success"
                 )
             
+            bump_catalogs(cursor, ROLES, USER_ROLES)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
             
             # Return updated role
-            return await get_role(role_id)
+            return load_role(role_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.delete("/api/roles/{role_id}")
-async def delete_role(role_id: int, current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def delete_role(role_id: int, current_user: dict = Depends(get_current_active_user)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -330,7 +537,10 @@ async def delete_role(role_id: int, current_user: dict = Depends(get_current_act
                 status="success"
             )
             
+            bump_catalogs(cursor, ROLES, USER_ROLES)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
             
             return {"message": f"Role {role_name} deleted successfully"}
     except Exception as e:
@@ -340,34 +550,42 @@ async def delete_role(role_id: int, current_user: dict = Depends(get_current_act
 # PERMISSION MANAGEMENT ENDPOINTS
 # ============================================================================
 
-@app.get("/api/permissions", response_model=List[PermissionResponse])
-async def get_permissions(
+@app.get("/api/permissions", response_model=Union[List[PermissionResponse], PermissionPage])
+@conditional_get(PERMISSIONS)
+@offload_db()
+def get_permissions(
     skip: int = 0,
     limit: int = Query(default=100, le=1000),
-    resource: Optional[str] = None
+    resource: Optional[str] = None,
+    page_cursor: Annotated[Optional[str], Query(alias="cursor")] = None
 ):
+    # Passing `cursor` ("" for the first page) switches to keyset pagination
+    where_conditions = []
+    params = []
+    if resource:
+        where_conditions.append("resource = ?")
+        params.append(resource)
+    page_sql = paginate(where_conditions, params, page_cursor, skip, limit,
+                        order_by="resource, action", key_columns=["resource", "action", "id"])
+    
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            if resource:
-                cursor.execute("""
-                    SELECT id, name, display_name, description, resource, action, created_at
-                    FROM permissions 
-                    WHERE resource = ?
-                    ORDER BY resource, action
-                    OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
-                """, resource, skip, limit)
-            else:
-                cursor.execute("""
-                    SELECT id, name, display_name, description, resource, action, created_at
-                    FROM permissions 
-                    ORDER BY resource, action
-                    OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
-                """, skip, limit)
+            cursor.execute(f"""
+                SELECT id, name, display_name, description, resource, action, created_at
+                FROM permissions 
+                {where_clause(where_conditions)}
+                {page_sql}
+            """, params)
+            
+            permission_rows = cursor.fetchall()
+            if page_cursor is not None:
+                permission_rows, next_page = next_cursor(
+                    permission_rows, limit, key=lambda row: (row[4], row[5], row[0])
+                )
             
             permissions = []
-            for row in cursor.fetchall():
+            for row in permission_rows:
                 permissions.append(PermissionResponse(
                     id=row[0],
                     name=row[1],
@@ -378,12 +596,15 @@ async def get_permissions(
                     created_at=row[6]
                 ))
             
+            if page_cursor is not None:
+                return PermissionPage(items=permissions, next_cursor=next_page)
             return permissions
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.post("/api/permissions", response_model=PermissionResponse)
-async def create_permission(permission: PermissionCreate, current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def create_permission(permission: PermissionCreate, current_user: dict = Depends(get_current_active_user)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -417,7 +638,10 @@ async def create_permission(permission: PermissionCreate, current_user: dict = D
                 status="success"
             )
             
+            bump_catalogs(cursor, PERMISSIONS)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
             
             return PermissionResponse(
                 id=row[0],
@@ -436,7 +660,8 @@ async def create_permission(permission: PermissionCreate, current_user: dict = D
 # ============================================================================
 
 @app.post("/api/roles/{role_id}/permissions")
-async def assign_permissions_to_role(role_id: int, assignment: RolePermissionAssign, current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def assign_permissions_to_role(role_id: int, assignment: RolePermissionAssign, current_user: dict = Depends(get_current_active_user)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -449,19 +674,11 @@ async def assign_permissions_to_role(role_id: int, assignment: RolePermissionAss
             
             role_name, role_display_name = role_row
             
-            # Get current permissions for logging
-            cursor.execute("SELECT permission_id FROM role_permissions WHERE role_id = ?", role_id)
-            old_permission_ids = [row[0] for row in cursor.fetchall()]
-            
-            # Clear existing permissions for this role
-            cursor.execute("DELETE FROM role_permissions WHERE role_id = ?", role_id)
-            
-            # Add new permissions
-            for permission_id in assignment.permission_ids:
-                cursor.execute("""
-                    INSERT INTO role_permissions (role_id, permission_id)
-                    VALUES (?, ?)
-                """, role_id, permission_id)
+            added, removed = sync_links(
+                cursor, "role_permissions", "role_id", role_id, "permission_id", assignment.permission_ids
+            )
+            if not added and not removed:
+                return {"message": "Permissions already up to date", "added": [], "removed": []}
             
             # Log the activity
             log_activity(
@@ -473,14 +690,17 @@ async def assign_permissions_to_role(role_id: int, assignment: RolePermissionAss
                 details=f"Updated permissions for role: {role_display_name}",
                 severity="high",
                 module="role_management",
-                before_data=f"Previous permissions: {old_permission_ids}",
-                after_data=f"New permissions: {assignment.permission_ids}",
+                before_data=f"Removed permissions: {removed}",
+                after_data=f"Added permissions: {added}",
                 status="success"
             )
             
+            bump_catalogs(cursor, ROLES)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
             
-            return {"message": f"Permissions assigned to role successfully"}
+            return {"message": f"Permissions assigned to role successfully", "added": added, "removed": removed}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -489,7 +709,8 @@ async def assign_permissions_to_role(role_id: int, assignment: RolePermissionAss
 # ============================================================================
 
 @app.post("/api/users/{user_id}/roles")
-async def assign_roles_to_user(user_id: int, assignment: UserRoleAssign, current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def assign_roles_to_user(user_id: int, assignment: UserRoleAssign, current_user: dict = Depends(get_current_active_user)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -502,19 +723,9 @@ async def assign_roles_to_user(user_id: int, assignment: UserRoleAssign, current
             
             target_username, target_full_name = user_row
             
-            # Get current roles for logging
-            cursor.execute("SELECT role_id FROM user_roles WHERE user_id = ?", user_id)
-            old_role_ids = [row[0] for row in cursor.fetchall()]
-            
-            # Clear existing roles for this user
-            cursor.execute("DELETE FROM user_roles WHERE user_id = ?", user_id)
-            
-            # Add new roles
-            for role_id in assignment.role_ids:
-                cursor.execute("""
-                    INSERT INTO user_roles (user_id, role_id)
-                    VALUES (?, ?)
-                """, user_id, role_id)
+            added, removed = sync_links(cursor, "user_roles", "user_id", user_id, "role_id", assignment.role_ids)
+            if not added and not removed:
+                return {"message": "Roles already up to date", "added": [], "removed": []}
             
             # Log the activity
             log_activity(
@@ -526,44 +737,29 @@ async def assign_roles_to_user(user_id: int, assignment: UserRoleAssign, current
                 details=f"Updated roles for user: {target_full_name} ({target_username})",
                 severity="high",
                 module="user_management",
-                before_data=f"Previous roles: {old_role_ids}",
-                after_data=f"New roles: {assignment.role_ids}",
+                before_data=f"Removed roles: {removed}",
+                after_data=f"Added roles: {added}",
                 status="success"
             )
             
+            bump_catalogs(cursor, USER_ROLES)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
             
-            return {"message": f"Roles assigned to user successfully"}
+            return {"message": f"Roles assigned to user successfully", "added": added, "removed": removed}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.get("/api/users/{user_id}/roles", response_model=List[RoleResponse])
-async def get_user_roles(user_id: int):
+@conditional_get(USER_ROLES, ROLES, PERMISSIONS)
+@offload_db()
+def get_user_roles(user_id: int):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT r.id, r.name, r.display_name, r.description, r.is_active, r.created_at, r.updated_at
-                FROM roles r
-                INNER JOIN user_roles ur ON r.id = ur.role_id
-                WHERE ur.user_id = ?
-            """, user_id)
-            
-            roles = []
-            for row in cursor.fetchall():
-                roles.append(RoleResponse(
-                    id=row[0],
-                    name=row[1],
-                    display_name=row[2],
-                    description=row[3],
-                    is_active=bool(row[4]),
-                    created_at=row[5],
-                    updated_at=row[6],
-                    permissions=[]
-                ))
-            
-            return roles
+            return load_user_roles(cursor, [user_id])[user_id]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -572,27 +768,15 @@ async def get_user_roles(user_id: int):
 # ============================================================================
 
 @app.post("/api/check-permission", response_model=PermissionCheckResponse)
-async def check_user_permission(check: PermissionCheck):
+@offload_db()
+def check_user_permission(check: PermissionCheck):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Get user's roles and permissions
-            cursor.execute("""
-                SELECT DISTINCT p.name as permission_name, r.name as role_name
-                FROM users u
-                INNER JOIN user_roles ur ON u.id = ur.user_id
-                INNER JOIN roles r ON ur.role_id = r.id
-                INNER JOIN role_permissions rp ON r.id = rp.role_id
-                INNER JOIN permissions p ON rp.permission_id = p.id
-                WHERE u.id = ? AND p.resource = ? AND p.action = ? AND r.is_active = 1
-            """, check.user_id, check.resource, check.action)
-            
-            results = cursor.fetchall()
-            
-            has_permission = len(results) > 0
-            roles = list(set([row[1] for row in results]))
-            permissions = list(set([row[0] for row in results]))
+            # Resolve against the user's active roles in the RBAC snapshot
+            roles, permissions = rbac.snapshot(cursor).check(check.user_id, check.resource, check.action)
+            has_permission = len(roles) > 0
             
             return PermissionCheckResponse(
                 has_permission=has_permission,
@@ -610,171 +794,216 @@ async def check_user_permission(check: PermissionCheck):
 async def login(login_request: LoginRequest):
     """Authenticate user and return JWT tokens"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get user with password hash
-            cursor.execute("""
-                SELECT id, username, email, full_name, password_hash, is_active, 
-                       failed_login_attempts, account_locked_until
-                FROM users 
-                WHERE username = ? OR email = ?
-            """, login_request.username, login_request.username)
-            
-            user_row = cursor.fetchone()
-            if not user_row:
-                # Log failed login attempt
-                log_activity(
-                    conn=conn, 
-                    username=login_request.username, 
-                    action="failed_login", 
-                    resource="auth", 
-                    details="User not found", 
-                    severity="medium", 
-                    module="auth", 
-                    status="failed"
-                )
-                conn.commit()  # Commit the failed login log before raising exception
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid username or password"
-                )
-            
-            user_id, username, email, full_name, password_hash, is_active, failed_attempts, locked_until = user_row
-            
-            # Check if account is locked
-            if locked_until and datetime.now() < locked_until:
-                log_activity(
-                    conn=conn, 
-                    user_id=user_id, 
-                    username=username, 
-                    action="login_attempt_locked", 
-                    resource="auth", 
-                    details="Account is locked", 
-                    severity="high", 
-                    module="auth", 
-                    status="failed"
-                )
-                conn.commit()  # Commit the failed login log before raising exception
-                raise HTTPException(
-                    status_code=status.HTTP_423_LOCKED,
-                    detail="Account is temporarily locked due to too many failed attempts"
-                )
-            
-            # Check if account is active
-            if not is_active:
-                log_activity(
-                    conn=conn, 
-                    user_id=user_id, 
-                    username=username, 
-                    action="login_attempt_inactive", 
-                    resource="auth", 
-                    details="Account is inactive", 
-                    severity="medium", 
-                    module="auth", 
-                    status="failed"
-                )
-                conn.commit()  # Commit the failed login log before raising exception
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Account is inactive"
-                )
-            
-            # Verify password
-            if not password_hash or not verify_password(login_request.password, password_hash):
-                # Increment failed login attempts
-                new_failed_attempts = (failed_attempts or 0) + 1
-                locked_until_time = None
-                
-                if new_failed_attempts >= MAX_FAILED_ATTEMPTS:
-                    locked_until_time = datetime.now() + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
-                
-                cursor.execute("""
-                    UPDATE users 
-                    SET failed_login_attempts = ?, account_locked_until = ?
-                    WHERE id = ?
-                """, new_failed_attempts, locked_until_time, user_id)
-                conn.commit()
-                
-                log_activity(
-                    conn=conn, 
-                    user_id=user_id, 
-                    username=username, 
-                    action="failed_login", 
-                    resource="auth", 
-                    details=f"Invalid password (attempt {new_failed_attempts})", 
-                    severity="high" if new_failed_attempts >= MAX_FAILED_ATTEMPTS else "medium", 
-                    module="auth", 
-                    status="failed"
-                )
-                conn.commit()  # Commit the failed login log before raising exception
-                
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid username or password"
-                )
-            
-            # Reset failed login attempts on successful login
-            cursor.execute("""
-                UPDATE users 
-                SET failed_login_attempts = 0, account_locked_until = NULL, last_login = GETDATE()
-                WHERE id = ?
-            """, user_id)
-            
-            # Get user permissions
-            cursor.execute("""
-                SELECT DISTINCT p.name
-                FROM permissions p
-                INNER JOIN role_permissions rp ON p.id = rp.permission_id
-                INNER JOIN user_roles ur ON rp.role_id = ur.role_id
-                WHERE ur.user_id = ?
-            """, user_id)
-            
-            permissions = [row[0] for row in cursor.fetchall()]
-            
-            # Create JWT tokens
-            token_data = {
-                "sub": str(user_id),  # Convert to string for JWT compliance
-                "username": username,
-                "permissions": permissions
-            }
-            
-            access_token = create_access_token(token_data)
-            refresh_token = create_refresh_token({"sub": str(user_id), "username": username})
-            
-            # Log successful login
+        user_row, roles = await find_login_user(login_request.username)
+        await checkpoint()
+        
+        # bcrypt runs on the password executor; no DB thread or connection is held meanwhile
+        valid, new_password_hash = await verify_password_async(login_request.password, user_row[4])
+        if not valid:
+            await record_failed_login(user_row)
+        
+        return await complete_login(user_row, roles, new_password_hash)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Authentication error: {str(e)}")
+
+@offload_db()
+def find_login_user(username_or_email: str):
+    """
+    Load the account and its roles for a login attempt in one round trip,
+    rejecting unknown, locked and inactive accounts
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Get user with password hash, and the roles of every matching user
+        cursor.execute("""
+            SELECT id, username, email, full_name, password_hash, is_active, 
+                   failed_login_attempts, account_locked_until, created_at
+            FROM users 
+            WHERE username = ? OR email = ?;
+            
+            SELECT ur.user_id, r.id, r.name, r.display_name, r.description, r.is_active, r.created_at, r.updated_at
+            FROM roles r
+            INNER JOIN user_roles ur ON r.id = ur.role_id
+            INNER JOIN users u ON u.id = ur.user_id
+            WHERE u.username = ? OR u.email = ?
+            ORDER BY ur.user_id, r.id;
+        """, username_or_email, username_or_email, username_or_email, username_or_email)
+        
+        user_row = cursor.fetchone()
+        cursor.nextset()
+        role_rows = cursor.fetchall()
+        if not user_row:
+            # Log failed login attempt
+            log_activity(
+                conn=conn, 
+                username=username_or_email, 
+                action="failed_login", 
+                resource="auth", 
+                details="User not found", 
+                severity="medium", 
+                module="auth", 
+                status="failed"
+            )
+            conn.commit()  # Commit the failed login log before raising exception
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid username or password"
+            )
+        
+        user_id, username, email, full_name, password_hash, is_active, failed_attempts, locked_until, created_at = user_row
+        
+        # Check if account is locked
+        if locked_until and datetime.now() < locked_until:
             log_activity(
                 conn=conn, 
                 user_id=user_id, 
                 username=username, 
-                action="user_login", 
+                action="login_attempt_locked", 
                 resource="auth", 
-                details="User logged in successfully", 
-                severity="info", 
+                details="Account is locked", 
+                severity="high", 
                 module="auth", 
-                status="success"
+                status="failed"
             )
-            
-            conn.commit()
-            
-            # Get user data for response
-            user_data = await get_user(user_id)
-            
-            return LoginResponse(
-                access_token=access_token,
-                refresh_token=refresh_token,
-                token_type="bearer",
-                expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-                user=user_data
+            conn.commit()  # Commit the failed login log before raising exception
+            raise HTTPException(
+                status_code=status.HTTP_423_LOCKED,
+                detail="Account is temporarily locked due to too many failed attempts"
             )
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Authentication error: {str(e)}")
+        
+        # Check if account is active
+        if not is_active:
+            log_activity(
+                conn=conn, 
+                user_id=user_id, 
+                username=username, 
+                action="login_attempt_inactive", 
+                resource="auth", 
+                details="Account is inactive", 
+                severity="medium", 
+                module="auth", 
+                status="failed"
+            )
+            conn.commit()  # Commit the failed login log before raising exception
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Account is inactive"
+            )
+        
+        roles = [role_from_row(row[1:]) for row in role_rows if row[0] == user_id]
+        return user_row, roles
+
+@offload_db()
+def record_failed_login(user_row):
+    """Count a wrong password against the account, locking it at MAX_FAILED_ATTEMPTS"""
+    user_id, username = user_row[0], user_row[1]
+    locked_until_time = datetime.now() + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Increment in the UPDATE itself so concurrent failures are all counted
+        cursor.execute("""
+            UPDATE users 
+            SET failed_login_attempts = COALESCE(failed_login_attempts, 0) + 1,
+                account_locked_until = CASE
+                    WHEN COALESCE(failed_login_attempts, 0) + 1 >= ? THEN ? ELSE NULL
+                END
+            OUTPUT INSERTED.failed_login_attempts
+            WHERE id = ?
+        """, MAX_FAILED_ATTEMPTS, locked_until_time, user_id)
+        new_failed_attempts = cursor.fetchone()[0]
+        
+        log_activity(
+            conn=conn, 
+            user_id=user_id, 
+            username=username, 
+            action="failed_login", 
+            resource="auth", 
+            details=f"Invalid password (attempt {new_failed_attempts})", 
+            severity="high" if new_failed_attempts >= MAX_FAILED_ATTEMPTS else "medium", 
+            module="auth", 
+            status="failed"
+        )
+        conn.commit()  # Commit the failed login log before raising exception
+    
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid username or password"
+    )
+
+@offload_db()
+def complete_login(user_row, roles: List[RoleResponse], new_password_hash: Optional[str] = None) -> LoginResponse:
+    """Record a successful login and issue tokens, reusing the data find_login_user loaded"""
+    user_id, username, email, full_name, _, is_active, _, _, created_at = user_row
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Reset failed login attempts on successful login, upgrading an outdated hash if needed
+        cursor.execute("""
+            UPDATE users 
+            SET failed_login_attempts = 0, account_locked_until = NULL, last_login = GETDATE(),
+                password_hash = COALESCE(?, password_hash)
+            OUTPUT INSERTED.last_login
+            WHERE id = ?
+        """, new_password_hash, user_id)
+        last_login = cursor.fetchone()[0]
+        
+        # Get user permissions
+        permissions = rbac.snapshot(cursor).user_permissions(user_id)
+        
+        # Create JWT tokens
+        token_data = {
+            "sub": str(user_id),  # Convert to string for JWT compliance
+            "username": username,
+            "permissions": permissions
+        }
+        
+        access_token = create_access_token(token_data)
+        refresh_token = create_refresh_token({"sub": str(user_id), "username": username})
+        
+        # Log successful login
+        log_activity(
+            conn=conn, 
+            user_id=user_id, 
+            username=username, 
+            action="user_login", 
+            resource="auth", 
+            details="User logged in successfully", 
+            severity="info", 
+            module="auth", 
+            status="success"
+        )
+        
+        conn.commit()
+        
+        user_data = UserResponse(
+            id=user_id,
+            username=username,
+            email=email,
+            full_name=full_name,
+            is_active=bool(is_active),
+            created_at=created_at,
+            last_login=last_login,
+            roles=roles,
+            permissions=permissions
+        )
+        
+        return LoginResponse(
+            access_token=access_token,
+            refresh_token=refresh_token,
+            token_type="bearer",
+            expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            user=user_data
+        )
 
 @app.post("/api/auth/refresh")
-async def refresh_token(refresh_request: RefreshTokenRequest):
+@offload_db()
+def refresh_token(refresh_request: RefreshTokenRequest):
     """Refresh access token using refresh token"""
     try:
         payload = verify_token(refresh_request.refresh_token, "refresh")
@@ -796,18 +1025,8 @@ async def refresh_token(refresh_request: RefreshTokenRequest):
                 detail="Invalid user ID in refresh token"
             )
         
-        # Get current user permissions
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT p.name
-                FROM permissions p
-                INNER JOIN role_permissions rp ON p.id = rp.permission_id
-                INNER JOIN user_roles ur ON rp.role_id = ur.role_id
-                WHERE ur.user_id = ?
-            """, user_id)
-            
-            permissions = [row[0] for row in cursor.fetchall()]
+        # Get current user permissions (no database round trip while the snapshot is fresh)
+        permissions = rbac.snapshot().user_permissions(user_id)
         
         # Create new access token
         token_data = {
@@ -828,7 +1047,8 @@ async def refresh_token(refresh_request: RefreshTokenRequest):
         raise HTTPException(status_code=500, detail=f"Token refresh error: {str(e)}")
 
 @app.post("/api/auth/logout")
-async def logout(current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def logout(current_user: dict = Depends(get_current_active_user)):
     """Logout user (client should discard tokens)"""
     try:
         with get_db_connection() as conn:
@@ -851,7 +1071,7 @@ async def logout(current_user: dict = Depends(get_current_active_user)):
 @app.get("/api/auth/me", response_model=UserResponse)
 async def get_current_user_info(current_user: dict = Depends(get_current_active_user)):
     """Get current authenticated user information"""
-    return await get_user(current_user["id"])
+    return await run_db(load_user, current_user["id"])
 
 @app.post("/api/auth/change-password")
 async def change_password(
@@ -860,69 +1080,92 @@ async def change_password(
 ):
     """Change user's own password"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get current password hash
-            cursor.execute("SELECT password_hash FROM users WHERE id = ?", current_user["id"])
-            row = cursor.fetchone()
-            if not row or not row[0]:
-                raise HTTPException(status_code=400, detail="No password set for this user")
-            
-            # Verify current password
-            if not verify_password(password_request.current_password, row[0]):
-                log_activity(
-                    conn=conn, 
-                    user_id=current_user["id"], 
-                    username=current_user["username"], 
-                    action="password_change_failed", 
-                    resource="auth", 
-                    details="Invalid current password", 
-                    severity="medium", 
-                    module="auth", 
-                    status="failed"
-                )
-                raise HTTPException(status_code=400, detail="Invalid current password")
-            
-            # Update password
-            new_password_hash = get_password_hash(password_request.new_password)
-            cursor.execute("""
-                UPDATE users SET password_hash = ? WHERE id = ?
-            """, new_password_hash, current_user["id"])
-            
-            conn.commit()
-            
-            log_activity(
-                conn=conn, 
-                user_id=current_user["id"], 
-                username=current_user["username"], 
-                action="password_changed", 
-                resource="auth", 
-                details="User changed their password", 
-                severity="medium", 
-                module="auth", 
-                status="success"
-            )
-            
-            return {"message": "Password changed successfully"}
-            
+        current_hash = await load_password_hash(current_user["id"])
+        await checkpoint()
+        
+        # Verify current password, then hash the new one, on the password executor
+        valid, _ = await verify_password_async(password_request.current_password, current_hash)
+        if not valid:
+            await record_failed_password_change(current_user)
+        new_password_hash = await hash_password_async(password_request.new_password)
+        
+        return await save_changed_password(current_user, new_password_hash)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Password change error: {str(e)}")
 
+@offload_db()
+def load_password_hash(user_id: int) -> str:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT password_hash FROM users WHERE id = ?", user_id)
+        row = cursor.fetchone()
+        if not row or not row[0]:
+            raise HTTPException(status_code=400, detail="No password set for this user")
+        return row[0]
+
+@offload_db()
+def record_failed_password_change(current_user: dict):
+    with get_db_connection() as conn:
+        log_activity(
+            conn=conn, 
+            user_id=current_user["id"], 
+            username=current_user["username"], 
+            action="password_change_failed", 
+            resource="auth", 
+            details="Invalid current password", 
+            severity="medium", 
+            module="auth", 
+            status="failed"
+        )
+        conn.commit()
+    raise HTTPException(status_code=400, detail="Invalid current password")
+
+@offload_db()
+def save_changed_password(current_user: dict, new_password_hash: str):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Update password
+        cursor.execute("""
+            UPDATE users SET password_hash = ? WHERE id = ?
+        """, new_password_hash, current_user["id"])
+        
+        log_activity(
+            conn=conn, 
+            user_id=current_user["id"], 
+            username=current_user["username"], 
+            action="password_changed", 
+            resource="auth", 
+            details="User changed their password", 
+            severity="medium", 
+            module="auth", 
+            status="success"
+        )
+        
+        conn.commit()
+        
+        return {"message": "Password changed successfully"}
+
 @app.post("/api/auth/admin/reset-password")
 async def admin_reset_password(
     reset_request: AdminPasswordResetRequest,
     current_user: dict = Depends(require_admin())
 ):
     """Admin endpoint to reset user password"""
+    # Hash on the password executor before borrowing a DB thread and connection
+    new_password_hash = await hash_password_async(reset_request.new_password)
+    return await save_reset_password(reset_request.user_id, new_password_hash, current_user)
+
+@offload_db()
+def save_reset_password(user_id: int, new_password_hash: str, current_user: dict):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
             # Check if target user exists
-            cursor.execute("SELECT username FROM users WHERE id = ?", reset_request.user_id)
+            cursor.execute("SELECT username FROM users WHERE id = ?", user_id)
             user_row = cursor.fetchone()
             if not user_row:
                 raise HTTPException(status_code=404, detail="User not found")
@@ -930,14 +1173,11 @@ async def admin_reset_password(
             target_username = user_row[0]
             
             # Update password
-            new_password_hash = get_password_hash(reset_request.new_password)
             cursor.execute("""
                 UPDATE users 
                 SET password_hash = ?, failed_login_attempts = 0, account_locked_until = NULL
                 WHERE id = ?
-            """, new_password_hash, reset_request.user_id)
-            
-            conn.commit()
+            """, new_password_hash, user_id)
             
             log_activity(
                 conn=conn, 
@@ -951,6 +1191,8 @@ async def admin_reset_password(
                 status="success"
             )
             
+            conn.commit()
+            
             return {"message": f"Password reset successfully for user {target_username}"}
             
     except HTTPException:
@@ -962,35 +1204,42 @@ async def admin_reset_password(
 # UPDATED USER MANAGEMENT ENDPOINTS
 # ============================================================================
 
-@app.get("/api/users", response_model=List[UserResponse])
-async def get_users(
+@app.get("/api/users", response_model=Union[List[UserResponse], UserPage])
+@offload_db()
+def get_users(
     skip: int = 0,
     limit: int = Query(default=100, le=1000),
-    active_only: bool = False
+    active_only: bool = False,
+    page_cursor: Annotated[Optional[str], Query(alias="cursor")] = None
 ):
+    # Passing `cursor` ("" for the first page) switches to keyset pagination
+    where_conditions = []
+    params = []
+    if active_only:
+        where_conditions.append("is_active = 1")
+    page_sql = paginate(where_conditions, params, page_cursor, skip, limit,
+                        order_by="created_at DESC", key_columns=["created_at", "id"], descending=True)
+    
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id, username, email, full_name, is_active, created_at, last_login
+                FROM users 
+                {where_clause(where_conditions)}
+                {page_sql}
+            """, params)
             
-            if active_only:
-                cursor.execute("""
-                    SELECT id, username, email, full_name, is_active, created_at, last_login
-                    FROM users 
-                    WHERE is_active = 1
-                    ORDER BY created_at DESC
-                    OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
-                """, skip, limit)
-            else:
-                cursor.execute("""
-                    SELECT id, username, email, full_name, is_active, created_at, last_login
-                    FROM users 
-                    ORDER BY created_at DESC
-                    OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
-                """, skip, limit)
+            user_rows = cursor.fetchall()
+            if page_cursor is not None:
+                user_rows, next_page = next_cursor(user_rows, limit, key=lambda row: (row[5], row[0]))
+            
+            # Get roles for every user on the page in one query
+            roles = load_user_roles(cursor, [row[0] for row in user_rows])
             
             users = []
-            for row in cursor.fetchall():
-                user = UserResponse(
+            for row in user_rows:
+                users.append(UserResponse(
                     id=row[0],
                     username=row[1],
                     email=row[2],
@@ -998,39 +1247,17 @@ async def get_users(
                     is_active=bool(row[4]),
                     created_at=row[5],
                     last_login=row[6],
-                    roles=[]
-                )
-                
-                # Get roles for this user
-                cursor.execute("""
-                    SELECT r.id, r.name, r.display_name, r.description, r.is_active, r.created_at, r.updated_at
-                    FROM roles r
-                    INNER JOIN user_roles ur ON r.id = ur.role_id
-                    WHERE ur.user_id = ?
-                """, row[0])
-                
-                roles = []
-                for role_row in cursor.fetchall():
-                    roles.append(RoleResponse(
-                        id=role_row[0],
-                        name=role_row[1],
-                        display_name=role_row[2],
-                        description=role_row[3],
-                        is_active=bool(role_row[4]),
-                        created_at=role_row[5],
-                        updated_at=role_row[6],
-                        permissions=[]
-                    ))
-                
-                user.roles = roles
-                users.append(user)
+                    roles=roles[row[0]]
+                ))
             
+            if page_cursor is not None:
+                return UserPage(items=users, next_cursor=next_page)
             return users
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@app.get("/api/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int):
+def load_user(user_id: int) -> UserResponse:
+    """Load a user with roles and effective permissions (blocking; call from the DB executor)"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -1056,46 +1283,28 @@ async def get_user(user_id: int):
             )
             
             # Get roles for this user
-            cursor.execute("""
-                SELECT r.id, r.name, r.display_name, r.description, r.is_active, r.created_at, r.updated_at
-                FROM roles r
-                INNER JOIN user_roles ur ON r.id = ur.role_id
-                WHERE ur.user_id = ?
-            """, user_id)
-            
-            roles = []
-            for role_row in cursor.fetchall():
-                roles.append(RoleResponse(
-                    id=role_row[0],
-                    name=role_row[1],
-                    display_name=role_row[2],
-                    description=role_row[3],
-                    is_active=bool(role_row[4]),
-                    created_at=role_row[5],
-                    updated_at=role_row[6],
-                    permissions=[]
-                ))
-            
-            user.roles = roles
+            user.roles = load_user_roles(cursor, [user_id])[user_id]
             
             # Get user permissions
-            cursor.execute("""
-                SELECT DISTINCT p.name
-                FROM permissions p
-                INNER JOIN role_permissions rp ON p.id = rp.permission_id
-                INNER JOIN user_roles ur ON rp.role_id = ur.role_id
-                WHERE ur.user_id = ?
-            """, user_id)
-            
-            permissions = [row[0] for row in cursor.fetchall()]
-            user.permissions = permissions
+            user.permissions = rbac.snapshot(cursor).user_permissions(user_id)
             
             return user
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@app.get("/api/users/{user_id}", response_model=UserResponse)
+@offload_db()
+def get_user(user_id: int):
+    return load_user(user_id)
+
 @app.post("/api/users", response_model=UserResponse)
 async def create_user(user: UserCreateWithPassword, current_user: dict = Depends(get_current_active_user)):
+    # Hash on the password executor before borrowing a DB thread and connection
+    password_hash = await hash_password_async(user.password)
+    return await insert_user(user, password_hash, current_user)
+
+@offload_db()
+def insert_user(user: UserCreateWithPassword, password_hash: str, current_user: dict) -> UserResponse:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -1105,9 +1314,6 @@ async def create_user(user: UserCreateWithPassword, current_user: dict = Depends
             if cursor.fetchone()[0] > 0:
                 raise HTTPException(status_code=400, detail="Username or email already exists")
             
-            # Hash password
-            password_hash = get_password_hash(user.password)
-            
             # Insert new user
             cursor.execute("""
                 INSERT INTO users (username, email, full_name, is_active, password_hash)
@@ -1127,8 +1333,6 @@ async def create_user(user: UserCreateWithPassword, current_user: dict = Depends
                         VALUES (?, ?)
                     """, user_id, role_id)
             
-            conn.commit()
-            
             # Log the action with severity
             severity = "high" if any(role_id in [1] for role_id in (user.role_ids or [])) else "medium"  # Admin role creation is high severity
             log_activity(
@@ -1143,6 +1347,16 @@ async def create_user(user: UserCreateWithPassword, current_user: dict = Depends
                 status="success"
             )
             
+            if user.role_ids:
+                bump_catalogs(cursor, USER_ROLES)
+            conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
+            after_commit(lambda: dashboard_summary.user_created(user.is_active))
+            after_commit(lambda: user_index.add(
+                user_id, user.username, user.email, user.full_name, is_active=user.is_active
+            ))
+            
             return UserResponse(
                 id=row[0],
                 username=row[1],
@@ -1156,8 +1370,155 @@ async def create_user(user: UserCreateWithPassword, current_user: dict = Depends
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@app.post("/api/users/bulk", response_model=BulkImportReport)
+async def bulk_import_users(
+    request: Request,
+    format: Optional[str] = None,
+    current_user: dict = Depends(require_permission("data.import"))
+):
+    # The body is CSV or NDJSON (see bulk_import.py), not JSON; each row gets a
+    # result, and rows that fail validation do not stop the others
+    upload = upload_format(request.headers.get("content-type"), format)
+    text = await read_upload(request.stream())
+    rows, results = await check_import_rows(text, upload)
+
+    # Hash in parallel on the import pool, apart from logins, without holding a connection
+    await checkpoint()
+    password_hashes = await asyncio.gather(*(
+        hash_password_async(item.user.password, executor=bulk_hash_executor) for item in rows
+    ))
+
+    if rows:
+        results += await insert_imported_users(rows, password_hashes, current_user)
+    results.sort(key=lambda result: result.row)
+    created = sum(1 for result in results if result.status == CREATED)
+    return BulkImportReport(total=len(results), created=created, failed=len(results) - created, results=results)
+
+@offload_db()
+def check_import_rows(text: str, upload: str):
+    """Parse and validate an import, and set aside rows whose username or email is taken"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            rows, results = parse_upload(text, upload, known_role_ids=rbac.snapshot(cursor).roles)
+            if not rows:
+                return rows, results
+
+            # One query for the whole file, whatever its size
+            cursor.execute("""
+                SELECT username, email FROM users
+                WHERE username IN (SELECT value FROM OPENJSON(?))
+                   OR email IN (SELECT value FROM OPENJSON(?))
+            """, json.dumps([item.user.username for item in rows]), json.dumps([item.user.email for item in rows]))
+            taken = set()
+            for username, email in cursor.fetchall():
+                taken.update((username.casefold(), email.casefold()))
+
+            new_rows = []
+            for item in rows:
+                if item.user.username.casefold() in taken or item.user.email.casefold() in taken:
+                    results.append(BulkImportRowResult(
+                        row=item.row, username=item.user.username, status=EXISTS,
+                        error="Username or email already exists"
+                    ))
+                else:
+                    new_rows.append(item)
+            return new_rows, results
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@offload_db(timeout=None)
+def insert_imported_users(rows: List[ImportRow], password_hashes: List[str], current_user: dict) -> List[BulkImportRowResult]:
+    """Insert validated import rows and their roles chunk by chunk, in one transaction"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                IF OBJECT_ID('tempdb..#bulk_users') IS NOT NULL DROP TABLE #bulk_users;
+                CREATE TABLE #bulk_users (
+                    row_number INT PRIMARY KEY,
+                    username NVARCHAR(50) COLLATE DATABASE_DEFAULT NOT NULL,
+                    email NVARCHAR(100) COLLATE DATABASE_DEFAULT NOT NULL,
+                    full_name NVARCHAR(100) COLLATE DATABASE_DEFAULT NOT NULL,
+                    is_active BIT NOT NULL,
+                    password_hash NVARCHAR(255) NOT NULL
+                );
+            """)
+            cursor.fast_executemany = True
+
+            results, created = [], []
+            for start in range(0, len(rows), BULK_IMPORT_CHUNK_SIZE):
+                chunk = rows[start:start + BULK_IMPORT_CHUNK_SIZE]
+                hashes = password_hashes[start:start + BULK_IMPORT_CHUNK_SIZE]
+                cursor.execute("TRUNCATE TABLE #bulk_users")
+                cursor.executemany(
+                    "INSERT INTO #bulk_users (row_number, username, email, full_name, is_active, password_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(item.row, item.user.username, item.user.email, item.user.full_name, item.user.is_active, password_hash)
+                     for item, password_hash in zip(chunk, hashes)]
+                )
+                # Rechecked here: the username or email may have been taken since the file was checked
+                cursor.execute("""
+                    INSERT INTO users (username, email, full_name, is_active, password_hash)
+                    OUTPUT INSERTED.id, INSERTED.username
+                    SELECT b.username, b.email, b.full_name, b.is_active, b.password_hash
+                    FROM #bulk_users b
+                    WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.username = b.username OR u.email = b.email)
+                """)
+                user_ids = {username.casefold(): user_id for user_id, username in cursor.fetchall()}
+
+                assignments = []
+                for item in chunk:
+                    user_id = user_ids.get(item.user.username.casefold())
+                    if user_id is None:
+                        results.append(BulkImportRowResult(
+                            row=item.row, username=item.user.username, status=EXISTS,
+                            error="Username or email already exists"
+                        ))
+                        continue
+                    results.append(BulkImportRowResult(
+                        row=item.row, username=item.user.username, status=CREATED, user_id=user_id
+                    ))
+                    created.append((user_id, item.user))
+                    assignments.extend((user_id, role_id) for role_id in item.user.role_ids or [])
+                if assignments:
+                    cursor.executemany("INSERT INTO user_roles (user_id, role_id) VALUES (?, ?)", assignments)
+            cursor.execute("DROP TABLE #bulk_users")
+
+            with_roles = any(user.role_ids for _, user in created)
+            log_activity(
+                conn=conn,
+                user_id=current_user.get("sub"),
+                username=current_user.get("username"),
+                action="bulk_import_users",
+                resource="users",
+                details=f"Imported {len(created)} users ({len(rows) - len(created)} already existed)",
+                severity="high" if any(1 in (user.role_ids or []) for _, user in created) else "medium",
+                module="user_management",
+                status="success"
+            )
+
+            if with_roles:
+                bump_catalogs(cursor, USER_ROLES)
+            conn.commit()
+            if with_roles:
+                rbac.changed()
+                after_commit(catalog_versions.invalidate)
+
+            def imported():
+                for user_id, user in created:
+                    dashboard_summary.user_created(user.is_active)
+                    user_index.add(user_id, user.username, user.email, user.full_name, is_active=user.is_active)
+            after_commit(imported)
+            return results
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 @app.put("/api/users/{user_id}", response_model=UserResponse)
-async def update_user(user_id: int, user_update: UserUpdate, current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def update_user(user_id: int, user_update: UserUpdate, current_user: dict = Depends(get_current_active_user)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -1203,19 +1564,11 @@ async def update_user(user_id: int, user_update: UserUpdate, current_user: dict
             # Update roles if provided
             role_changes = []
             if user_update.role_ids is not None:
-                # Get current roles for logging
-                cursor.execute("SELECT role_id FROM user_roles WHERE user_id = ?", user_id)
-                old_role_ids = [row[0] for row in cursor.fetchall()]
-                
-                cursor.execute("DELETE FROM user_roles WHERE user_id = ?", user_id)
-                for role_id in user_update.role_ids:
-                    cursor.execute("""
-                        INSERT INTO user_roles (user_id, role_id)
-                        VALUES (?, ?)
-                    """, user_id, role_id)
-                
-                if set(old_role_ids) != set(user_update.role_ids):
-                    role_changes.append(f"roles: {old_role_ids} -> {user_update.role_ids}")
+                added, removed = sync_links(cursor, "user_roles", "user_id", user_id, "role_id", user_update.role_ids)
+                if added:
+                    role_changes.append(f"roles added: {added}")
+                if removed:
+                    role_changes.append(f"roles removed: {removed}")
             
             # Log the action with the actual user who performed the update
             if changes or role_changes:
@@ -1234,26 +1587,37 @@ async def update_user(user_id: int, user_update: UserUpdate, current_user: dict
                     status="success"
                 )
             
+            if role_changes:
+                bump_catalogs(cursor, USER_ROLES)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
+            if user_update.is_active is not None and user_update.is_active != old_is_active:
+                after_commit(lambda: dashboard_summary.user_activation_changed(user_update.is_active))
+            after_commit(lambda: user_index.update(
+                user_id, username=user_update.username, email=user_update.email,
+                full_name=user_update.full_name, is_active=user_update.is_active
+            ))
             
             # Return updated user
-            return await get_user(user_id)
+            return load_user(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.delete("/api/users/{user_id}")
-async def delete_user(user_id: int, current_user: dict = Depends(get_current_active_user)):
+@offload_db()
+def delete_user(user_id: int, current_user: dict = Depends(get_current_active_user)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
             # Get user info before deletion
-            cursor.execute("SELECT username, full_name FROM users WHERE id = ?", user_id)
+            cursor.execute("SELECT username, full_name, is_active FROM users WHERE id = ?", user_id)
             user_row = cursor.fetchone()
             if not user_row:
                 raise HTTPException(status_code=404, detail="User not found")
             
-            target_username, target_full_name = user_row
+            target_username, target_full_name, was_active = user_row
             
             # Delete user (cascade will handle user_roles)
             cursor.execute("DELETE FROM users WHERE id = ?", user_id)
@@ -1272,7 +1636,12 @@ async def delete_user(user_id: int, current_user: dict = Depends(get_current_act
                 status="success"
             )
             
+            bump_catalogs(cursor, USER_ROLES)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
+            after_commit(lambda: dashboard_summary.user_deleted(bool(was_active)))
+            after_commit(lambda: user_index.remove(user_id))
             
             return {"message": f"User {target_username} deleted successfully"}
     except Exception as e:
@@ -1284,32 +1653,12 @@ async def delete_user(user_id: int, current_user: dict = Depends(get_current_act
 
 @app.get("/api/dashboard/summary", response_model=DashboardSummary)
 async def get_dashboard_summary():
+    # Served from in-memory counters; last_updated is when they were last
+    # reconciled with the database
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get user statistics
-            cursor.execute("SELECT COUNT(*) FROM users")
-            total_users = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM users WHERE is_active = 1")
-            active_users = cursor.fetchone()[0]
-            
-            # Get log statistics
-            cursor.execute("SELECT COUNT(*) FROM audit2_logs")
-            total_logs = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM audit2_logs WHERE timestamp >= DATEADD(day, -7, GETDATE())")
-            recent_logs = cursor.fetchone()[0]
-            
-            return DashboardSummary(
-                total_users=total_users,
-                active_users=active_users,
-                total_logs=total_logs,
-                recent_logs=recent_logs,
-                system_health="healthy",
-                last_updated=datetime.now()
-            )
+        if not dashboard_summary.seeded:
+            await run_db(dashboard_summary.reconcile)
+        return DashboardSummary(system_health="healthy", **dashboard_summary.summary())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -1319,7 +1668,8 @@ async def get_dashboard_summary():
 
 # Force reinitialize with comprehensive permissions
 @app.post("/api/force-init-permissions")
-async def force_init_permissions():
+@offload_db()
+def force_init_permissions():
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -1462,7 +1812,10 @@ async def force_init_permissions():
                                 VALUES (?, ?)
                             """, user_id, existing_roles[role_name])
             
+            bump_catalogs(cursor, *CATALOGS)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
             return {"message": "Comprehensive permissions initialized successfully", "permissions_count": len(sample_permissions)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -1471,8 +1824,40 @@ async def force_init_permissions():
 # ARCH MODULE ENDPOINTS
 # ============================================================================
 
+ARCH_USER_COLUMNS = """
+    u.id, u.username, u.email, u.full_name, u.is_active, 
+    u.created_at, u.last_login,
+    COALESCE(u.department, 'Not Specified') as department,
+    COALESCE(u.position, 'Not Specified') as position,
+    COALESCE(u.phone, '') as phone
+"""
+
+def search_user_ids(
+    cursor, query: str, role: Optional[str], status: Optional[str], department: Optional[str],
+    skip: int, limit: int
+) -> List[int]:
+    """One page of ranked user ids matching `query`, answered from the in-memory index"""
+    user_index.ensure_loaded()
+    matches = user_index.search(query)
+    
+    if role:
+        snapshot = rbac.snapshot(cursor)
+        matches = [
+            entry for entry in matches
+            if any(snapshot.roles[role_id].name == role for role_id in snapshot.user_roles.get(entry.id, ()))
+        ]
+    if status == "active":
+        matches = [entry for entry in matches if entry.is_active]
+    elif status == "inactive":
+        matches = [entry for entry in matches if not entry.is_active]
+    if department:
+        matches = [entry for entry in matches if (entry.department or "").lower() == department.lower()]
+    
+    return [entry.id for entry in matches[skip:skip + limit]]
+
 @app.get("/api/arch/users")
-async def search_all_users(
+@offload_db()
+def search_all_users(
     query: Optional[str] = None,
     role: Optional[str] = None,
     status: Optional[str] = None,
@@ -1484,74 +1869,61 @@ async def search_all_users(
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Build the base query
-            base_query = """
-                SELECT DISTINCT u.id, u.username, u.email, u.full_name, u.is_active, 
-                       u.created_at, u.last_login,
-                       COALESCE(u.department, 'Not Specified') as department,
-                       COALESCE(u.position, 'Not Specified') as position,
-                       COALESCE(u.phone, '') as phone
-                FROM users u
-                LEFT JOIN user_roles ur ON u.id = ur.user_id
-                LEFT JOIN roles r ON ur.role_id = r.id
-                WHERE 1=1
-            """
-            
-            params = []
-            
-            # Add search query filter
-            if query:
-                base_query += " AND (u.full_name LIKE ? OR u.username LIKE ? OR u.email LIKE ? OR u.department LIKE ?)"
-                search_param = f"%{query}%"
-                params.extend([search_param, search_param, search_param, search_param])
-            
-            # Add role filter
-            if role:
-                base_query += " AND r.name = ?"
-                params.append(role)
-            
-            # Add status filter
-            if status:
-                if status == "active":
-                    base_query += " AND u.is_active = 1"
-                elif status == "inactive":
-                    base_query += " AND u.is_active = 0"
-            
-            # Add department filter
-            if department:
-                base_query += " AND u.department = ?"
-                params.append(department)
-            
-            base_query += " ORDER BY u.full_name OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
-            params.extend([skip, limit])
+            if query and query.strip():
+                # Matching and ranking happen in memory; the database only hydrates the page
+                page_ids = search_user_ids(cursor, query, role, status, department, skip, limit)
+                users_data = []
+                if page_ids:
+                    placeholders = ", ".join("?" for _ in page_ids)
+                    cursor.execute(f"SELECT {ARCH_USER_COLUMNS} FROM users u WHERE u.id IN ({placeholders})", *page_ids)
+                    rows_by_id = {row[0]: row for row in cursor.fetchall()}
+                    users_data = [rows_by_id[user_id] for user_id in page_ids if user_id in rows_by_id]
+            else:
+                # Build the base query
+                # Roles are matched with EXISTS so users with several roles are not
+                # multiplied (and then DISTINCT-ed) before pagination
+                base_query = f"""
+                    SELECT {ARCH_USER_COLUMNS}
+                    FROM users u
+                    WHERE 1=1
+                """
+                
+                params = []
+                
+                # Add role filter
+                if role:
+                    base_query += """ AND EXISTS (
+                        SELECT 1 FROM user_roles ur
+                        INNER JOIN roles r ON ur.role_id = r.id
+                        WHERE ur.user_id = u.id AND r.name = ?
+                    )"""
+                    params.append(role)
+                
+                # Add status filter
+                if status:
+                    if status == "active":
+                        base_query += " AND u.is_active = 1"
+                    elif status == "inactive":
+                        base_query += " AND u.is_active = 0"
+                
+                # Add department filter
+                if department:
+                    base_query += " AND u.department = ?"
+                    params.append(department)
+                
+                base_query += " ORDER BY u.full_name, u.id OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+                params.extend([skip, limit])
+                
+                cursor.execute(base_query, *params)
+                users_data = cursor.fetchall()
             
-            cursor.execute(base_query, *params)
-            users_data = cursor.fetchall()
+            # Get roles for every user on the page in one query
+            user_roles = load_user_roles(cursor, [row[0] for row in users_data])
             
             users = []
             for user_row in users_data:
                 user_id = user_row[0]
-                
-                # Get user roles
-                cursor.execute("""
-                    SELECT r.id, r.name, r.display_name, r.description, r.is_active, r.created_at, r.updated_at
-                    FROM roles r
-                    INNER JOIN user_roles ur ON r.id = ur.role_id
-                    WHERE ur.user_id = ?
-                """, user_id)
-                
-                roles = []
-                for role_row in cursor.fetchall():
-                    roles.append({
-                        "id": role_row[0],
-                        "name": role_row[1],
-                        "display_name": role_row[2],
-                        "description": role_row[3],
-                        "is_active": bool(role_row[4]),
-                        "created_at": role_row[5],
-                        "updated_at": role_row[6],
-                        "permissions": []
-                    })
+                roles = [role.model_dump() for role in user_roles[user_id]]
                 
                 # Get report summary (mock data for now)
                 report_summary = {
@@ -1580,8 +1952,28 @@ async def search_all_users(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@app.get("/api/arch/users/suggest")
+async def suggest_users(query: str, limit: int = Query(default=10, le=50)):
+    # Typeahead is answered from the in-memory index without touching the database
+    try:
+        if not user_index.fresh:
+            await run_db(user_index.ensure_loaded)
+        return [
+            {
+                "id": entry.id,
+                "username": entry.username,
+                "full_name": entry.full_name,
+                "email": entry.email,
+                "department": entry.department
+            }
+            for entry in user_index.search(query)[:limit]
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 @app.get("/api/arch/users/{user_id}/profile")
-async def get_user_profile(user_id: int):
+@offload_db()
+def get_user_profile(user_id: int):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -1600,25 +1992,7 @@ async def get_user_profile(user_id: int):
                 raise HTTPException(status_code=404, detail="User not found")
             
             # Get user roles
-            cursor.execute("""
-                SELECT r.id, r.name, r.display_name, r.description, r.is_active, r.created_at, r.updated_at
-                FROM roles r
-                INNER JOIN user_roles ur ON r.id = ur.role_id
-                WHERE ur.user_id = ?
-            """, user_id)
-            
-            roles = []
-            for role_row in cursor.fetchall():
-                roles.append({
-                    "id": role_row[0],
-                    "name": role_row[1],
-                    "display_name": role_row[2],
-                    "description": role_row[3],
-                    "is_active": bool(role_row[4]),
-                    "created_at": role_row[5],
-                    "updated_at": role_row[6],
-                    "permissions": []
-                })
+            roles = [role.model_dump() for role in load_user_roles(cursor, [user_id])[user_id]]
             
             # Mock additional profile data
             profile = {
@@ -1660,7 +2034,8 @@ async def get_user_profile(user_id: int):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.get("/api/arch/users/{user_id}/reports")
-async def get_user_reports(user_id: int):
+@offload_db()
+def get_user_reports(user_id: int):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -1742,7 +2117,8 @@ async def get_user_reports(user_id: int):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.get("/api/arch/users/{user_id}/activity")
-async def get_user_activity(user_id: int, days: int = Query(default=30, le=365)):
+@offload_db()
+def get_user_activity(user_id: int, days: int = Query(default=30, le=365)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -1754,9 +2130,9 @@ async def get_user_activity(user_id: int, days: int = Query(default=30, le=365))
                 raise HTTPException(status_code=404, detail="User not found")
             
             # Get actual audit logs for the user
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT id, action, details, timestamp, status
-                FROM audit2_logs
+                FROM {log_source(days)}
                 WHERE user_id = ? AND timestamp >= DATEADD(day, -?, GETDATE())
                 ORDER BY timestamp DESC
             """, user_id, days)
@@ -1812,8 +2188,11 @@ async def get_user_activity(user_id: int, days: int = Query(default=30, le=365))
 # LOGGING MODULE ENDPOINTS
 # ============================================================================
 
+LOG_PAYLOAD_COLUMNS = "COALESCE(before_data, '') as before_data, COALESCE(after_data, '') as after_data"
+
 @app.get("/api/logs")
-async def get_logs(
+@offload_db()
+def get_logs(
     skip: int = 0,
     limit: int = Query(default=100, le=1000),
     severity: Optional[str] = None,
@@ -1821,8 +2200,15 @@ async def get_logs(
     username: Optional[str] = None,
     module: Optional[str] = None,
     days: int = Query(default=30, le=365),
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    q: Optional[str] = None,
+    include_payloads: bool = False,
+    page_cursor: Annotated[Optional[str], Query(alias="cursor")] = None
 ):
+    # Passing `cursor` ("" for the first page) switches to keyset pagination,
+    # which stays fast on deep pages where OFFSET has to skip every earlier row.
+    # before_data/after_data are only read with include_payloads; otherwise they
+    # are null and GET /api/logs/{log_id} returns them for a single entry.
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -1835,19 +2221,29 @@ async def get_logs(
                 where_conditions.append("severity = ?")
                 params.append(severity)
             if action:
-                where_conditions.append("action LIKE ?")
-                params.append(f"%{action}%")
+                condition, condition_params = substring_condition("action", FIELD_ACTION, action)
+                where_conditions.append(condition)
+                params.extend(condition_params)
             if username:
-                where_conditions.append("username LIKE ?")
-                params.append(f"%{username}%")
+                condition, condition_params = substring_condition("username", FIELD_USERNAME, username)
+                where_conditions.append(condition)
+                params.extend(condition_params)
             if module:
                 where_conditions.append("module = ?")
                 params.append(module)
             if status:
                 where_conditions.append("status = ?")
                 params.append(status)
-            
-            params.extend([skip, limit])
+            if q:
+                conditions, condition_params = text_search_conditions(q)
+                where_conditions.extend(conditions)
+                params.extend(condition_params)
+            
+            page_sql = paginate(
+                where_conditions, params, page_cursor, skip, limit,
+                order_by="audit2_logs.timestamp DESC",
+                key_columns=["audit2_logs.timestamp", "audit2_logs.id"], descending=True
+            )
             
             cursor.execute(f"""
                 SELECT id, user_id, username, action, resource, details, ip_address, 
@@ -1856,16 +2252,20 @@ async def get_logs(
                        COALESCE(session_id, '') as session_id, 
                        COALESCE(request_id, '') as request_id, 
                        COALESCE(module, '') as module, 
-                       COALESCE(before_data, '') as before_data, 
-                       COALESCE(after_data, '') as after_data
-                FROM audit2_logs
+                       {LOG_PAYLOAD_COLUMNS if include_payloads else "NULL as before_data, NULL as after_data"},
+                       CONVERT(VARCHAR(27), timestamp, 126) as sort_timestamp
+                FROM {log_source(days)} AS audit2_logs
                 WHERE {' AND '.join(where_conditions)}
-                ORDER BY timestamp DESC
-                OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+                {page_sql}
             """, *params)
             
+            log_rows = cursor.fetchall()
+            if page_cursor is not None:
+                # ISO 8601 with all seven fractional digits, so the cursor converts back to the exact datetime2
+                log_rows, next_page = next_cursor(log_rows, limit, key=lambda row: (row[16], row[0]))
+            
             logs = []
-            for row in cursor.fetchall():
+            for row in log_rows:
                 logs.append({
                     "id": row[0],
                     "user_id": row[1],
@@ -1885,173 +2285,106 @@ async def get_logs(
                     "after_data": row[15]
                 })
             
+            if page_cursor is not None:
+                return {"items": logs, "next_cursor": next_page}
             return logs
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.get("/api/logs/export")
-async def export_logs(
-    format: str = Query(default="csv", pattern="^(csv|json|xlsx)$"),
+@offload_db(timeout=300)
+def export_logs(
+    format: str = Query(default="csv", pattern="^(csv|json|ndjson|xlsx)$"),
     severity: Optional[str] = None,
     action: Optional[str] = None,
     username: Optional[str] = None,
     module: Optional[str] = None,
     days: int = Query(default=30, le=365),
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    q: Optional[str] = None,
+    gzip: bool = False
 ):
+    if format == "xlsx":
+        # For xlsx format, you'd need to install openpyxl
+        raise HTTPException(status_code=400, detail="XLSX format not implemented yet")
+    
+    # Build query with filters (same as get_logs but without pagination)
+    where_conditions = ["timestamp >= DATEADD(day, -?, GETDATE())"]
+    params = [days]
+    
+    if severity:
+        where_conditions.append("severity = ?")
+        params.append(severity)
+    if action:
+        condition, condition_params = substring_condition("action", FIELD_ACTION, action)
+        where_conditions.append(condition)
+        params.extend(condition_params)
+    if username:
+        condition, condition_params = substring_condition("username", FIELD_USERNAME, username)
+        where_conditions.append(condition)
+        params.extend(condition_params)
+    if module:
+        where_conditions.append("module = ?")
+        params.append(module)
+    if status:
+        where_conditions.append("status = ?")
+        params.append(status)
+    if q:
+        conditions, condition_params = text_search_conditions(q)
+        where_conditions.extend(conditions)
+        params.extend(condition_params)
+    
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Build query with filters (same as get_logs but without pagination)
-            where_conditions = ["timestamp >= DATEADD(day, -?, GETDATE())"]
-            params = [days]
-            
-            if severity:
-                where_conditions.append("severity = ?")
-                params.append(severity)
-            if action:
-                where_conditions.append("action LIKE ?")
-                params.append(f"%{action}%")
-            if username:
-                where_conditions.append("username LIKE ?")
-                params.append(f"%{username}%")
-            if module:
-                where_conditions.append("module = ?")
-                params.append(module)
-            if status:
-                where_conditions.append("status = ?")
-                params.append(status)
-            
-            cursor.execute(f"""
-                SELECT id, user_id, username, action, resource, details, ip_address, 
-                       user_agent, CAST(timestamp AS VARCHAR(30)) as timestamp, status, 
-                       COALESCE(severity, 'info') as severity, 
-                       COALESCE(session_id, '') as session_id, 
-                       COALESCE(request_id, '') as request_id, 
-                       COALESCE(module, '') as module, 
-                       COALESCE(before_data, '') as before_data, 
-                       COALESCE(after_data, '') as after_data
-                FROM audit2_logs
-                WHERE {' AND '.join(where_conditions)}
-                ORDER BY timestamp DESC
-            """, *params)
-            
-            logs = []
-            for row in cursor.fetchall():
-                logs.append({
-                    "id": row[0],
-                    "user_id": row[1],
-                    "username": row[2],
-                    "action": row[3],
-                    "resource": row[4],
-                    "details": row[5],
-                    "ip_address": row[6],
-                    "user_agent": row[7],
-                    "timestamp": row[8],
-                    "status": row[9],
-                    "severity": row[10] or "info",
-                    "session_id": row[11],
-                    "request_id": row[12],
-                    "module": row[13],
-                    "before_data": row[14],
-                    "after_data": row[15]
-                })
-            
-            if format == "json":
-                from fastapi.responses import JSONResponse
-                return JSONResponse(
-                    content=logs,
-                    headers={"Content-Disposition": f"attachment; filename=audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"}
-                )
-            elif format == "csv":
-                import csv
-                import io
-                from fastapi.responses import Response
-                
-                if not logs:
-                    return Response(
-                        content="No logs found",
-                        media_type="text/csv",
-                        headers={"Content-Disposition": f"attachment; filename=audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"}
-                    )
-                
-                output = io.StringIO()
-                writer = csv.DictWriter(output, fieldnames=logs[0].keys())
-                writer.writeheader()
-                writer.writerows(logs)
-                
-                return Response(
-                    content=output.getvalue(),
-                    media_type="text/csv",
-                    headers={"Content-Disposition": f"attachment; filename=audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"}
-                )
-            else:
-                # For xlsx format, you'd need to install openpyxl
-                raise HTTPException(status_code=400, detail="XLSX format not implemented yet")
-                
+        # Runs the query here; rows are then fetched in batches while the response streams
+        batches = fetch_batches(f"""
+            SELECT id, user_id, username, action, resource, details, ip_address, 
+                   user_agent, CAST(timestamp AS VARCHAR(30)) as timestamp, status, 
+                   COALESCE(severity, 'info') as severity, 
+                   COALESCE(session_id, '') as session_id, 
+                   COALESCE(request_id, '') as request_id, 
+                   COALESCE(module, '') as module, 
+                   COALESCE(before_data, '') as before_data, 
+                   COALESCE(after_data, '') as after_data
+            FROM {log_source(days)} AS audit2_logs
+            WHERE {' AND '.join(where_conditions)}
+            ORDER BY audit2_logs.timestamp DESC
+        """, params)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    filename = f"audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        encode_chunks(RENDERERS[format](batches), gzip=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @app.get("/api/logs/stats")
-async def get_log_stats(days: int = Query(default=30, le=365)):
+@offload_db(timeout=120)
+def get_log_stats(days: int = Query(default=30, le=365)):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Get overall stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_logs,
-                    COUNT(CASE WHEN severity = 'critical' THEN 1 END) as critical_count,
-                    COUNT(CASE WHEN severity = 'high' THEN 1 END) as high_count,
-                    COUNT(CASE WHEN severity = 'medium' THEN 1 END) as medium_count,
-                    COUNT(CASE WHEN severity = 'low' THEN 1 END) as low_count,
-                    COUNT(CASE WHEN severity = 'info' OR severity IS NULL THEN 1 END) as info_count,
-                    COUNT(CASE WHEN status = 'success' THEN 1 END) as success_count,
-                    COUNT(CASE WHEN status = 'failed' THEN 1 END) as failed_count,
-                    COUNT(DISTINCT username) as unique_users,
-                    COUNT(DISTINCT module) as unique_modules
-                FROM audit2_logs 
-                WHERE timestamp >= DATEADD(day, -?, GETDATE())
-            """, days)
+            # Whole days and hours come from the rollup tables, the edges of the window from audit2_logs
+            now, rolled_up_until = rollup_position(cursor)
+            slices = plan_slices(now - timedelta(days=days), now, rolled_up_until)
+            query, params = stats_query(slices)
+            cursor.execute(query, *params)
             
             stats_row = cursor.fetchone()
-            
-            # Get top actions
-            cursor.execute("""
-                SELECT TOP 10 action, COUNT(*) as count
-                FROM audit2_logs 
-                WHERE timestamp >= DATEADD(day, -?, GETDATE())
-                GROUP BY action
-                ORDER BY count DESC
-            """, days)
-            
+            cursor.nextset()
             top_actions = [{"action": row[0], "count": row[1]} for row in cursor.fetchall()]
-            
-            # Get top users
-            cursor.execute("""
-                SELECT TOP 10 username, COUNT(*) as count
-                FROM audit2_logs 
-                WHERE timestamp >= DATEADD(day, -?, GETDATE()) AND username IS NOT NULL
-                GROUP BY username
-                ORDER BY count DESC
-            """, days)
-            
+            cursor.nextset()
             top_users = [{"username": row[0], "count": row[1]} for row in cursor.fetchall()]
-            
-            # Get daily activity
-            cursor.execute("""
-                SELECT 
-                    CONVERT(VARCHAR, CAST(timestamp AS DATE), 23) as date,
-                    COUNT(*) as count,
-                    COUNT(CASE WHEN severity = 'critical' THEN 1 END) as critical_count
-                FROM audit2_logs 
-                WHERE timestamp >= DATEADD(day, -?, GETDATE())
-                GROUP BY CAST(timestamp AS DATE)
-                ORDER BY CAST(timestamp AS DATE) DESC
-            """, days)
-            
+            cursor.nextset()
             daily_activity = [{"date": row[0], "count": row[1], "critical_count": row[2]} for row in cursor.fetchall()]
             
             return {
@@ -2076,8 +2409,136 @@ async def get_log_stats(days: int = Query(default=30, le=365)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@offload_db()
+def load_logs_since(last_id: int, log_filter: LogFilter, limit: int = LOG_STREAM_CATCHUP_LIMIT) -> List[dict]:
+    """Logs after `last_id` that match `log_filter`, oldest first, for a reconnecting stream"""
+    where_conditions = ["id > ?"]
+    params = [last_id]
+    
+    if log_filter.severity:
+        where_conditions.append("severity = ?")
+        params.append(log_filter.severity)
+    if log_filter.action:
+        condition, condition_params = substring_condition("action", FIELD_ACTION, log_filter.action)
+        where_conditions.append(condition)
+        params.extend(condition_params)
+    if log_filter.username:
+        condition, condition_params = substring_condition("username", FIELD_USERNAME, log_filter.username)
+        where_conditions.append(condition)
+        params.extend(condition_params)
+    if log_filter.module:
+        where_conditions.append("module = ?")
+        params.append(log_filter.module)
+    if log_filter.status:
+        where_conditions.append("status = ?")
+        params.append(log_filter.status)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        # The newest `limit` matches, returned oldest first
+        cursor.execute(f"""
+            SELECT * FROM (
+                {LOG_SELECT}
+                FROM audit2_logs
+                WHERE {' AND '.join(where_conditions)}
+                ORDER BY id DESC
+                OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+            ) AS recent
+            ORDER BY id
+        """, *params, limit)
+        return [log_entry(row) for row in cursor.fetchall()]
+
+@app.get("/api/logs/stream")
+async def stream_logs(
+    request: Request,
+    severity: Optional[str] = None,
+    action: Optional[str] = None,
+    username: Optional[str] = None,
+    module: Optional[str] = None,
+    status: Optional[str] = None,
+    last_event_id: Optional[int] = None
+):
+    # Server-Sent Events: every new log matching the filters, as it commits.
+    # A reconnecting EventSource sends the id of the last event it received
+    # in Last-Event-ID (or pass last_event_id) and first gets the logs it missed.
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_event_id = int(header)
+    
+    log_filter = LogFilter(severity=severity, module=module, action=action, username=username, status=status)
+    # Subscribe before catching up, so no log commits in between unseen
+    subscription = log_stream.subscribe(log_filter)
+    backlog = None
+    try:
+        missed = []
+        if last_event_id is not None:
+            missed = await load_logs_since(last_event_id, log_filter)
+            # Don't hold the request's connection for the lifetime of the stream
+            await checkpoint()
+        backlog = missed
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if backlog is None:
+            log_stream.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(log_stream, subscription, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/logs/{log_id}")
+@offload_db()
+def get_log(log_id: int):
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f"""
+                SELECT id, user_id, username, action, resource, details, ip_address, 
+                       user_agent, CAST(timestamp AS VARCHAR(30)) as timestamp, status, 
+                       COALESCE(severity, 'info') as severity, 
+                       COALESCE(session_id, '') as session_id, 
+                       COALESCE(request_id, '') as request_id, 
+                       COALESCE(module, '') as module, 
+                       {LOG_PAYLOAD_COLUMNS}
+                FROM audit2_logs_all
+                WHERE id = ?
+            """, log_id)
+            
+            row = cursor.fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="Log entry not found")
+            
+            return {
+                "id": row[0],
+                "user_id": row[1],
+                "username": row[2],
+                "action": row[3],
+                "resource": row[4],
+                "details": row[5],
+                "ip_address": row[6],
+                "user_agent": row[7],
+                "timestamp": row[8],
+                "status": row[9],
+                "severity": row[10] or "info",
+                "session_id": row[11],
+                "request_id": row[12],
+                "module": row[13],
+                "before_data": row[14],
+                "after_data": row[15]
+            }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 @app.post("/api/logs")
-async def create_log_entry(
+@offload_db()
+def create_log_entry(
     user_id: Optional[int] = None,
     username: Optional[str] = None,
     action: str = None,
@@ -2097,18 +2558,21 @@ async def create_log_entry(
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
+            cursor.execute(f"""
                 INSERT INTO audit2_logs (
                     user_id, username, action, resource, details, severity, module,
                     ip_address, user_agent, session_id, request_id, before_data, after_data, status
                 )
-                OUTPUT INSERTED.id, INSERTED.timestamp
+                {LOG_OUTPUT}, INSERTED.timestamp
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, user_id, username, action, resource, details, severity, module,
                  ip_address, user_agent, session_id, request_id, before_data, after_data, status)
             
-            result = cursor.fetchone()
+            row = cursor.fetchone()
+            result = (row[0], row[-1])
             conn.commit()
+            after_commit(dashboard_summary.logs_written)
+            after_commit(lambda: log_stream.publish([row[:-1]]))
             
             return {
                 "id": result[0],
@@ -2132,26 +2596,46 @@ def log_activity(
     after_data: Optional[str] = None,
     status: str = "success"
 ):
-    """Helper function to log activities with enhanced data"""
+    """
+    Helper function to log activities with enhanced data.
+    
+    By default the row is inserted on `conn` and committed with the caller's
+    transaction. With AUDIT_ASYNC_WRITES enabled it is handed to the buffered
+    audit writer once that transaction commits, and written in a later batch.
+    Either way, /api/logs/stream clients receive it once it is committed.
+    """
     try:
-        print(f"Attempting to log activity: action={action}, username={username}, details={details}")
-        
         # Validate required fields
         if action is None or action == "":
             print(f"ERROR: Action is None or empty! Cannot log activity.")
             return
+        
+        if audit_writer.running:
+            record = (user_id, username, action, resource, details, severity, module,
+                      before_data, after_data, status)
+            
+            def enqueue():
+                if audit_writer.enqueue(record):
+                    dashboard_summary.logs_written()
+                else:
+                    print(f"Audit queue full, dropped activity: {action}")
+            
+            after_commit(enqueue)
+            return
             
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO audit2_logs (
-                user_id, username, action, resource, details, severity, module,
-                before_data, after_data, status
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, user_id, username, action, resource, details, severity, module,
-             before_data, after_data, status)
-        print(f"Successfully logged activity: {action}")
+        params = (user_id, username, action, resource, details, severity, module,
+                  before_data, after_data, status)
+        if log_stream.listening:
+            # Someone follows /api/logs/stream: get the row back to publish it
+            cursor.execute(AUDIT_INSERT_RETURNING_SQL, *params)
+            row = cursor.fetchone()
+            if row:
+                after_commit(lambda: log_stream.publish([row]))
+        else:
+            cursor.execute(AUDIT_INSERT_SQL, *params)
         # Don't commit here - let the calling function handle the commit
+        after_commit(dashboard_summary.logs_written)
     except Exception as e:
         print(f"Logging error: {str(e)}")
         print(f"Parameters: user_id={user_id}, username={username}, action={action}, resource={resource}, details={details}, severity={severity}, module={module}, before_data={before_data}, after_data={after_data}, status={status}")
@@ -2163,8 +2647,8 @@ def create_sample_logs():
             cursor = conn.cursor()
             
             # Check if we already have logs
-            cursor.execute("SELECT COUNT(*) FROM audit2_logs")
-            if cursor.fetchone()[0] > 0:
+            cursor.execute("SELECT TOP 1 1 FROM audit2_logs")
+            if cursor.fetchone():
                 return  # Already have logs
             
             sample_logs = [
@@ -2187,12 +2671,14 @@ def create_sample_logs():
                 """, *log)
             
             conn.commit()
+            after_commit(dashboard_summary.invalidate)
             print("Sample audit logs created successfully")
     except Exception as e:
         print(f"Error creating sample logs: {e}")
 
 @app.post("/api/create-sample-logs")
-async def create_sample_logs_endpoint():
+@offload_db()
+def create_sample_logs_endpoint():
     """Create sample audit logs for testing"""
     try:
         create_sample_logs()
@@ -2201,7 +2687,8 @@ async def create_sample_logs_endpoint():
         raise HTTPException(status_code=500, detail=f"Error creating sample logs: {str(e)}")
 
 @app.post("/api/init-sample-data")
-async def init_sample_data():
+@offload_db()
+def init_sample_data():
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -2435,7 +2922,12 @@ async def init_sample_data():
                     VALUES (?, ?, ?, ?, ?)
                 """, *metric)
             
+            bump_catalogs(cursor, *CATALOGS)
             conn.commit()
+            rbac.changed()
+            after_commit(catalog_versions.invalidate)
+            after_commit(dashboard_summary.invalidate)
+            after_commit(user_index.invalidate)
             return {"message": "Sample data with RBAC initialized successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
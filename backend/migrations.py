@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations.
+
+Migrations are the numbered .sql files in backend/migrations/, applied in
+order. `GO` lines separate batches, like in sqlcmd/SSMS. Applied versions are
+recorded in the schema_version table, so once the schema is current startup
+costs a single query.
+
+Run `python migrations.py` to apply pending migrations by hand.
+"""
+import os
+import re
+from typing import List, NamedTuple
+
+from database import get_db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+_MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+_BATCH_SEPARATOR = re.compile(r"^\s*GO\s*;?\s*$", re.IGNORECASE | re.MULTILINE)
+
+# Serializes concurrent workers that start at the same time
+MIGRATION_LOCK = "schema_migrations"
+MIGRATION_LOCK_TIMEOUT_MS = 120000
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Migration files in `directory`, ordered by version"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def split_batches(sql: str) -> List[str]:
+    """Split a script on `GO` lines into batches pyodbc can execute"""
+    return [batch.strip() for batch in _BATCH_SEPARATOR.split(sql) if batch.strip()]
+
+
+def get_schema_version(cursor) -> int:
+    cursor.execute("""
+        IF OBJECT_ID('schema_version', 'U') IS NULL
+            SELECT 0
+        ELSE
+            SELECT COALESCE(MAX(version), 0) FROM schema_version
+    """)
+    return cursor.fetchone()[0]
+
+
+def _apply(conn, cursor, migration: Migration):
+    with open(migration.path, encoding="utf-8") as f:
+        script = f.read()
+    for batch in split_batches(script):
+        cursor.execute(batch)
+    cursor.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", migration.version, migration.name)
+    conn.commit()
+
+
+def run_migrations(directory: str = MIGRATIONS_DIR) -> dict:
+    """Apply pending migrations; a no-op costing one query when the schema is current"""
+    try:
+        migrations = discover_migrations(directory)
+        latest = migrations[-1].version if migrations else 0
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            if get_schema_version(cursor) >= latest:
+                return {"status": "success", "message": "Schema is up to date", "version": latest}
+
+            cursor.execute("""
+                IF OBJECT_ID('schema_version', 'U') IS NULL
+                CREATE TABLE schema_version (
+                    version INT PRIMARY KEY,
+                    name NVARCHAR(255) NOT NULL,
+                    applied_at DATETIME2 DEFAULT GETDATE()
+                )
+            """)
+            conn.commit()
+
+            cursor.execute(
+                "EXEC sp_getapplock @Resource = ?, @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = ?",
+                MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT_MS
+            )
+            try:
+                # Another worker may have applied some while we waited for the lock
+                current = get_schema_version(cursor)
+                applied = []
+                for migration in migrations:
+                    if migration.version > current:
+                        _apply(conn, cursor, migration)
+                        applied.append(migration.version)
+            finally:
+                conn.rollback()
+                cursor.execute("EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", MIGRATION_LOCK)
+
+            return {
+                "status": "success",
+                "message": f"Applied migrations: {applied}" if applied else "Schema is up to date",
+                "version": latest
+            }
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to run migrations: {str(e)}"}
+
+
+if __name__ == "__main__":
+    print(run_migrations())
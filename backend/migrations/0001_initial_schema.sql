@@ -0,0 +1,184 @@
+-- Base schema: tables and columns previously created by database.create_tables().
+-- Every statement is guarded so the migration also applies cleanly to databases
+-- that were set up before schema_version existed.
+
+-- Create roles table
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='roles' AND xtype='U')
+CREATE TABLE roles (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    name NVARCHAR(50) UNIQUE NOT NULL,
+    display_name NVARCHAR(100) NOT NULL,
+    description NVARCHAR(255) NULL,
+    is_active BIT DEFAULT 1,
+    created_at DATETIME2 DEFAULT GETDATE(),
+    updated_at DATETIME2 DEFAULT GETDATE()
+);
+GO
+
+-- Create permissions table
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='permissions' AND xtype='U')
+CREATE TABLE permissions (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    name NVARCHAR(50) UNIQUE NOT NULL,
+    display_name NVARCHAR(100) NOT NULL,
+    description NVARCHAR(255) NULL,
+    resource NVARCHAR(50) NOT NULL,
+    action NVARCHAR(50) NOT NULL,
+    created_at DATETIME2 DEFAULT GETDATE()
+);
+GO
+
+-- Create role_permissions junction table
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='role_permissions' AND xtype='U')
+CREATE TABLE role_permissions (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    role_id INT NOT NULL,
+    permission_id INT NOT NULL,
+    created_at DATETIME2 DEFAULT GETDATE(),
+    FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE CASCADE,
+    FOREIGN KEY (permission_id) REFERENCES permissions(id) ON DELETE CASCADE,
+    UNIQUE(role_id, permission_id)
+);
+GO
+
+-- Update users table to reference roles
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='users' AND xtype='U')
+CREATE TABLE users (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    username NVARCHAR(50) UNIQUE NOT NULL,
+    email NVARCHAR(100) UNIQUE NOT NULL,
+    full_name NVARCHAR(100) NOT NULL,
+    role_id INT NULL,
+    is_active BIT DEFAULT 1,
+    created_at DATETIME2 DEFAULT GETDATE(),
+    last_login DATETIME2 NULL,
+    department NVARCHAR(100) NULL,
+    position NVARCHAR(100) NULL,
+    phone NVARCHAR(20) NULL,
+    FOREIGN KEY (role_id) REFERENCES roles(id)
+);
+GO
+
+-- Check if additional columns exist, if not add them
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'users' AND COLUMN_NAME = 'role_id')
+BEGIN
+    ALTER TABLE users ADD role_id INT NULL
+    ALTER TABLE users ADD CONSTRAINT FK_users_roles 
+        FOREIGN KEY (role_id) REFERENCES roles(id)
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'users' AND COLUMN_NAME = 'department')
+BEGIN
+    ALTER TABLE users ADD department NVARCHAR(100) NULL
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'users' AND COLUMN_NAME = 'position')
+BEGIN
+    ALTER TABLE users ADD position NVARCHAR(100) NULL
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'users' AND COLUMN_NAME = 'phone')
+BEGIN
+    ALTER TABLE users ADD phone NVARCHAR(20) NULL
+END
+GO
+
+-- Create user_roles junction table for multiple roles per user
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='user_roles' AND xtype='U')
+CREATE TABLE user_roles (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    user_id INT NOT NULL,
+    role_id INT NOT NULL,
+    assigned_at DATETIME2 DEFAULT GETDATE(),
+    assigned_by INT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE CASCADE,
+    FOREIGN KEY (assigned_by) REFERENCES users(id),
+    UNIQUE(user_id, role_id)
+);
+GO
+
+-- Create enhanced audit logs table
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='audit2_logs' AND xtype='U')
+CREATE TABLE audit2_logs (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    user_id INT NULL,
+    username NVARCHAR(50) NULL,
+    action NVARCHAR(100) NOT NULL,
+    resource NVARCHAR(100) NULL,
+    details NTEXT NULL,
+    ip_address NVARCHAR(45) NULL,
+    user_agent NVARCHAR(500) NULL,
+    timestamp DATETIME2 DEFAULT GETDATE(),
+    status NVARCHAR(20) DEFAULT 'success',
+    severity NVARCHAR(20) DEFAULT 'info',
+    session_id NVARCHAR(100) NULL,
+    request_id NVARCHAR(100) NULL,
+    module NVARCHAR(50) NULL,
+    before_data NTEXT NULL,
+    after_data NTEXT NULL
+);
+GO
+
+-- Add missing columns to existing audit2_logs table
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'severity')
+BEGIN
+    ALTER TABLE audit2_logs ADD severity NVARCHAR(20) DEFAULT 'info'
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'session_id')
+BEGIN
+    ALTER TABLE audit2_logs ADD session_id NVARCHAR(100) NULL
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'request_id')
+BEGIN
+    ALTER TABLE audit2_logs ADD request_id NVARCHAR(100) NULL
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'module')
+BEGIN
+    ALTER TABLE audit2_logs ADD module NVARCHAR(50) NULL
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'before_data')
+BEGIN
+    ALTER TABLE audit2_logs ADD before_data NTEXT NULL
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+              WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'after_data')
+BEGIN
+    ALTER TABLE audit2_logs ADD after_data NTEXT NULL
+END
+GO
+
+-- Create dashboard metrics table
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='dashboard_metrics' AND xtype='U')
+CREATE TABLE dashboard_metrics (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    metric_name NVARCHAR(100) NOT NULL,
+    metric_value FLOAT NOT NULL,
+    metric_type NVARCHAR(50) NOT NULL,
+    category NVARCHAR(50) NOT NULL,
+    timestamp DATETIME2 DEFAULT GETDATE(),
+    description NVARCHAR(200) NULL
+);
+GO
@@ -1,6 +1,5 @@
--- Add password field to users table
-USE master;
-GO
+-- Add password and login-lockout fields to users table
+-- (formerly backend/SQL_schemes/add_password_field.sql, run by hand)
 
 -- Check if password column exists, if not add it
 IF NOT EXISTS (SELECT * FROM sys.columns WHERE object_id = OBJECT_ID('users') AND name = 'password_hash')
@@ -59,5 +58,3 @@ BEGIN
     PRINT 'account_locked_until column already exists';
 END
 GO
-
-PRINT 'Database migration completed successfully!';
\ No newline at end of file
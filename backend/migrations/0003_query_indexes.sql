@@ -0,0 +1,48 @@
+-- Indexes for the filters and sort orders used by the API.
+-- audit2_logs is filtered by a timestamp window plus an optional equality
+-- filter, so each index leads with the equality column and ends with timestamp.
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_audit2_logs_timestamp' AND object_id = OBJECT_ID('audit2_logs'))
+    CREATE INDEX IX_audit2_logs_timestamp ON audit2_logs (timestamp DESC);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_audit2_logs_user_id_timestamp' AND object_id = OBJECT_ID('audit2_logs'))
+    CREATE INDEX IX_audit2_logs_user_id_timestamp ON audit2_logs (user_id, timestamp DESC);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_audit2_logs_username_timestamp' AND object_id = OBJECT_ID('audit2_logs'))
+    CREATE INDEX IX_audit2_logs_username_timestamp ON audit2_logs (username, timestamp DESC);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_audit2_logs_severity_timestamp' AND object_id = OBJECT_ID('audit2_logs'))
+    CREATE INDEX IX_audit2_logs_severity_timestamp ON audit2_logs (severity, timestamp DESC);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_audit2_logs_module_timestamp' AND object_id = OBJECT_ID('audit2_logs'))
+    CREATE INDEX IX_audit2_logs_module_timestamp ON audit2_logs (module, timestamp DESC);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_audit2_logs_status_timestamp' AND object_id = OBJECT_ID('audit2_logs'))
+    CREATE INDEX IX_audit2_logs_status_timestamp ON audit2_logs (status, timestamp DESC);
+GO
+
+-- UNIQUE(user_id, role_id) and UNIQUE(role_id, permission_id) already give
+-- seekable indexes on user_roles.user_id and role_permissions.role_id. The
+-- reverse directions (role -> users, permission -> roles) are used by the
+-- ON DELETE CASCADE paths and had no index at all.
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_user_roles_role_id' AND object_id = OBJECT_ID('user_roles'))
+    CREATE INDEX IX_user_roles_role_id ON user_roles (role_id, user_id);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_role_permissions_permission_id' AND object_id = OBJECT_ID('role_permissions'))
+    CREATE INDEX IX_role_permissions_permission_id ON role_permissions (permission_id, role_id);
+GO
+
+-- GET /api/users orders by created_at, the Arch directory by full_name
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_users_created_at' AND object_id = OBJECT_ID('users'))
+    CREATE INDEX IX_users_created_at ON users (created_at DESC);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_users_full_name' AND object_id = OBJECT_ID('users'))
+    CREATE INDEX IX_users_full_name ON users (full_name, id);
+GO
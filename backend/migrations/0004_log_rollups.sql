@@ -0,0 +1,48 @@
+-- Pre-aggregated audit log counts for /api/logs/stats.
+-- One row per bucket and combination of the dimensions the stats report on.
+-- username and module are nullable, so uniqueness is a unique clustered index
+-- (which treats NULLs as equal) rather than a primary key.
+
+IF OBJECT_ID('audit_log_rollup_hourly', 'U') IS NULL
+CREATE TABLE audit_log_rollup_hourly (
+    bucket DATETIME2(0) NOT NULL,
+    action NVARCHAR(100) NOT NULL,
+    username NVARCHAR(50) NULL,
+    module NVARCHAR(50) NULL,
+    severity NVARCHAR(20) NULL,
+    status NVARCHAR(20) NULL,
+    log_count INT NOT NULL
+);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'UX_audit_log_rollup_hourly' AND object_id = OBJECT_ID('audit_log_rollup_hourly'))
+    CREATE UNIQUE CLUSTERED INDEX UX_audit_log_rollup_hourly
+        ON audit_log_rollup_hourly (bucket, action, username, module, severity, status);
+GO
+
+IF OBJECT_ID('audit_log_rollup_daily', 'U') IS NULL
+CREATE TABLE audit_log_rollup_daily (
+    bucket DATE NOT NULL,
+    action NVARCHAR(100) NOT NULL,
+    username NVARCHAR(50) NULL,
+    module NVARCHAR(50) NULL,
+    severity NVARCHAR(20) NULL,
+    status NVARCHAR(20) NULL,
+    log_count INT NOT NULL
+);
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'UX_audit_log_rollup_daily' AND object_id = OBJECT_ID('audit_log_rollup_daily'))
+    CREATE UNIQUE CLUSTERED INDEX UX_audit_log_rollup_daily
+        ON audit_log_rollup_daily (bucket, action, username, module, severity, status);
+GO
+
+-- Rows of audit2_logs with timestamp < rolled_up_until are in the rollups;
+-- anything newer is still read from audit2_logs directly.
+IF OBJECT_ID('audit_log_rollup_state', 'U') IS NULL
+CREATE TABLE audit_log_rollup_state (
+    name NVARCHAR(50) PRIMARY KEY,
+    rolled_up_until DATETIME2(0) NOT NULL,
+    updated_at DATETIME2 DEFAULT GETDATE()
+);
+GO
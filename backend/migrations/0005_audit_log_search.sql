@@ -0,0 +1,23 @@
+-- Search index for audit2_logs.
+-- field 'a' and 'u' hold the lowercase trigrams of action and username, so a
+-- substring filter becomes a seek per trigram; field 'd' holds the words of
+-- details for free-text search.
+
+IF OBJECT_ID('audit_log_tokens', 'U') IS NULL
+CREATE TABLE audit_log_tokens (
+    field CHAR(1) NOT NULL,
+    token NVARCHAR(50) NOT NULL,
+    log_id INT NOT NULL,
+    CONSTRAINT PK_audit_log_tokens PRIMARY KEY (field, token, log_id)
+);
+GO
+
+-- Rows of audit2_logs with id <= indexed_through_id are in audit_log_tokens;
+-- newer rows are matched with LIKE until the indexer reaches them.
+IF OBJECT_ID('audit_log_search_state', 'U') IS NULL
+CREATE TABLE audit_log_search_state (
+    name NVARCHAR(50) PRIMARY KEY,
+    indexed_through_id INT NOT NULL,
+    updated_at DATETIME2 DEFAULT GETDATE()
+);
+GO
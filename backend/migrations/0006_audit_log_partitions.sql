@@ -0,0 +1,92 @@
+-- Monthly partitioning of audit2_logs.
+-- The table is clustered on (timestamp, id) over ps_audit_monthly and every
+-- index is partition-aligned, so a whole month can be switched out to
+-- audit2_logs_archive (same partition scheme) as a metadata-only operation.
+-- The retention job in log_retention.py adds future months and moves or
+-- drops old ones. audit2_logs_all unions both tables for windows that reach
+-- into archived months.
+
+IF NOT EXISTS (SELECT * FROM sys.partition_functions WHERE name = 'pf_audit_monthly')
+BEGIN
+    -- One boundary per month from the oldest log to three months ahead
+    DECLARE @oldest DATETIME2 = COALESCE((SELECT MIN(timestamp) FROM audit2_logs), GETDATE());
+    DECLARE @month DATE = DATEFROMPARTS(YEAR(@oldest), MONTH(@oldest), 1);
+    DECLARE @last DATE = DATEADD(month, 3, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+    DECLARE @values NVARCHAR(MAX) = N'';
+    WHILE @month <= @last
+    BEGIN
+        SET @values = @values + CASE WHEN @values = N'' THEN N'' ELSE N', ' END
+                      + N'''' + CONVERT(NCHAR(10), @month, 23) + N'''';
+        SET @month = DATEADD(month, 1, @month);
+    END
+    EXEC (N'CREATE PARTITION FUNCTION pf_audit_monthly (DATETIME2) AS RANGE RIGHT FOR VALUES (' + @values + N')');
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.partition_schemes WHERE name = 'ps_audit_monthly')
+    CREATE PARTITION SCHEME ps_audit_monthly AS PARTITION pf_audit_monthly ALL TO ([PRIMARY]);
+GO
+
+-- The partitioning column has to be part of every unique index, so the
+-- primary key becomes (id, timestamp) and timestamp becomes NOT NULL
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'CIX_audit2_logs_timestamp' AND object_id = OBJECT_ID('audit2_logs'))
+BEGIN
+    UPDATE audit2_logs SET timestamp = GETDATE() WHERE timestamp IS NULL;
+
+    DROP INDEX IF EXISTS IX_audit2_logs_timestamp ON audit2_logs;
+    DROP INDEX IF EXISTS IX_audit2_logs_user_id_timestamp ON audit2_logs;
+    DROP INDEX IF EXISTS IX_audit2_logs_username_timestamp ON audit2_logs;
+    DROP INDEX IF EXISTS IX_audit2_logs_severity_timestamp ON audit2_logs;
+    DROP INDEX IF EXISTS IX_audit2_logs_module_timestamp ON audit2_logs;
+    DROP INDEX IF EXISTS IX_audit2_logs_status_timestamp ON audit2_logs;
+
+    DECLARE @pk SYSNAME = (
+        SELECT name FROM sys.key_constraints
+        WHERE parent_object_id = OBJECT_ID('audit2_logs') AND type = 'PK'
+    );
+    IF @pk IS NOT NULL
+        EXEC (N'ALTER TABLE audit2_logs DROP CONSTRAINT ' + @pk);
+
+    ALTER TABLE audit2_logs ALTER COLUMN timestamp DATETIME2 NOT NULL;
+
+    CREATE CLUSTERED INDEX CIX_audit2_logs_timestamp ON audit2_logs (timestamp, id)
+        ON ps_audit_monthly (timestamp);
+    ALTER TABLE audit2_logs ADD CONSTRAINT PK_audit2_logs PRIMARY KEY NONCLUSTERED (id, timestamp)
+        ON ps_audit_monthly (timestamp);
+
+    CREATE INDEX IX_audit2_logs_user_id_timestamp ON audit2_logs (user_id, timestamp DESC) ON ps_audit_monthly (timestamp);
+    CREATE INDEX IX_audit2_logs_username_timestamp ON audit2_logs (username, timestamp DESC) ON ps_audit_monthly (timestamp);
+    CREATE INDEX IX_audit2_logs_severity_timestamp ON audit2_logs (severity, timestamp DESC) ON ps_audit_monthly (timestamp);
+    CREATE INDEX IX_audit2_logs_module_timestamp ON audit2_logs (module, timestamp DESC) ON ps_audit_monthly (timestamp);
+    CREATE INDEX IX_audit2_logs_status_timestamp ON audit2_logs (status, timestamp DESC) ON ps_audit_monthly (timestamp);
+END
+GO
+
+-- Partition switching needs identical columns, so the archive is cloned
+-- from audit2_logs rather than declared separately
+IF OBJECT_ID('audit2_logs_archive', 'U') IS NULL
+BEGIN
+    SELECT TOP 0 * INTO audit2_logs_archive FROM audit2_logs;
+
+    CREATE CLUSTERED INDEX CIX_audit2_logs_archive_timestamp ON audit2_logs_archive (timestamp, id)
+        ON ps_audit_monthly (timestamp);
+    ALTER TABLE audit2_logs_archive ADD CONSTRAINT PK_audit2_logs_archive PRIMARY KEY NONCLUSTERED (id, timestamp)
+        ON ps_audit_monthly (timestamp);
+
+    CREATE INDEX IX_audit2_logs_archive_user_id_timestamp ON audit2_logs_archive (user_id, timestamp DESC) ON ps_audit_monthly (timestamp);
+    CREATE INDEX IX_audit2_logs_archive_username_timestamp ON audit2_logs_archive (username, timestamp DESC) ON ps_audit_monthly (timestamp);
+    CREATE INDEX IX_audit2_logs_archive_severity_timestamp ON audit2_logs_archive (severity, timestamp DESC) ON ps_audit_monthly (timestamp);
+    CREATE INDEX IX_audit2_logs_archive_module_timestamp ON audit2_logs_archive (module, timestamp DESC) ON ps_audit_monthly (timestamp);
+    CREATE INDEX IX_audit2_logs_archive_status_timestamp ON audit2_logs_archive (status, timestamp DESC) ON ps_audit_monthly (timestamp);
+END
+GO
+
+CREATE OR ALTER VIEW audit2_logs_all AS
+    SELECT id, user_id, username, action, resource, details, ip_address, user_agent, timestamp,
+           status, severity, session_id, request_id, module, before_data, after_data
+    FROM audit2_logs
+    UNION ALL
+    SELECT id, user_id, username, action, resource, details, ip_address, user_agent, timestamp,
+           status, severity, session_id, request_id, module, before_data, after_data
+    FROM audit2_logs_archive;
+GO
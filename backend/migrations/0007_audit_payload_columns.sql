@@ -0,0 +1,42 @@
+-- NTEXT is deprecated and always stored off-row, so every read of details,
+-- before_data or after_data is a LOB lookup. NVARCHAR(MAX) keeps values up
+-- to 8000 bytes in the row, where page compression applies to them too.
+-- Longer values still go off-row, and PAGE compression does not touch LOB
+-- pages, so those stay uncompressed. The payloads written by log_activity are
+-- short field summaries that fit in the row; COMPRESS() would also compress
+-- the rare long ones, but would turn the columns into VARBINARY that SQL can
+-- no longer read, filter or LIKE.
+-- Both tables change together: partition switching needs identical columns
+-- and compression settings.
+
+IF EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS
+           WHERE TABLE_NAME = 'audit2_logs' AND COLUMN_NAME = 'details' AND DATA_TYPE = 'ntext')
+BEGIN
+    ALTER TABLE audit2_logs ALTER COLUMN details NVARCHAR(MAX) NULL;
+    ALTER TABLE audit2_logs ALTER COLUMN before_data NVARCHAR(MAX) NULL;
+    ALTER TABLE audit2_logs ALTER COLUMN after_data NVARCHAR(MAX) NULL;
+    -- Converted values stay in their LOB pages until rewritten
+    UPDATE audit2_logs SET details = details, before_data = before_data, after_data = after_data;
+END
+GO
+
+IF EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS
+           WHERE TABLE_NAME = 'audit2_logs_archive' AND COLUMN_NAME = 'details' AND DATA_TYPE = 'ntext')
+BEGIN
+    ALTER TABLE audit2_logs_archive ALTER COLUMN details NVARCHAR(MAX) NULL;
+    ALTER TABLE audit2_logs_archive ALTER COLUMN before_data NVARCHAR(MAX) NULL;
+    ALTER TABLE audit2_logs_archive ALTER COLUMN after_data NVARCHAR(MAX) NULL;
+    UPDATE audit2_logs_archive SET details = details, before_data = before_data, after_data = after_data;
+END
+GO
+
+IF EXISTS (SELECT * FROM sys.partitions WHERE object_id = OBJECT_ID('audit2_logs') AND data_compression_desc <> 'PAGE')
+    ALTER INDEX ALL ON audit2_logs REBUILD PARTITION = ALL WITH (DATA_COMPRESSION = PAGE);
+GO
+
+IF EXISTS (SELECT * FROM sys.partitions WHERE object_id = OBJECT_ID('audit2_logs_archive') AND data_compression_desc <> 'PAGE')
+    ALTER INDEX ALL ON audit2_logs_archive REBUILD PARTITION = ALL WITH (DATA_COMPRESSION = PAGE);
+GO
+
+EXEC sp_refreshview 'audit2_logs_all';
+GO
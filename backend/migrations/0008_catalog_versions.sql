@@ -0,0 +1,18 @@
+-- Change counters for the RBAC catalogs. The role, permission and assignment
+-- endpoints bump the matching row in the same transaction as their change;
+-- the versions make up the ETags of /api/roles, /api/permissions and
+-- /api/users/{id}/roles.
+
+IF OBJECT_ID('catalog_versions', 'U') IS NULL
+CREATE TABLE catalog_versions (
+    name NVARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME2 DEFAULT GETDATE()
+);
+GO
+
+INSERT INTO catalog_versions (name, version)
+SELECT catalog.name, 0
+FROM (VALUES ('roles'), ('permissions'), ('user_roles')) AS catalog (name)
+WHERE NOT EXISTS (SELECT 1 FROM catalog_versions WHERE catalog_versions.name = catalog.name);
+GO
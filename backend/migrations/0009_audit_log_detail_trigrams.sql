@@ -0,0 +1,13 @@
+-- details is now indexed by trigrams like action and username (it held whole
+-- words), so a search matches the same rows before and after they are indexed.
+-- The tokens are rebuilt from scratch by the background indexer; until it
+-- catches up, unindexed logs are matched with LIKE.
+
+TRUNCATE TABLE audit_log_tokens;
+UPDATE audit_log_search_state SET indexed_through_id = 0, updated_at = GETDATE();
+GO
+
+-- Tokens of purged logs are deleted by log_id
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_audit_log_tokens_log_id' AND object_id = OBJECT_ID('audit_log_tokens'))
+    CREATE INDEX IX_audit_log_tokens_log_id ON audit_log_tokens (log_id);
+GO
@@ -0,0 +1,16 @@
+-- Logs can be committed after the hour they are stamped with was rolled up
+-- (backdated imports, sample data, late audit writer flushes). Each rollup run
+-- re-aggregates the hours that logs with id > rolled_up_through_id fall into
+-- below rolled_up_until, then moves rolled_up_through_id to the newest id.
+
+IF COL_LENGTH('audit_log_rollup_state', 'rolled_up_through_id') IS NULL
+    ALTER TABLE audit_log_rollup_state
+        ADD rolled_up_through_id INT NOT NULL
+            CONSTRAINT DF_audit_log_rollup_state_through_id DEFAULT 0;
+GO
+
+-- Existing rollups were computed from the logs committed so far
+UPDATE audit_log_rollup_state
+SET rolled_up_through_id = COALESCE((SELECT MAX(id) FROM audit2_logs_all), 0)
+WHERE name = 'audit2_logs';
+GO
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 # Role Models
@@ -27,6 +27,10 @@ class RoleResponse(RoleBase):
     class Config:
         from_attributes = True
 
+class RolePage(BaseModel):
+    items: List[RoleResponse]
+    next_cursor: Optional[str] = None
+
 # Permission Models
 class PermissionBase(BaseModel):
     name: str
@@ -52,6 +56,10 @@ class PermissionResponse(PermissionBase):
     class Config:
         from_attributes = True
 
+class PermissionPage(BaseModel):
+    items: List[PermissionResponse]
+    next_cursor: Optional[str] = None
+
 # Role Permission Assignment
 class RolePermissionAssign(BaseModel):
     role_id: int
@@ -102,6 +110,10 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
 # Audit Log Models
 class AuditLogBase(BaseModel):
     user_id: Optional[int] = None
@@ -194,4 +206,25 @@ class UserCreateWithPassword(UserCreate):
     password: str
 
 class UserUpdateWithPassword(UserUpdate):
-    password: Optional[str] = None
\ No newline at end of file
+    password: Optional[str] = None
+# Bulk user import
+class BulkImportRowResult(BaseModel):
+    row: int
+    username: Optional[str] = None
+    status: str  # created, invalid, duplicate, exists
+    user_id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkImportReport(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[BulkImportRowResult]
+
+# Batch requests
+class BatchItem(BaseModel):
+    path: str  # path and query string, e.g. /api/logs/stats?days=7
+    headers: Dict[str, str] = {}
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
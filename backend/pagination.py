@@ -0,0 +1,91 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort key of the last row a
+client has seen. The next page seeks past that key with a WHERE predicate
+instead of OFFSET, so it costs the same however deep the client pages.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(*values) -> str:
+    """Opaque token for the sort key (e.g. timestamp, id) of the last row on a page"""
+    raw = json.dumps(list(values), default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key_length: int) -> List:
+    """Sort key from a cursor token; raises a 400 for anything we did not issue"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != key_length:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+
+def seek_after(columns: Sequence[str], values: Sequence, descending: bool = False) -> Tuple[str, list]:
+    """
+    WHERE fragment and parameters selecting rows after `values` in ORDER BY `columns`.
+
+    SQL Server has no row-value comparison, so (a, b) > (?, ?) is expanded to
+    a >= ? AND (a > ? OR b > ?), which keeps a seekable range on the leading column.
+    """
+    op = "<" if descending else ">"
+    first, rest = columns[0], columns[1:]
+    if not rest:
+        return f"{first} {op} ?", [values[0]]
+    inner_sql, inner_params = seek_after(rest, values[1:], descending)
+    sql = f"{first} {op}= ? AND ({first} {op} ? OR ({inner_sql}))"
+    return sql, [values[0], values[0]] + inner_params
+
+
+def paginate(where_conditions: list, params: list, page_cursor: Optional[str], skip: int, limit: int,
+             order_by: str, key_columns: Sequence[str], descending: bool = False) -> str:
+    """
+    ORDER BY / paging tail for a list query. Call it after every other filter
+    has been added, since it appends to `where_conditions` and `params`.
+
+    Without a cursor this is the classic OFFSET page ordered by `order_by`.
+    With one ("" for the first page) rows are ordered by the unique
+    `key_columns`, the seek predicate goes into the WHERE clause, and one extra
+    row is fetched so next_cursor() can tell whether another page exists.
+    """
+    if page_cursor is None:
+        params.extend([skip, limit])
+        return f"ORDER BY {order_by} OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+
+    if page_cursor:
+        seek_sql, seek_params = seek_after(key_columns, decode_cursor(page_cursor, len(key_columns)), descending)
+        where_conditions.append(seek_sql)
+        params.extend(seek_params)
+
+    direction = " DESC" if descending else ""
+    params.append(limit + 1)
+    return "ORDER BY " + ", ".join(column + direction for column in key_columns) + \
+        " OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+
+
+def where_clause(where_conditions: list) -> str:
+    return "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+
+
+def next_cursor(rows: list, limit: int, key) -> Tuple[list, Optional[str]]:
+    """Trim the look-ahead row fetched past `limit` and build the cursor for the next page"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,180 @@
+"""
+In-process RBAC snapshot.
+
+Roles, permissions, role_permissions and user_roles are loaded in one round
+trip into id-indexed structures: every permission gets a bit position, every
+role a bitmask of its permissions, and a user's effective permissions are the
+OR of their roles' masks. Resolving permissions for a token or a permission
+check is then a few dictionary lookups instead of a four-table join.
+
+Endpoints that change RBAC data call rbac.changed() in the same transaction;
+once it commits the snapshot is invalidated and the next reader loads a fresh
+one and swaps it in. Until then, reads in that request see its own changes
+through a snapshot that is not cached, so uncommitted data never reaches
+other requests. RBAC_SNAPSHOT_TTL bounds
+how long changes made by other processes (or directly in the database) can go
+unnoticed.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from database import get_db_connection, current_unit_of_work, after_commit
+
+RBAC_SNAPSHOT_TTL = float(os.getenv("RBAC_SNAPSHOT_TTL", "60"))
+
+
+class RoleEntry(NamedTuple):
+    name: str
+    is_active: bool
+    mask: int
+
+
+class RBACSnapshot:
+    """Immutable view of the RBAC tables; build a new one instead of mutating"""
+
+    def __init__(self, roles, permissions, role_permissions, user_roles):
+        # Permission ids -> dense bit positions
+        self.permission_names: List[str] = []
+        self.permission_bits: Dict[int, int] = {}
+        self.resource_action_masks: Dict[Tuple[str, str], int] = {}
+        for permission_id, name, resource, action in permissions:
+            bit = len(self.permission_names)
+            self.permission_names.append(name)
+            self.permission_bits[permission_id] = bit
+            key = (resource, action)
+            self.resource_action_masks[key] = self.resource_action_masks.get(key, 0) | (1 << bit)
+
+        masks: Dict[int, int] = {}
+        for role_id, permission_id in role_permissions:
+            bit = self.permission_bits.get(permission_id)
+            if bit is not None:
+                masks[role_id] = masks.get(role_id, 0) | (1 << bit)
+
+        self.roles: Dict[int, RoleEntry] = {
+            role_id: RoleEntry(name, bool(is_active), masks.get(role_id, 0))
+            for role_id, name, is_active in roles
+        }
+
+        grouped: Dict[int, List[int]] = {}
+        for user_id, role_id in user_roles:
+            if role_id in self.roles:
+                grouped.setdefault(user_id, []).append(role_id)
+        self.user_roles: Dict[int, Tuple[int, ...]] = {
+            user_id: tuple(role_ids) for user_id, role_ids in grouped.items()
+        }
+
+    def user_mask(self, user_id: int, active_only: bool = False) -> int:
+        mask = 0
+        for role_id in self.user_roles.get(user_id, ()):
+            role = self.roles[role_id]
+            if role.is_active or not active_only:
+                mask |= role.mask
+        return mask
+
+    def names(self, mask: int) -> List[str]:
+        return [name for bit, name in enumerate(self.permission_names) if mask >> bit & 1]
+
+    def user_permissions(self, user_id: int) -> List[str]:
+        """Names of every permission granted to the user through any of their roles"""
+        return self.names(self.user_mask(user_id))
+
+    def check(self, user_id: int, resource: str, action: str) -> Tuple[List[str], List[str]]:
+        """(granting active role names, matching permission names) for resource/action"""
+        wanted = self.resource_action_masks.get((resource, action), 0)
+        roles = []
+        granted = 0
+        for role_id in self.user_roles.get(user_id, ()):
+            role = self.roles[role_id]
+            if role.is_active and role.mask & wanted:
+                roles.append(role.name)
+                granted |= role.mask & wanted
+        return roles, self.names(granted)
+
+
+def load_snapshot(cursor) -> RBACSnapshot:
+    cursor.execute("""
+        SELECT id, name, is_active FROM roles;
+        SELECT id, name, resource, action FROM permissions ORDER BY id;
+        SELECT role_id, permission_id FROM role_permissions;
+        SELECT user_id, role_id FROM user_roles ORDER BY user_id, role_id;
+    """)
+    roles = cursor.fetchall()
+    cursor.nextset()
+    permissions = cursor.fetchall()
+    cursor.nextset()
+    role_permissions = cursor.fetchall()
+    cursor.nextset()
+    user_roles = cursor.fetchall()
+    return RBACSnapshot(roles, permissions, role_permissions, user_roles)
+
+
+class RBACCache:
+    """Holds the current snapshot and reloads it when invalidated or expired"""
+
+    def __init__(self, ttl: float = RBAC_SNAPSHOT_TTL):
+        self.ttl = ttl
+        self._snapshot: Optional[RBACSnapshot] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._loaded_generation = -1
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and self._loaded_generation == self._generation
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def snapshot(self, cursor=None) -> RBACSnapshot:
+        """
+        Current snapshot, reloading it first if needed. Pass the caller's cursor
+        when it already holds a pooled connection, so a reload does not borrow a
+        second one.
+        """
+        uow = current_unit_of_work.get()
+        if cursor is not None and uow is not None and "rbac" in uow.changed:
+            # This transaction changed RBAC data: read it through, bypassing the cache
+            return load_snapshot(cursor)
+
+        if self._is_fresh():
+            return self._snapshot
+
+        with self._lock:
+            if self._is_fresh():
+                return self._snapshot
+
+            generation = self._generation
+            if cursor is not None:
+                snapshot = load_snapshot(cursor)
+            else:
+                with get_db_connection() as conn:
+                    snapshot = load_snapshot(conn.cursor())
+
+            # Swap in one assignment; readers see the old or the new snapshot, never a mix
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+            self._loaded_generation = generation
+            self.loads += 1
+            return snapshot
+
+    def changed(self):
+        """
+        Call from a transaction that changes roles, permissions or their
+        assignments; the snapshot is invalidated once it commits
+        """
+        uow = current_unit_of_work.get()
+        if uow is not None:
+            uow.changed.add("rbac")
+        after_commit(self.invalidate)
+
+    def invalidate(self):
+        """Call after committing a change to roles, permissions or their assignments"""
+        with self._lock:
+            self._generation += 1
+
+
+rbac = RBACCache()
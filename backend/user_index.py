@@ -0,0 +1,188 @@
+"""
+In-memory search index for the user directory.
+
+Every user's username, full name, email and department are indexed by
+lowercase trigram and by the first one and two characters of each word, so
+directory search and typeahead are answered from memory: candidates come from
+the smallest posting sets, are rechecked against the actual values and ranked
+(exact match, then prefix, then word prefix, then substring; name fields
+before email before department). The database is only read to hydrate the
+returned page.
+
+The index is loaded on first use (and at startup), updated in place by the
+user endpoints after their transaction commits, and reloaded when invalidated
+or older than USER_INDEX_TTL, which bounds how long changes made by other
+processes go unnoticed.
+"""
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from database import get_db_connection
+
+USER_INDEX_TTL = float(os.getenv("USER_INDEX_TTL", "300"))
+
+SEARCH_FIELDS = ("username", "full_name", "email", "department")
+FIELD_WEIGHTS = {"username": 4, "full_name": 4, "email": 2, "department": 1}
+
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = 4, 3, 2, 1
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+class UserEntry(NamedTuple):
+    id: int
+    username: str
+    email: str
+    full_name: str
+    department: Optional[str]
+    is_active: bool
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _keys(value: str) -> Set[str]:
+    """Index keys of a lowercase value: its trigrams and '^'-marked word prefixes"""
+    keys = _trigrams(value)
+    for word in _WORD.findall(value):
+        keys.add("^" + word[:1])
+        keys.add("^" + word[:2])
+    return keys
+
+
+def _match(value: str, term: str) -> int:
+    if term not in value:
+        return 0
+    if value == term:
+        return EXACT
+    if value.startswith(term):
+        return PREFIX
+    if any(word.startswith(term) for word in _WORD.findall(value)):
+        return WORD_PREFIX
+    return SUBSTRING
+
+
+class UserSearchIndex:
+    def __init__(self, ttl: float = USER_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._entries: Dict[int, UserEntry] = {}
+        self._values: Dict[int, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._loaded_at: Optional[float] = None
+        self.loads = 0
+
+    @property
+    def fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self):
+        """Rebuild the index from the users table (blocking; run on the DB executor)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, username, email, full_name, department, is_active FROM users")
+            rows = cursor.fetchall()
+        self.build(UserEntry(row[0], row[1], row[2], row[3], row[4], bool(row[5])) for row in rows)
+
+    def build(self, entries: Iterable[UserEntry]):
+        with self._lock:
+            self._entries.clear()
+            self._values.clear()
+            self._postings.clear()
+            for entry in entries:
+                self._add(entry)
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def ensure_loaded(self):
+        if not self.fresh:
+            with self._lock:
+                if not self.fresh:
+                    self.load()
+
+    def invalidate(self):
+        """Reload on next use, e.g. after bulk changes to users"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _add(self, entry: UserEntry):
+        values = tuple((getattr(entry, field) or "").lower() for field in SEARCH_FIELDS)
+        self._entries[entry.id] = entry
+        self._values[entry.id] = values
+        for key in set().union(*(_keys(value) for value in values)):
+            self._postings.setdefault(key, set()).add(entry.id)
+
+    def _discard(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        for key in set().union(*(_keys(value) for value in self._values.pop(user_id))):
+            posting = self._postings.get(key)
+            if posting is not None:
+                posting.discard(user_id)
+                if not posting:
+                    del self._postings[key]
+
+    # Incremental updates, called once the corresponding write has committed
+
+    def add(self, user_id: int, username: str, email: str, full_name: str,
+            department: Optional[str] = None, is_active: bool = True):
+        with self._lock:
+            self._discard(user_id)
+            self._add(UserEntry(user_id, username, email, full_name, department, bool(is_active)))
+
+    def update(self, user_id: int, **fields):
+        """Change some of a user's fields; None values are left as they are"""
+        with self._lock:
+            current = self._entries.get(user_id)
+            if current is None:
+                # Not seen yet (e.g. created by another worker): pick it up on reload
+                self._loaded_at = None
+                return
+            self._discard(user_id)
+            self._add(current._replace(**{name: value for name, value in fields.items() if value is not None}))
+
+    def remove(self, user_id: int):
+        with self._lock:
+            self._discard(user_id)
+
+    # Queries
+
+    def get(self, user_id: int) -> Optional[UserEntry]:
+        return self._entries.get(user_id)
+
+    def search(self, query: str) -> List[UserEntry]:
+        """Users matching `query`, best match first"""
+        term = query.strip().lower()
+        if not term:
+            return []
+        # One and two character queries match word prefixes, longer ones any substring
+        keys = _trigrams(term) if len(term) >= 3 else {"^" + term}
+        minimum = SUBSTRING if len(term) >= 3 else WORD_PREFIX
+
+        with self._lock:
+            postings = sorted((self._postings.get(key, set()) for key in keys), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:]) if postings else set()
+            ranked = []
+            for user_id in candidates:
+                score = 0
+                for field, value in zip(SEARCH_FIELDS, self._values[user_id]):
+                    kind = _match(value, term)
+                    if kind >= minimum:
+                        score = max(score, kind * 10 + FIELD_WEIGHTS[field])
+                if score:
+                    entry = self._entries[user_id]
+                    ranked.append((-score, self._values[user_id][1], user_id, entry))
+
+        ranked.sort(key=lambda item: item[:3])
+        return [item[3] for item in ranked]
+
+
+user_index = UserSearchIndex()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark for serializing large list responses.
+
+Builds a 1000-row /api/users page (UserResponse with roles) and a 1000-row
+/api/logs page with before/after payloads and times each step of turning
+them into a response body: building the models (validated constructor vs
+model_construct), the response_model check, and rendering (json.dumps via
+JSONResponse vs orjson via ORJSONResponse), plus the bytes on the wire without
+and with CompressionMiddleware's gzip. Needs no database.
+
+    python benchmarks/bench_responses.py [rows] [iterations]
+"""
+import os
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from compression import COMPRESSION_LEVEL, ENCODINGS
+from models import PermissionResponse, RoleResponse, UserResponse
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+USERS = TypeAdapter(List[UserResponse])
+
+
+def user_rows(rows: int):
+    return [
+        (i, f"user{i}", f"user{i}@example.com", f"User Number {i}", i % 5 != 0, NOW - timedelta(days=i), NOW)
+        for i in range(1, rows + 1)
+    ]
+
+
+def role_fields(role_id: int) -> dict:
+    permissions = [
+        dict(id=p, name=f"perm.{p}", display_name=f"Permission {p}", description="Bench permission",
+             resource="users", action="read", created_at=NOW)
+        for p in range(role_id * 3, role_id * 3 + 3)
+    ]
+    return dict(id=role_id, name=f"role{role_id}", display_name=f"Role {role_id}", description="Bench role",
+                is_active=True, created_at=NOW, updated_at=NOW), permissions
+
+
+def build_users(rows, construct: bool) -> list:
+    make = (lambda model, **fields: model.model_construct(**fields)) if construct else \
+        (lambda model, **fields: model(**fields))
+    users = []
+    for row in rows:
+        role, permissions = role_fields(row[0] % 4)
+        roles = [make(RoleResponse, **role, permissions=[make(PermissionResponse, **p) for p in permissions])]
+        users.append(make(UserResponse, id=row[0], username=row[1], email=row[2], full_name=row[3],
+                          is_active=row[4], created_at=row[5], last_login=row[6], roles=roles))
+    return users
+
+
+def build_logs(rows: int) -> list:
+    return [
+        {
+            "id": i, "user_id": i % 50, "username": f"user{i % 50}", "action": "update_user",
+            "resource": "users", "details": f"Updated user {i}: email changed", "ip_address": "10.0.0.1",
+            "user_agent": "Mozilla/5.0", "timestamp": NOW - timedelta(minutes=i), "status": "success",
+            "severity": "medium", "session_id": f"session-{i % 20}", "request_id": f"req-{i}",
+            "module": "user_management",
+            "before_data": f"username: user{i}, email: old{i}@example.com, full_name: User Number {i}, active: True",
+            "after_data": f"username: user{i}, email: user{i}@example.com, full_name: User Number {i}, active: True",
+        }
+        for i in range(1, rows + 1)
+    ]
+
+
+def compress(body: bytes) -> bytes:
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, ENCODINGS["gzip"])
+    return compressor.compress(body) + compressor.flush()
+
+
+def timed(iterations: int, work) -> float:
+    """Milliseconds per call of work()"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        work()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def report(name: str, stages: list, before_body: bytes, after_body: bytes):
+    print(name)
+    for stage, before_ms, after_ms in stages:
+        print(f"  {stage:<28} {before_ms:8.1f} ms -> {after_ms:8.1f} ms  ({before_ms / after_ms:.1f}x)")
+    wire = compress(after_body)
+    print(f"  {'bytes on the wire':<28} {len(before_body):8,d}    -> {len(wire):8,d}     "
+          f"({len(before_body) / len(wire):.1f}x smaller)")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    users, logs = user_rows(rows), build_logs(rows)
+
+    # FastAPI validates the returned models against response_model and dumps
+    # them to JSON-compatible data either way; that step is timed once, apart
+    validated, constructed = build_users(users, construct=False), build_users(users, construct=True)
+    content = USERS.dump_python(USERS.validate_python(constructed), mode="json")
+    report(f"/api/users, {rows} rows", [
+        ("build models", timed(iterations, lambda: build_users(users, construct=False)),
+         timed(iterations, lambda: build_users(users, construct=True))),
+        ("response_model check+dump", timed(iterations, lambda: USERS.dump_python(
+            USERS.validate_python(validated), mode="json")), timed(iterations, lambda: USERS.dump_python(
+            USERS.validate_python(constructed), mode="json"))),
+        ("render body", timed(iterations, lambda: JSONResponse(content)),
+         timed(iterations, lambda: ORJSONResponse(content))),
+    ], JSONResponse(content).body, ORJSONResponse(content).body)
+
+    # /api/logs returns plain dicts, which FastAPI runs through jsonable_encoder
+    content = jsonable_encoder(logs)
+    report(f"/api/logs, {rows} rows with payloads", [
+        ("render body", timed(iterations, lambda: JSONResponse(content)),
+         timed(iterations, lambda: ORJSONResponse(content))),
+    ], JSONResponse(content).body, ORJSONResponse(content).body)
+    print(f"  (jsonable_encoder, unchanged: {timed(iterations, lambda: jsonable_encoder(logs)):.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
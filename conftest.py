@@ -0,0 +1,135 @@
+"""
+Shared pytest setup for the backend tests.
+
+The backend talks to SQL Server through pyodbc. These tests run without a
+database: `pyodbc.connect` is swapped for an in-memory fake before any backend
+module is imported, and each test scripts the rows the fake returns.
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import pyodbc
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.fast_executemany = False
+        self.rowcount = -1
+        self._result_sets = []
+        self._rows = []
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        db = self.connection.db
+        if self.connection.broken:
+            raise pyodbc.Error("08S01", "Communication link failure")
+        db.queries.append((sql, params))
+        result = db.handler(sql, params) if db.handler else None
+        if isinstance(result, ResultSets):
+            self._result_sets = [list(rows) for rows in result.sets]
+        else:
+            self._result_sets = [list(result or [])]
+        self._rows = self._result_sets.pop(0)
+        self.rowcount = len(self._rows)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        db = self.connection.db
+        seq_of_params = [tuple(params) for params in seq_of_params]
+        db.queries.append((sql, seq_of_params))
+        db.executemany_calls.append((sql, seq_of_params, self.fast_executemany))
+        self._rows = []
+        self.rowcount = len(seq_of_params)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def nextset(self):
+        if not self._result_sets:
+            return None
+        self._rows = self._result_sets.pop(0)
+        return True
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.autocommit = False
+        self.timeout = 0
+        self.closed = False
+        self.broken = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.db.commits += 1
+
+    def rollback(self):
+        if self.broken:
+            raise pyodbc.Error("08S01", "Communication link failure")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class ResultSets:
+    """Handler return value for a batch that produces several result sets"""
+
+    def __init__(self, *sets):
+        self.sets = sets
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.handler = None
+        self.queries = []
+        self.executemany_calls = []
+        self.connections = []
+        self.commits = 0
+
+    def connect(self, *args, **kwargs):
+        conn = FakeConnection(self)
+        self.connections.append(conn)
+        return conn
+
+    def statements(self, fragment):
+        """SQL statements executed so far that contain `fragment`"""
+        return [sql for sql, _ in self.queries if fragment in sql]
+
+
+FAKE_DB = FakeDatabase()
+pyodbc.connect = FAKE_DB.connect
+
+
+@pytest.fixture
+def fake_db():
+    FAKE_DB.reset()
+    yield FAKE_DB
+    FAKE_DB.reset()
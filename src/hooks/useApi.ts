@@ -1,3 +1,4 @@
+import { useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 
 // Types for SQL Server data
@@ -497,6 +498,7 @@ const api = {
     module?: string;
     days?: number;
     status?: string;
+    q?: string;
     skip?: number;
     limit?: number;
   }): Promise<LogEntry[]> {
@@ -507,6 +509,7 @@ const api = {
     if (filters?.module) params.append('module', filters.module);
     if (filters?.days) params.append('days', filters.days.toString());
     if (filters?.status) params.append('status', filters.status);
+    if (filters?.q) params.append('q', filters.q);
     if (filters?.skip) params.append('skip', filters.skip.toString());
     if (filters?.limit) params.append('limit', filters.limit.toString());
     
@@ -538,6 +541,17 @@ const api = {
     }
   },
 
+  async getLog(logId: number): Promise<LogEntry> {
+    const token = localStorage.getItem('access_token');
+    const response = await fetch(`/api/logs/${logId}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`,
+      },
+    });
+    if (!response.ok) throw new Error('Failed to fetch log entry');
+    return response.json();
+  },
+
   async getLogStats(days: number = 30): Promise<LogStats> {
     const url = `/api/logs/stats?days=${days}`;
     console.log('Fetching log stats from:', url);
@@ -574,6 +588,7 @@ const api = {
     module?: string;
     days?: number;
     status?: string;
+    q?: string;
   }): Promise<Blob> {
     const params = new URLSearchParams();
     params.append('format', format);
@@ -583,6 +598,7 @@ const api = {
     if (filters?.module) params.append('module', filters.module);
     if (filters?.days) params.append('days', filters.days.toString());
     if (filters?.status) params.append('status', filters.status);
+    if (filters?.q) params.append('q', filters.q);
     
     const url = `/api/logs/export?${params.toString()}`;
     console.log('Exporting logs from:', url);
@@ -963,13 +979,50 @@ export const useLogs = (filters?: {
   module?: string;
   days?: number;
   status?: string;
+  q?: string;
   skip?: number;
   limit?: number;
 }) => {
+  const queryClient = useQueryClient();
+  // The first page follows /api/logs/stream; free-text searches and later pages still poll
+  const live = !filters?.q && !filters?.skip;
+  const filtersKey = JSON.stringify(filters ?? {});
+
+  useEffect(() => {
+    if (!live) return;
+    const params = new URLSearchParams();
+    if (filters?.severity) params.append('severity', filters.severity);
+    if (filters?.action) params.append('action', filters.action);
+    if (filters?.username) params.append('username', filters.username);
+    if (filters?.module) params.append('module', filters.module);
+    if (filters?.status) params.append('status', filters.status);
+
+    // EventSource reconnects on its own and resumes after the last id it received
+    const source = new EventSource(`/api/logs/stream?${params.toString()}`);
+    source.onmessage = (event) => {
+      const entry: LogEntry = JSON.parse(event.data);
+      queryClient.setQueryData<LogEntry[]>(['logs', filters], (logs) =>
+        logs && !logs.some((log) => log.id === entry.id)
+          ? [entry, ...logs].slice(0, filters?.limit ?? 100)
+          : logs
+      );
+    };
+    return () => source.close();
+  }, [live, filtersKey, queryClient]);
+
   return useQuery({
     queryKey: ['logs', filters],
     queryFn: () => api.getLogs(filters),
-    refetchInterval: 30000, // Refresh every 30 seconds for real-time logs
+    refetchInterval: live ? false : 30000, // Searches and later pages refresh every 30 seconds
+  });
+};
+
+// Full entry including before/after payloads, which the list leaves out
+export const useLogEntry = (logId?: number | null) => {
+  return useQuery({
+    queryKey: ['logs', 'entry', logId],
+    queryFn: () => api.getLog(logId as number),
+    enabled: !!logId,
   });
 };
 
@@ -992,6 +1045,7 @@ export const useExportLogs = () => {
         module?: string;
         days?: number;
         status?: string;
+        q?: string;
       }
     }) => api.exportLogs(format, filters),
   });
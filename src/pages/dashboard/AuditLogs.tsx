@@ -51,6 +51,7 @@ import { useToast } from "@/hooks/use-toast";
 import { usePermissions } from "@/hooks/usePermissions";
 import {
   useLogs,
+  useLogEntry,
   useLogStats,
   useExportLogs,
   type LogEntry,
@@ -65,6 +66,7 @@ export default function AuditLogs() {
     module: "",
     days: 30,
     status: "",
+    q: "",
     skip: 0,
     limit: 100,
   });
@@ -80,6 +82,8 @@ export default function AuditLogs() {
   // API hooks - using real data from database
   const { data: logs = [], isLoading: logsLoading, refetch: refetchLogs } = useLogs(filters);
   const { data: logStats, isLoading: statsLoading, refetch: refetchStats } = useLogStats(statsTimeRange);
+  const { data: logEntry } = useLogEntry(logDetailOpen ? selectedLog?.id : null);
+  const logPayloads = logEntry ?? selectedLog;
   const exportLogsMutation = useExportLogs();
 
   // Refresh function
@@ -96,7 +100,7 @@ export default function AuditLogs() {
   const handleSearch = () => {
     setFilters(prev => ({
       ...prev,
-      action: searchTerm,
+      q: searchTerm,
       skip: 0
     }));
   };
@@ -131,6 +135,7 @@ export default function AuditLogs() {
           module: filters.module || undefined,
           days: filters.days,
           status: filters.status || undefined,
+          q: filters.q || undefined,
         }
       });
 
@@ -699,21 +704,21 @@ export default function AuditLogs() {
                 </div>
               )}
 
-              {(selectedLog.before_data || selectedLog.after_data) && (
+              {(logPayloads?.before_data || logPayloads?.after_data) && (
                 <div className="space-y-4">
-                  {selectedLog.before_data && (
+                  {logPayloads?.before_data && (
                     <div>
                       <span className="font-medium">Before:</span>
                       <pre className="mt-2 p-3 bg-muted rounded-lg text-xs overflow-x-auto">
-                        {selectedLog.before_data}
+                        {logPayloads?.before_data}
                       </pre>
                     </div>
                   )}
-                  {selectedLog.after_data && (
+                  {logPayloads?.after_data && (
                     <div>
                       <span className="font-medium">After:</span>
                       <pre className="mt-2 p-3 bg-muted rounded-lg text-xs overflow-x-auto">
-                        {selectedLog.after_data}
+                        {logPayloads?.after_data}
                       </pre>
                     </div>
                   )}
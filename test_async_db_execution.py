@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import main
+from database import offload_db, run_db
+
+SLOW_QUERY_SECONDS = 0.6
+
+
+def slow_stats_handler(sql, params):
+    if "FROM audit_log_rollup_state" in sql:
+        return [(datetime.now(), None)]
+    if "COUNT(DISTINCT username)" in sql:
+        time.sleep(SLOW_QUERY_SECONDS)
+        return [(0, 0, 0, 0, 0, 0, 0, 0, 0, 0)]
+    return []
+
+
+async def timed_get(client, url):
+    started = time.perf_counter()
+    response = await client.get(url)
+    return response, time.perf_counter() - started
+
+
+def test_slow_query_does_not_delay_health_check(fake_db):
+    fake_db.handler = slow_stats_handler
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.create_task(timed_get(client, "/api/logs/stats?days=365"))
+            await asyncio.sleep(0.05)
+            health = await timed_get(client, "/api/health")
+            return await slow, health
+
+    (stats_response, stats_elapsed), (health_response, health_elapsed) = asyncio.run(scenario())
+
+    assert stats_response.status_code == 200
+    assert health_response.status_code == 200
+    assert stats_elapsed >= SLOW_QUERY_SECONDS
+    # Health finishes while the stats query is still running on another DB thread
+    assert health_elapsed < SLOW_QUERY_SECONDS / 2
+
+
+def test_offloaded_call_times_out_with_504():
+    @offload_db(timeout=0.05)
+    def stuck():
+        time.sleep(0.3)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(stuck())
+
+    assert excinfo.value.status_code == 504
+
+
+def test_run_db_sets_query_timeout_on_borrowed_connections(fake_db):
+    def borrow():
+        with main.get_db_connection() as conn:
+            return conn.timeout
+
+    assert asyncio.run(run_db(borrow, timeout=2.5)) == 3
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import threading
+import time
+
+import main
+from audit_writer import AuditWriter
+
+
+def record(n):
+    return (1, "admin", f"action_{n}", "users", None, "info", "users", None, None, "success")
+
+
+def test_flushes_full_batches_with_fast_executemany(fake_db):
+    writer = AuditWriter(enabled=True, batch_size=50, flush_interval=5.0)
+    writer.start()
+    for n in range(120):
+        assert writer.enqueue(record(n))
+    writer.stop()
+
+    assert [len(params) for _, params, _ in fake_db.executemany_calls] == [50, 50, 20]
+    assert all(fast for _, _, fast in fake_db.executemany_calls)
+    stats = writer.stats()
+    assert stats["queued"] == stats["flushed"] == 120
+    assert stats["dropped"] == stats["failed"] == 0
+
+
+def test_partial_batch_is_flushed_after_interval(fake_db):
+    writer = AuditWriter(enabled=True, batch_size=100, flush_interval=0.05)
+    writer.start()
+    writer.enqueue(record(1))
+
+    deadline = time.monotonic() + 2
+    while writer.stats()["flushed"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.stop()
+
+    assert writer.stats()["flushed"] == 1
+    assert writer.stats()["batches"] == 1
+
+
+def test_full_queue_drops_instead_of_blocking(fake_db):
+    release = threading.Event()
+    writer = AuditWriter(enabled=True, queue_size=2, batch_size=1, flush_interval=0.01, enqueue_timeout=0.01)
+
+    def slow_flush(batch):
+        # Simulate a stalled database until the test releases it
+        release.wait(2)
+        AuditWriter._flush(writer, batch)
+
+    writer._flush = slow_flush
+    writer.start()
+
+    results = [writer.enqueue(record(n)) for n in range(10)]
+    release.set()
+    writer.stop()
+
+    assert results.count(False) == writer.stats()["dropped"] > 0
+    assert writer.stats()["flushed"] == results.count(True)
+
+
+def test_log_activity_enqueues_when_writer_is_running(fake_db, monkeypatch):
+    writer = AuditWriter(enabled=True, batch_size=10, flush_interval=5.0)
+    monkeypatch.setattr(main, "audit_writer", writer)
+    writer.start()
+
+    with main.get_db_connection() as conn:
+        main.log_activity(conn=conn, username="admin", action="update_user", resource="users")
+    assert fake_db.statements("INSERT INTO audit2_logs") == []
+
+    writer.stop()
+    assert len(fake_db.executemany_calls) == 1
+    assert writer.stats()["flushed"] == 1
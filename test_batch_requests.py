@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+from batch import BATCH_MAX_REQUESTS
+from database import connection_pool, UnitOfWork, current_unit_of_work, finish_unit_of_work
+from models import BatchItem, BatchRequest
+
+ADMIN = {"id": 1, "sub": "1", "username": "admin", "permissions": []}
+PERMISSIONS = [(i, f"perm.{i}", f"Permission {i}", "", "users", "read", datetime(2024, 1, 1)) for i in (1, 2)]
+
+
+def batch_request() -> Request:
+    return Request({
+        "type": "http", "method": "POST", "path": "/api/batch", "query_string": b"", "app": main.app,
+        "headers": [(b"authorization", b"Bearer token"), (b"content-type", b"application/json")],
+    })
+
+
+def run_batch(*items):
+    batch = BatchRequest(requests=[BatchItem(**item) for item in items])
+
+    async def in_unit_of_work():
+        uow = UnitOfWork()
+        token = current_unit_of_work.set(uow)
+        try:
+            return await main.batch_requests(batch, batch_request(), current_user=ADMIN)
+        finally:
+            current_unit_of_work.reset(token)
+            await finish_unit_of_work(uow, True)
+
+    return json.loads(asyncio.run(in_unit_of_work()).body)["responses"]
+
+
+@pytest.fixture
+def catalog_db(fake_db):
+    def handler(sql, params):
+        if "FROM catalog_versions" in sql:
+            return [("roles", 1), ("permissions", 4), ("user_roles", 1)]
+        if "FROM permissions" in sql:
+            return PERMISSIONS
+        if "FROM roles" in sql:
+            return []
+        return []
+
+    main.catalog_versions.invalidate()
+    fake_db.handler = handler
+    return fake_db
+
+
+def test_sub_requests_share_one_connection_and_keep_their_order(catalog_db, monkeypatch):
+    acquired = []
+    acquire = connection_pool.acquire
+    monkeypatch.setattr(connection_pool, "acquire", lambda *args, **kwargs: acquired.append(1) or acquire(*args, **kwargs))
+
+    responses = run_batch(
+        {"path": "/api/permissions?resource=users"},
+        {"path": "/api/roles?active_only=true"},
+        {"path": "/api/missing"},
+        {"path": "/api/users/abc/roles"},
+    )
+
+    assert [response["status"] for response in responses] == [200, 200, 404, 422]
+    assert [permission["name"] for permission in responses[0]["body"]] == ["perm.1", "perm.2"]
+    assert responses[0]["headers"]["etag"] == '"permissions-4"'
+    assert responses[1]["body"] == []
+    assert responses[2]["body"] == {"detail": "Not Found"}
+    assert len(acquired) == 1
+    assert [params[0] for sql, params in catalog_db.queries if "FROM permissions" in sql] == ["users"]
+
+
+def test_sub_requests_can_revalidate_with_etags(catalog_db):
+    responses = run_batch({"path": "/api/permissions", "headers": {"If-None-Match": '"permissions-4"'}})
+
+    assert responses == [{"status": 304, "headers": {"etag": '"permissions-4"', "cache-control": "no-cache"},
+                          "body": None}]
+    assert not catalog_db.statements("FROM permissions")
+
+
+@pytest.mark.parametrize("paths", [
+    [],
+    ["/api/batch"],
+    ["/docs"],
+    ["/api/health", "/api/logs/stream?severity=high"],
+    ["/api/logs/export/?format=csv"],
+    ["/api/health"] * (BATCH_MAX_REQUESTS + 1),
+])
+def test_invalid_batches_are_rejected(fake_db, paths):
+    with pytest.raises(HTTPException) as error:
+        run_batch(*({"path": path} for path in paths))
+    assert error.value.status_code == 400
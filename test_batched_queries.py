@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import main
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def role_row(role_id):
+    return (role_id, f"role_{role_id}", f"Role {role_id}", None, True, NOW, NOW)
+
+
+def permission_row(role_id, permission_id):
+    return (role_id, permission_id, f"perm.{permission_id}", f"Perm {permission_id}", None, "perm", "read", NOW)
+
+
+def roles_handler(role_count, permissions_per_role=3):
+    def handler(sql, params):
+        if "FROM roles" in sql:
+            return [role_row(role_id) for role_id in range(1, role_count + 1)]
+        if "FROM permissions p" in sql:
+            return [
+                permission_row(role_id, role_id * 100 + n)
+                for role_id in params
+                for n in range(permissions_per_role)
+            ]
+        return []
+    return handler
+
+
+@pytest.mark.parametrize("role_count", [1, 25, 500])
+def test_get_roles_query_count_is_constant(fake_db, role_count):
+    fake_db.handler = roles_handler(role_count)
+
+    roles = asyncio.run(main.get_roles(skip=0, limit=1000, active_only=False))
+
+    assert len(roles) == role_count
+    assert all(len(role.permissions) == 3 for role in roles)
+    assert roles[-1].permissions[0].name == f"perm.{role_count * 100}"
+    assert len(fake_db.queries) == 2
+
+
+def test_get_role_loads_permissions_in_one_query(fake_db):
+    fake_db.handler = roles_handler(1, permissions_per_role=40)
+
+    role = asyncio.run(main.get_role(1))
+
+    assert len(role.permissions) == 40
+    assert len(fake_db.queries) == 2
+
+
+def user_row(user_id):
+    return (user_id, f"user{user_id}", f"user{user_id}@example.com", f"User {user_id}", True, NOW, None)
+
+
+def users_handler(user_count, roles_per_user=2):
+    def handler(sql, params):
+        if "FROM users" in sql:
+            rows = [user_row(user_id) for user_id in range(1, user_count + 1)]
+            if "department" in sql:
+                rows = [row + ("IT", "Engineer", "") for row in rows]
+            return rows
+        if "FROM roles r" in sql:
+            return [
+                (user_id,) + role_row(n)
+                for user_id in params
+                for n in range(1, roles_per_user + 1)
+            ]
+        return []
+    return handler
+
+
+@pytest.mark.parametrize("user_count", [1, 40, 1000])
+def test_get_users_query_count_is_constant(fake_db, user_count):
+    fake_db.handler = users_handler(user_count)
+
+    users = asyncio.run(main.get_users(skip=0, limit=1000, active_only=False))
+
+    assert len(users) == user_count
+    assert [role.id for role in users[-1].roles] == [1, 2]
+    assert len(fake_db.queries) == 2
+
+
+@pytest.mark.parametrize("user_count", [1, 300])
+def test_search_all_users_query_count_is_constant(fake_db, user_count):
+    fake_db.handler = users_handler(user_count)
+
+    users = asyncio.run(main.search_all_users(
+        query=None, role="role_1", status="active", department=None, skip=0, limit=1000
+    ))
+
+    assert len(users) == user_count
+    assert users[0]["roles"][0]["name"] == "role_1"
+    assert len(fake_db.queries) == 2
+    search_sql = fake_db.queries[0][0]
+    assert "DISTINCT" not in search_sql
+    assert "LEFT JOIN" not in search_sql
+    assert "EXISTS" in search_sql
+
+
+def test_single_user_endpoints_reuse_batched_role_loader(fake_db):
+    fake_db.handler = users_handler(1, roles_per_user=3)
+
+    roles = asyncio.run(main.get_user_roles(1))
+    profile = asyncio.run(main.get_user_profile(1))
+
+    assert [role.id for role in roles] == [1, 2, 3]
+    assert [role["id"] for role in profile["roles"]] == [1, 2, 3]
+    assert len(fake_db.statements("WHERE ur.user_id IN")) == 2
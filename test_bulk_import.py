@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+from bulk_import import FORMAT_CSV, FORMAT_NDJSON, parse_upload, read_upload
+from conftest import ResultSets
+from rbac import RBACCache
+
+ADMIN = {"id": 1, "sub": "1", "username": "admin", "permissions": ["data.import"]}
+
+CSV = """username,email,full_name,password,is_active,role_ids
+alice,alice@example.com,Alice A,secret1,true,2;3
+bob,bob@example.com,Bob B,secret2,,
+carol,carol@example.com,Carol C,secret3,false,2
+ALICE,other@example.com,Alice Again,secret4,true,
+dave,dave@example.com,Dave D,secret5,true,admin
+erin,erin@example.com,Erin E,secret6,true,99
+"""
+
+
+def upload_request(body: bytes, content_type: str) -> Request:
+    chunks = [body[:10], body[10:]]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    scope = {"type": "http", "method": "POST", "path": "/api/users/bulk", "query_string": b"",
+             "headers": [(b"content-type", content_type.encode())]}
+    return Request(scope, receive)
+
+
+def test_rows_are_validated_and_deduplicated_within_the_file():
+    rows, rejected = parse_upload(CSV, FORMAT_CSV, known_role_ids={1, 2, 3})
+
+    assert [(item.row, item.user.username, item.user.role_ids, item.user.is_active) for item in rows] == [
+        (2, "alice", [2, 3], True), (3, "bob", [], True), (4, "carol", [2], False)
+    ]
+    assert [(result.row, result.status) for result in rejected] == [(5, "duplicate"), (6, "invalid"), (7, "invalid")]
+    assert "role_ids" in rejected[1].error
+    assert rejected[2].error == "unknown role ids: [99]"
+
+
+def test_ndjson_rows_and_size_limits():
+    text = "\n".join([
+        json.dumps({"username": "zed", "email": "zed@example.com", "full_name": "Zed", "password": "pw"}),
+        "not json",
+        json.dumps({"username": "z" * 51, "email": "long@example.com", "full_name": "Long", "password": "pw"}),
+    ])
+    rows, rejected = parse_upload(text, FORMAT_NDJSON, known_role_ids=set())
+    assert [item.user.username for item in rows] == ["zed"]
+    assert [(result.row, result.status) for result in rejected] == [(2, "invalid"), (3, "invalid")]
+    assert rejected[1].error == "too long: username"
+
+    with pytest.raises(HTTPException) as error:
+        parse_upload(text, FORMAT_NDJSON, known_role_ids=set(), max_rows=2)
+    assert error.value.status_code == 413
+
+    async def chunks():
+        yield b"x" * 10
+        yield b"x" * 10
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(chunks(), max_bytes=15))
+    assert error.value.status_code == 413
+
+
+def test_bulk_import_inserts_set_based_and_reports_every_row(fake_db, monkeypatch):
+    executors = set()
+
+    async def fast_hash(password, executor=None):
+        executors.add(executor)
+        return f"hash:{password}"
+
+    monkeypatch.setattr(main, "hash_password_async", fast_hash)
+    monkeypatch.setattr(main, "rbac", RBACCache())
+
+    def handler(sql, params):
+        if "FROM roles;" in sql:
+            return ResultSets([(1, "admin", True), (2, "viewer", True), (3, "editor", True)], [], [], [])
+        if "OPENJSON" in sql:
+            # bob is already registered
+            return [("Bob", "bob@example.com")]
+        if "INSERT INTO users" in sql:
+            return [(10, "alice"), (11, "carol")]
+        return []
+
+    fake_db.handler = handler
+    report = asyncio.run(main.bulk_import_users(
+        upload_request(CSV.encode(), "text/csv; charset=utf-8"), format=None, current_user=ADMIN
+    ))
+
+    assert (report.total, report.created, report.failed) == (6, 2, 4)
+    assert [(result.row, result.status, result.user_id) for result in report.results] == [
+        (2, "created", 10), (3, "exists", None), (4, "created", 11),
+        (5, "duplicate", None), (6, "invalid", None), (7, "invalid", None),
+    ]
+
+    # Users are staged with fast_executemany and inserted with one statement per chunk
+    staged = [call for call in fake_db.executemany_calls if "#bulk_users" in call[0]]
+    assert len(staged) == 1 and staged[0][2] is True
+    assert [row[:2] for row in staged[0][1]] == [(2, "alice"), (4, "carol")]
+    assert staged[0][1][0][5] == "hash:secret1"
+    # Import hashes stay off the executor that logins verify on
+    assert executors == {main.bulk_hash_executor}
+    assert len(fake_db.statements("FROM #bulk_users b")) == 1
+
+    roles = [call for call in fake_db.executemany_calls if "INSERT INTO user_roles" in call[0]]
+    assert roles[0][1] == [(10, 2), (10, 3), (11, 2)]
+    assert fake_db.statements("UPDATE catalog_versions")
+    assert fake_db.commits >= 1
+
+
+def test_unsupported_upload_type_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.bulk_import_users(upload_request(b"{}", "application/json"), format=None, current_user=ADMIN))
+    assert error.value.status_code == 415
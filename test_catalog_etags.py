@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import Response
+from starlette.requests import Request
+
+import main
+from catalog_versions import CatalogVersions, bump, if_none_match
+
+VERSIONS = [("roles", 3), ("permissions", 1), ("user_roles", 7)]
+
+
+def get_request(if_none_match_header=None):
+    headers = [(b"if-none-match", if_none_match_header.encode())] if if_none_match_header else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+@pytest.fixture
+def versions(fake_db, monkeypatch):
+    versions = CatalogVersions(ttl=60)
+    monkeypatch.setattr("catalog_versions.catalog_versions", versions)
+
+    def handler(sql, params):
+        if "FROM catalog_versions" in sql:
+            return VERSIONS
+        if "FROM permissions" in sql:
+            return [(1, "users.read", "Read users", "", "users", "read", datetime(2024, 1, 1))]
+        return []
+
+    fake_db.handler = handler
+    return versions
+
+
+def test_etag_is_built_from_the_catalog_versions(versions):
+    assert versions.etag("permissions") == '"permissions-1"'
+    assert versions.etag("user_roles", "roles") == '"user_roles-7.roles-3"'
+    # Cached until invalidated
+    versions.etag("roles")
+    assert versions.loads == 1
+    versions.invalidate()
+    versions.etag("roles")
+    assert versions.loads == 2
+
+
+def test_if_none_match_parsing():
+    assert if_none_match(None) == set()
+    assert if_none_match('"a-1", "b-2"') == {'"a-1"', '"b-2"'}
+
+
+def test_first_request_gets_the_etag(versions, fake_db):
+    response = Response()
+    result = asyncio.run(main.get_permissions(skip=0, limit=100, request=get_request(), response=response))
+
+    assert response.headers["etag"] == '"permissions-1"'
+    assert response.headers["cache-control"] == "no-cache"
+    assert fake_db.statements("FROM permissions")
+    assert not isinstance(result, Response)
+
+
+def test_matching_if_none_match_is_answered_without_queries(versions, fake_db):
+    versions.etag("permissions")
+    fake_db.queries.clear()
+
+    result = asyncio.run(main.get_permissions(
+        skip=0, limit=100, request=get_request('"other", "permissions-1"'), response=Response()
+    ))
+
+    assert result.status_code == 304
+    assert result.headers["etag"] == '"permissions-1"'
+    assert fake_db.queries == []
+
+
+def test_stale_etag_gets_a_full_response(versions, fake_db):
+    response = Response()
+    result = asyncio.run(main.get_user_roles(1, request=get_request('"user_roles-6.roles-3.permissions-1"'),
+                                             response=response))
+
+    assert result == []
+    assert response.headers["etag"] == '"user_roles-7.roles-3.permissions-1"'
+
+
+def test_bump_updates_every_named_catalog(fake_db):
+    with main.get_db_connection() as conn:
+        bump(conn.cursor(), "roles", "user_roles")
+
+    sql, params = fake_db.queries[-1]
+    assert "UPDATE catalog_versions SET version = version + 1" in sql
+    assert params == ("roles", "user_roles")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import asyncio
+import gzip
+import zlib
+
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+
+from compression import CompressionMiddleware, negotiate
+
+BODY = "audit log row\n" * 500
+
+
+def call(app, accept_encoding="gzip"):
+    """Run one GET through the middleware; returns (status, headers, body)"""
+    messages = []
+    scope = {
+        "type": "http", "method": "GET", "path": "/", "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else [],
+    }
+
+    async def receive():
+        # No request body to read; the client stays connected until the response ends
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=1024)(scope, receive, send))
+    start = messages[0]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    return start["status"], headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+def test_negotiation():
+    assert negotiate("gzip, deflate, br") == "gzip"
+    assert negotiate("deflate") == "deflate"
+    assert negotiate("gzip;q=0, deflate;q=0.5") == "deflate"
+    assert negotiate("br") is None
+    assert negotiate(None) is None
+
+
+def test_large_responses_are_compressed():
+    status, headers, body = call(PlainTextResponse(BODY))
+    assert headers["content-encoding"] == "gzip"
+    assert headers["content-length"] == str(len(body))
+    assert headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(body).decode() == BODY
+
+    _, headers, body = call(PlainTextResponse(BODY), accept_encoding="deflate")
+    assert headers["content-encoding"] == "deflate"
+    assert zlib.decompress(body).decode() == BODY
+
+
+def test_small_and_unaccepted_responses_pass_through():
+    _, headers, body = call(PlainTextResponse("ok"))
+    assert "content-encoding" not in headers and body == b"ok"
+
+    _, headers, body = call(PlainTextResponse(BODY), accept_encoding=None)
+    assert "content-encoding" not in headers and body == BODY.encode()
+
+
+def test_streaming_responses_are_compressed_chunk_by_chunk():
+    async def chunks():
+        for _ in range(5):
+            yield BODY
+
+    _, headers, body = call(StreamingResponse(chunks(), media_type="text/csv"))
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert gzip.decompress(body).decode() == BODY * 5
+
+
+def test_gzip_exports_and_event_streams_are_not_recompressed():
+    exported = gzip.compress(BODY.encode())
+    _, headers, body = call(Response(exported * 10, media_type="application/gzip"))
+    assert "content-encoding" not in headers and body == exported * 10
+
+    async def events():
+        yield "data: " + BODY + "\n\n"
+
+    _, headers, body = call(StreamingResponse(events(), media_type="text/event-stream"))
+    assert "content-encoding" not in headers and body.decode() == "data: " + BODY + "\n\n"
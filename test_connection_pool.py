@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import threading
+import time
+
+import pytest
+
+from database import ConnectionPool, PoolTimeoutError
+
+
+def make_pool(**kwargs):
+    options = {"min_size": 0, "max_size": 2, "timeout": 1.0, "recycle": 0, "pre_ping": False}
+    options.update(kwargs)
+    return ConnectionPool("DRIVER={fake}", **options)
+
+
+def test_connections_are_reused(fake_db):
+    pool = make_pool()
+
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+    pool.release(second)
+
+    assert first is second
+    assert len(fake_db.connections) == 1
+    stats = pool.stats()
+    assert stats["borrows"] == 2
+    assert stats["created"] == 1
+    assert stats["in_use"] == 0 and stats["idle"] == 1
+
+
+def test_borrow_times_out_when_pool_is_exhausted(fake_db):
+    pool = make_pool(max_size=1)
+    held = pool.acquire()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+
+    pool.release(held)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_waiting_borrower_gets_released_connection(fake_db):
+    pool = make_pool(max_size=1)
+    held = pool.acquire()
+    borrowed = []
+
+    def borrow():
+        borrowed.append(pool.acquire(timeout=2.0))
+
+    waiter = threading.Thread(target=borrow)
+    waiter.start()
+    time.sleep(0.05)
+    pool.release(held)
+    waiter.join(timeout=2.0)
+
+    assert borrowed == [held]
+    stats = pool.stats()
+    assert stats["waits"] == 1
+    assert stats["max_wait_ms"] >= 40
+
+
+def test_release_resets_session_state(fake_db):
+    pool = make_pool()
+    conn = pool.acquire()
+    conn.autocommit = True
+    conn.timeout = 15
+
+    pool.release(conn)
+
+    assert conn.rollbacks == 1
+    assert conn.autocommit is False
+    assert conn.timeout == 0
+
+
+def test_old_connections_are_recycled(fake_db):
+    pool = make_pool(recycle=0.01)
+    first = pool.acquire()
+    pool.release(first)
+    time.sleep(0.02)
+
+    second = pool.acquire()
+
+    assert second is not first
+    assert first.closed
+    assert pool.stats()["recycled"] >= 1
+
+
+def test_pre_ping_replaces_dead_connections(fake_db):
+    pool = make_pool(pre_ping=True, ping_interval=0)
+    first = pool.acquire()
+    pool.release(first)
+    first.broken = True
+
+    second = pool.acquire()
+
+    assert second is not first
+    assert pool.stats()["discarded"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_broken_connection_is_discarded_on_release(fake_db):
+    pool = make_pool()
+    conn = pool.acquire()
+    conn.broken = True
+
+    pool.release(conn)
+
+    assert pool.stats()["size"] == 0
+    assert pool.stats()["discarded"] == 1
+
+
+def test_warm_opens_min_size_connections(fake_db):
+    pool = make_pool(min_size=2, max_size=4)
+
+    pool.warm()
+
+    assert len(fake_db.connections) == 2
+    assert pool.stats()["idle"] == 2
+    pool.close()
+    assert all(conn.closed for conn in fake_db.connections)
+
+
+def test_connections_borrowed_across_close_are_closed_on_release(fake_db):
+    pool = make_pool()
+    borrowed = pool.acquire()
+
+    pool.close()
+    pool.release(borrowed)
+
+    assert borrowed.closed
+    assert pool.stats()["size"] == 0 and pool.stats()["idle"] == 0
+
+    pool.warm()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert not conn.closed and pool.stats()["idle"] == 1
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+from conftest import ResultSets
+from dashboard_summary import DashboardSummaryCache
+
+
+def summary_handler(sql, params):
+    if "sys.partitions" in sql:
+        hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+        return ResultSets([(5, 3)], [(120,)], [(hour, 4), (hour - timedelta(hours=30), 6)])
+    return []
+
+
+@pytest.fixture
+def summary_cache(fake_db, monkeypatch):
+    fake_db.handler = summary_handler
+    cache = DashboardSummaryCache()
+    monkeypatch.setattr(main, "dashboard_summary", cache)
+    return cache
+
+
+def test_summary_is_seeded_once_and_served_from_memory(summary_cache, fake_db):
+    for _ in range(3):
+        summary = asyncio.run(main.get_dashboard_summary())
+
+    assert (summary.total_users, summary.active_users) == (5, 3)
+    assert (summary.total_logs, summary.recent_logs) == (120, 10)
+    assert summary.last_updated == summary_cache.last_reconciled
+    assert len(fake_db.statements("sys.partitions")) == 1
+
+
+def test_write_hooks_keep_counters_current(summary_cache):
+    summary_cache.reconcile()
+
+    summary_cache.user_created(is_active=True)
+    summary_cache.user_created(is_active=False)
+    summary_cache.user_deleted(was_active=True)
+    summary_cache.user_activation_changed(is_active=True)
+    summary_cache.logs_written(2)
+
+    summary = summary_cache.summary()
+    assert (summary["total_users"], summary["active_users"]) == (6, 4)
+    assert (summary["total_logs"], summary["recent_logs"]) == (122, 12)
+
+
+def test_recent_logs_drop_out_of_the_window(summary_cache):
+    summary_cache.reconcile()
+    summary_cache.logs_written(7, at=datetime.now() - timedelta(days=8))
+
+    summary = summary_cache.summary()
+    assert summary["total_logs"] == 127
+    assert summary["recent_logs"] == 10
+
+
+def test_invalidate_forces_a_reload(summary_cache, fake_db):
+    asyncio.run(main.get_dashboard_summary())
+    summary_cache.logs_written(50)
+    summary_cache.invalidate()
+
+    summary = asyncio.run(main.get_dashboard_summary())
+    assert summary.total_logs == 120
+    assert len(fake_db.statements("sys.partitions")) == 2
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from pagination import decode_cursor, encode_cursor, seek_after
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def log_row(log_id, timestamp=None):
+    timestamp = timestamp or NOW - timedelta(minutes=log_id)
+    return (log_id, 1, "admin", "login", "auth", "", "127.0.0.1", "", str(timestamp), "success",
+            "info", "", "", "auth", "", "", timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp)
+
+
+def logs_handler(total):
+    rows = [log_row(log_id) for log_id in range(total, 0, -1)]
+
+    def handler(sql, params):
+        if "FROM audit2_logs" not in sql:
+            return []
+        fetch = params[-1]
+        if "audit2_logs.id <" in sql:
+            last_id = params[-2]
+            return [row for row in rows if row[0] < last_id][:fetch]
+        return rows[:fetch]
+    return handler
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(NOW, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [NOW.isoformat(), 42]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(1, 2, 3)])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, 2)
+
+    assert excinfo.value.status_code == 400
+
+
+def test_seek_after_expands_row_comparison():
+    sql, params = seek_after(["timestamp", "id"], ["2024-01-01", 7], descending=True)
+
+    assert sql == "timestamp <= ? AND (timestamp < ? OR (id < ?))"
+    assert params == ["2024-01-01", "2024-01-01", 7]
+
+
+def test_logs_pages_by_seek_instead_of_offset(fake_db):
+    fake_db.handler = logs_handler(25)
+
+    def page(cursor):
+        return asyncio.run(main.get_logs(
+            skip=0, limit=10, severity=None, action=None, username=None,
+            module=None, days=30, status=None, page_cursor=cursor
+        ))
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        result = page(cursor)
+        seen.extend(log["id"] for log in result["items"])
+        cursor = result["next_cursor"]
+
+    assert seen == list(range(25, 0, -1))
+    log_queries = fake_db.statements("FROM audit2_logs")
+    assert len(log_queries) == 3
+    assert all("OFFSET 0 ROWS" in sql for sql in log_queries)
+
+
+def test_logs_page_through_equal_sub_second_timestamps(fake_db):
+    # datetime2 keeps 100ns; the cursor has to carry all of it or rows sharing it are skipped
+    timestamp = "2024-01-01T10:00:00.1234567"
+    rows = [log_row(log_id, timestamp) for log_id in range(5, 0, -1)]
+    seeks = []
+
+    def handler(sql, params):
+        if "FROM audit2_logs" not in sql:
+            return []
+        if "audit2_logs.id <" in sql:
+            seeks.append(params[-4:-1])
+            return [row for row in rows if row[0] < params[-2]][:params[-1]]
+        return rows[:params[-1]]
+
+    fake_db.handler = handler
+    seen, cursor = [], ""
+    while cursor is not None:
+        result = asyncio.run(main.get_logs(
+            skip=0, limit=2, severity=None, action=None, username=None,
+            module=None, days=30, status=None, page_cursor=cursor
+        ))
+        seen.extend(log["id"] for log in result["items"])
+        cursor = result["next_cursor"]
+
+    assert seen == [5, 4, 3, 2, 1]
+    assert seeks == [(timestamp, timestamp, 4), (timestamp, timestamp, 2)]
+    assert "CONVERT(VARCHAR(27), timestamp, 126)" in fake_db.statements("FROM audit2_logs")[0]
+
+
+def test_logs_bad_cursor_is_a_client_error(fake_db):
+    fake_db.handler = logs_handler(5)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.get_logs(
+            skip=0, limit=10, severity=None, action=None, username=None,
+            module=None, days=30, status=None, page_cursor="garbage"
+        ))
+
+    assert excinfo.value.status_code == 400
+
+
+def test_roles_keyset_page_returns_next_cursor(fake_db):
+    rows = [(role_id, f"role_{role_id}", f"Role {role_id:02d}", None, True, NOW, NOW) for role_id in range(1, 6)]
+    fake_db.handler = lambda sql, params: rows[:params[-1]] if "FROM roles" in sql else []
+
+    page = asyncio.run(main.get_roles(skip=0, limit=3, active_only=True, page_cursor=""))
+
+    assert [role.id for role in page.items] == [1, 2, 3]
+    assert decode_cursor(page.next_cursor, 2) == ["Role 03", 3]
+    role_sql, role_params = fake_db.queries[0]
+    assert "ORDER BY display_name, id" in role_sql
+    assert role_params[-1] == 4
+
+
+def test_offset_mode_is_unchanged_without_cursor(fake_db):
+    fake_db.handler = lambda sql, params: []
+
+    users = asyncio.run(main.get_users(skip=20, limit=10, active_only=False))
+
+    assert users == []
+    user_sql, user_params = fake_db.queries[0]
+    assert "ORDER BY created_at DESC OFFSET ? ROWS" in user_sql
+    assert list(user_params) == [20, 10]
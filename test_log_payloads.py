@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from test_keyset_pagination import log_row
+
+
+def list_logs(**kwargs):
+    params = dict(
+        skip=0, limit=10, severity=None, action=None, username=None,
+        module=None, days=30, status=None
+    )
+    params.update(kwargs)
+    return asyncio.run(main.get_logs(**params))
+
+
+def test_list_skips_payload_columns_by_default(fake_db):
+    list_logs()
+
+    sql = fake_db.statements("FROM audit2_logs")[-1]
+    assert "NULL as before_data, NULL as after_data" in sql
+    assert "COALESCE(before_data" not in sql
+
+
+def test_list_reads_payloads_when_asked(fake_db):
+    list_logs(include_payloads=True)
+
+    assert "COALESCE(before_data, '')" in fake_db.statements("FROM audit2_logs")[-1]
+
+
+def test_single_entry_includes_payloads(fake_db):
+    fake_db.handler = lambda sql, params: [log_row(params[0])] if "WHERE id = ?" in sql else []
+
+    entry = asyncio.run(main.get_log(42))
+
+    assert entry["id"] == 42
+    assert "before_data" in entry and "after_data" in entry
+    assert fake_db.statements("FROM audit2_logs_all")
+
+
+def test_missing_entry_is_404(fake_db):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.get_log(42))
+
+    assert error.value.status_code == 404
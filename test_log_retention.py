@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime
+
+import log_retention
+import main
+from log_retention import Partition, apply_retention, log_source, month_start, plan_retention
+
+NOW = datetime(2024, 6, 15, 10, 30)
+
+
+def monthly_partitions(first, counts):
+    """Partitions ending at each month from `first`, with (rows, archived_rows) counts"""
+    return [
+        Partition(number, month_start(first, number), rows, archived)
+        for number, (rows, archived) in enumerate(counts, start=1)
+    ]
+
+
+def test_month_arithmetic_crosses_years():
+    assert month_start(NOW) == datetime(2024, 6, 1)
+    assert month_start(NOW, 7) == datetime(2025, 1, 1)
+    assert month_start(NOW, -6) == datetime(2023, 12, 1)
+
+
+def test_future_months_are_split_ahead():
+    partitions = monthly_partitions(datetime(2024, 4, 1), [(0, 0), (5, 0), (9, 0)])
+
+    plan = plan_retention(partitions, NOW, retention_months=12, months_ahead=3)
+
+    assert partitions[-1].upper_bound == datetime(2024, 7, 1)
+    assert plan.split == [datetime(2024, 8, 1), datetime(2024, 9, 1)]
+    assert plan.switch == plan.truncate == plan.merge == []
+
+
+def test_old_months_are_switched_to_the_archive():
+    # Partitions 1..5 end Feb..Jun 2024
+    partitions = monthly_partitions(datetime(2024, 1, 1), [(3, 0), (0, 0), (4, 0), (6, 2), (7, 0)])
+
+    plan = plan_retention(partitions, NOW, retention_months=3, archive_retention_months=0)
+
+    # Partitions 1 and 2 end by the March cutoff, and 2 has nothing to move
+    assert plan.switch == [1]
+    assert plan.truncate == plan.merge == []
+
+
+def test_expired_archive_months_are_truncated_and_merged():
+    partitions = monthly_partitions(datetime(2023, 12, 1), [(0, 0), (0, 8), (0, 4), (2, 5), (9, 0)])
+
+    plan = plan_retention(partitions, NOW, retention_months=2, archive_retention_months=3)
+
+    assert plan.truncate == [2, 3]
+    assert plan.merge == [datetime(2024, 1, 1), datetime(2024, 2, 1)]
+
+
+def test_long_windows_read_through_the_archive_view(fake_db):
+    assert log_source(log_retention.HOT_DAYS) == "audit2_logs"
+    assert log_source(log_retention.HOT_DAYS + 1) == "audit2_logs_all"
+
+    asyncio.run(main.get_logs(
+        skip=0, limit=10, severity=None, action=None, username=None,
+        module=None, days=log_retention.HOT_DAYS + 1, status=None
+    ))
+    assert fake_db.statements("FROM audit2_logs_all AS audit2_logs")
+
+
+def test_retention_pass_issues_partition_ddl(fake_db, monkeypatch):
+    monkeypatch.setattr(log_retention, "LOG_RETENTION_MONTHS", 3)
+    partitions = monthly_partitions(datetime(2024, 1, 1), [(3, 0), (4, 0), (5, 0), (6, 0), (7, 0), (0, 0)])
+
+    def handler(sql, params):
+        if "sp_getapplock" in sql:
+            return [(0,)]
+        if sql == "SELECT GETDATE()":
+            return [(NOW,)]
+        if "FROM sys.partitions" in sql:
+            return [tuple(partition) for partition in partitions]
+        return []
+
+    fake_db.handler = handler
+    plan = apply_retention()
+
+    assert plan.switch == [1, 2]
+    assert fake_db.statements("SWITCH PARTITION 2 TO audit2_logs_archive PARTITION 2")
+    assert fake_db.statements("SPLIT RANGE ('2024-09-01')")
+    assert fake_db.commits == 1
+    assert len(fake_db.statements("sp_releaseapplock")) == 1
+
+
+def test_truncated_months_take_their_tokens_and_rollups_along(fake_db, monkeypatch):
+    monkeypatch.setattr(log_retention, "LOG_RETENTION_MONTHS", 2)
+    monkeypatch.setattr(log_retention, "LOG_ARCHIVE_RETENTION_MONTHS", 3)
+    # Partitions 1..5 end Jan..May 2024; 2 and 3 hold expired archived months
+    partitions = monthly_partitions(datetime(2023, 12, 1), [(0, 0), (0, 8), (0, 4), (2, 5), (9, 0)])
+    id_ranges = {2: (100, 180), 3: (181, 240)}
+
+    def handler(sql, params):
+        if "sp_getapplock" in sql:
+            return [(0,)]
+        if sql == "SELECT GETDATE()":
+            return [(NOW,)]
+        if "FROM sys.partitions" in sql:
+            return [tuple(partition) for partition in partitions]
+        if "$PARTITION.pf_audit_monthly" in sql:
+            return [id_ranges[params[0]]]
+        return []
+
+    fake_db.handler = handler
+    plan = apply_retention()
+
+    assert plan.truncate == [2, 3]
+    tokens = [params for sql, params in fake_db.queries if "DELETE t FROM audit_log_tokens" in sql]
+    assert tokens == [(100, 180), (181, 240)]
+    rollups = [params for sql, params in fake_db.queries if "DELETE FROM audit_log_rollup_hourly" in sql]
+    assert rollups == [
+        (datetime(2024, 1, 1), datetime(2024, 2, 1)) * 2,
+        (datetime(2024, 2, 1), datetime(2024, 3, 1)) * 2,
+    ]
+    # Each month's derived rows are deleted right after it is truncated, in the same transaction
+    statements = [sql for sql, _ in fake_db.queries]
+    truncate = statements.index(fake_db.statements("TRUNCATE TABLE audit2_logs_archive WITH (PARTITIONS (2))")[0])
+    assert "audit_log_tokens" in statements[truncate + 1] and "audit_log_rollup" in statements[truncate + 2]
+    assert fake_db.commits == 1
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime
+
+import log_rollups
+import main
+from conftest import ResultSets
+from log_rollups import plan_slices, roll_up_logs, stats_query
+
+
+def test_slices_cover_the_window_without_gaps_or_overlap():
+    start = datetime(2024, 1, 1, 10, 30)
+    end = datetime(2024, 1, 5, 14, 20)
+    slices = plan_slices(start, end, rolled_up_until=datetime(2024, 1, 5, 13))
+
+    assert slices["raw"] == [(start, datetime(2024, 1, 1, 11)), (datetime(2024, 1, 5, 13), end)]
+    assert slices["hourly"] == [
+        (datetime(2024, 1, 1, 11), datetime(2024, 1, 2)),
+        (datetime(2024, 1, 5), datetime(2024, 1, 5, 13)),
+    ]
+    assert slices["daily"] == [(datetime(2024, 1, 2), datetime(2024, 1, 5))]
+
+
+def test_short_windows_use_hourly_rollups_only():
+    slices = plan_slices(datetime(2024, 1, 5, 2, 15), datetime(2024, 1, 5, 9, 10), datetime(2024, 1, 5, 9))
+
+    assert slices["daily"] == []
+    assert slices["hourly"] == [(datetime(2024, 1, 5, 3), datetime(2024, 1, 5, 9))]
+
+
+def test_raw_rows_are_read_until_rollups_exist():
+    start, end = datetime(2024, 1, 1, 10, 30), datetime(2024, 1, 5, 14, 20)
+
+    assert plan_slices(start, end, None) == {"raw": [(start, end)], "hourly": [], "daily": []}
+    assert plan_slices(start, end, datetime(2023, 12, 1))["raw"] == [(start, end)]
+
+
+def test_stats_query_unions_one_select_per_slice():
+    slices = plan_slices(datetime(2024, 1, 1, 10, 30), datetime(2024, 1, 5, 14, 20), datetime(2024, 1, 5, 13))
+    query, params = stats_query(slices)
+
+    assert query.count("UNION ALL") == 4
+    assert len(params) == 10
+    assert query.count("FROM audit2_logs") == 2
+
+
+def test_stats_endpoint_reads_the_batched_result_sets(fake_db):
+    def handler(sql, params):
+        if "FROM audit_log_rollup_state" in sql:
+            return [(datetime(2024, 1, 5, 14, 20), datetime(2024, 1, 5, 13))]
+        if "#log_stats" in sql:
+            return ResultSets(
+                [(42, 1, 2, 3, 4, 32, 40, 2, 5, 3)],
+                [("user_login", 30)],
+                [("admin", 25)],
+                [("2024-01-05", 12, 1)],
+            )
+        return []
+
+    fake_db.handler = handler
+    stats = asyncio.run(main.get_log_stats(days=30))
+
+    assert stats["total_logs"] == 42
+    assert stats["severity_breakdown"]["info"] == 32
+    assert stats["top_actions"] == [{"action": "user_login", "count": 30}]
+    assert stats["daily_activity"] == [{"date": "2024-01-05", "count": 12, "critical_count": 1}]
+    assert len(fake_db.statements("#log_stats")) == 1
+
+
+def test_roll_up_advances_in_chunks_and_rolls_completed_days(fake_db, monkeypatch):
+    monkeypatch.setattr(log_rollups, "LOG_ROLLUP_GRACE", 300)
+    monkeypatch.setattr(log_rollups, "LOG_ROLLUP_CHUNK_HOURS", 24)
+
+    def handler(sql, params):
+        if "sp_getapplock" in sql:
+            return [(0,)]
+        if "SELECT rolled_up_through_id" in sql:
+            return [(120,)]
+        if "FROM audit_log_rollup_state" in sql:
+            return [(datetime(2024, 1, 3, 6, 10), datetime(2024, 1, 1, 20))]
+        if "MAX(id)" in sql:
+            return [(120,)]
+        return []
+
+    fake_db.handler = handler
+    assert roll_up_logs() == 34
+
+    hourly = [params for sql, params in fake_db.queries if "INSERT INTO audit_log_rollup_hourly" in sql]
+    daily = [params for sql, params in fake_db.queries if "INSERT INTO audit_log_rollup_daily" in sql]
+    assert hourly == [
+        (datetime(2024, 1, 1, 20), datetime(2024, 1, 2, 20)),
+        (datetime(2024, 1, 2, 20), datetime(2024, 1, 3, 6)),
+    ]
+    assert daily == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 2)),
+        (datetime(2024, 1, 2), datetime(2024, 1, 3)),
+    ]
+    assert len(fake_db.statements("sp_releaseapplock")) == 1
+    assert fake_db.statements("DELETE FROM audit_log_rollup_hourly") == []
+
+
+def test_hours_that_receive_late_logs_are_rolled_up_again(fake_db):
+    def handler(sql, params):
+        if "sp_getapplock" in sql:
+            return [(0,)]
+        if "SELECT rolled_up_through_id" in sql:
+            return [(100,)]
+        if "FROM audit_log_rollup_state" in sql:
+            return [(datetime(2024, 1, 3, 6, 10), datetime(2024, 1, 3, 6))]
+        if "MAX(id)" in sql:
+            return [(130,)]
+        if "SELECT DISTINCT" in sql:
+            # A backdated import, and a flush that missed the grace period
+            return [(datetime(2024, 1, 1, 23),), (datetime(2024, 1, 1, 22),), (datetime(2024, 1, 3, 2),)]
+        return []
+
+    fake_db.handler = handler
+    assert roll_up_logs() == 3
+
+    assert [params for sql, params in fake_db.queries if "SELECT DISTINCT" in sql] == [
+        (100, 130, datetime(2024, 1, 3, 6)),
+    ]
+    hourly = [params for sql, params in fake_db.queries if "audit_log_rollup_hourly WHERE bucket >= ?" in sql]
+    assert hourly == [
+        (datetime(2024, 1, 1, 22), datetime(2024, 1, 2)),
+        (datetime(2024, 1, 3, 2), datetime(2024, 1, 3, 3)),
+    ]
+    assert [params for sql, params in fake_db.queries if "INSERT INTO audit_log_rollup_hourly" in sql] == hourly
+    # Only the complete day goes back into the daily rollup
+    assert [params for sql, params in fake_db.queries if "INSERT INTO audit_log_rollup_daily" in sql] == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 2)),
+    ]
+    state, = [params for sql, params in fake_db.queries if "SET rolled_up_through_id" in sql]
+    assert state == (130, "audit2_logs")
+    assert fake_db.commits
+
+
+def test_roll_up_skips_while_another_worker_holds_the_lock(fake_db):
+    fake_db.handler = lambda sql, params: [(-1,)] if "sp_getapplock" in sql else []
+
+    assert roll_up_logs() == 0
+    assert fake_db.statements("INSERT INTO audit_log_rollup_hourly") == []
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime, timedelta
+
+import log_search
+import main
+from log_search import index_logs, log_tokens, substring_condition, text_search_conditions
+
+
+def test_tokens_are_trigrams_of_every_field():
+    tokens = log_tokens(7, "Login", "al", "Relogin ok")
+
+    assert {token for field, token, _ in tokens if field == "a"} == {"log", "ogi", "gin"}
+    assert not [token for field, token, _ in tokens if field == "u"]
+    assert {token for field, token, _ in tokens if field == "d"} == {
+        "rel", "elo", "log", "ogi", "gin", "in ", "n o", " ok"
+    }
+    assert {log_id for _, _, log_id in tokens} == {7}
+
+
+def test_substring_filter_is_narrowed_by_trigrams():
+    sql, params = substring_condition("action", "a", "Login")
+
+    assert sql.startswith("action LIKE ?")
+    assert "audit_log_tokens" in sql
+    assert params == ["%Login%", "a", "gin", "log", "ogi", 3]
+
+
+def test_short_terms_fall_back_to_like():
+    assert substring_condition("username", "u", "al") == ("username LIKE ? ESCAPE '\\'", ["%al%"])
+
+
+def test_like_wildcards_in_terms_match_literally():
+    # Indexed rows are narrowed by the literal trigrams, so the LIKE has to be literal too
+    sql, params = substring_condition("action", "a", "a_b")
+    assert "action LIKE ? ESCAPE '\\'" in sql
+    assert params[:2] == ["%a\\_b%", "a"] and "a_b" in params
+
+    conditions, params = text_search_conditions("100% [x]")
+    assert conditions[0].count("ESCAPE '\\'") == 3
+    assert params[:3] == ["%100\\%%"] * 3
+    assert params.count("%\\[x]%") == 3 and ("d", "[x]", 1) == tuple(params[-3:])
+
+
+def test_free_text_terms_must_all_match():
+    conditions, params = text_search_conditions("failed ad")
+
+    assert len(conditions) == 2
+    assert conditions[0].count("FROM audit_log_tokens") == 3 and "audit_log_tokens" not in conditions[1]
+    assert params[:3] == ["%failed%"] * 3
+    # details is narrowed by the term's trigrams too, so substrings of words still match
+    grams = ["ail", "fai", "ile", "led"]
+    assert params[3:21] == ["a", *grams, 4, "u", *grams, 4, "d", *grams, 4]
+    assert params[-3:] == ["%ad%"] * 3
+
+
+def test_get_logs_applies_search_conditions(fake_db):
+    asyncio.run(main.get_logs(
+        skip=0, limit=10, severity=None, action="login", username=None,
+        module=None, days=30, status=None, q="failed"
+    ))
+
+    sql = fake_db.statements("FROM audit2_logs")[-1]
+    assert sql.count("FROM audit_log_tokens") == 4
+    assert "indexed_through_id" in sql
+
+
+def test_indexer_stops_at_rows_inside_the_grace_period(fake_db, monkeypatch):
+    monkeypatch.setattr(log_search, "SEARCH_INDEX_BATCH_SIZE", 10)
+    cutoff = datetime(2024, 1, 1, 12)
+    rows = [
+        (1, cutoff - timedelta(minutes=5), "user_login", "admin", "Signed in"),
+        (2, cutoff - timedelta(minutes=1), "logout", None, None),
+        (3, cutoff + timedelta(seconds=1), "user_login", "bob", "Signed in"),
+        (4, cutoff - timedelta(minutes=2), "user_login", "eve", "Signed in"),
+    ]
+    state = {"through": 0}
+
+    def handler(sql, params):
+        if "sp_getapplock" in sql:
+            return [(0,)]
+        if sql.startswith("SELECT (SELECT COALESCE(MAX(indexed_through_id)"):
+            return [(state["through"], cutoff)]
+        if "FROM audit2_logs" in sql:
+            return [row for row in rows if row[0] > params[1]][:params[0]]
+        if "UPDATE audit_log_search_state" in sql:
+            state["through"] = params[0]
+        return []
+
+    fake_db.handler = handler
+    assert index_logs() == 2
+    assert state["through"] == 2
+
+    (sql, tokens, fast), = fake_db.executemany_calls
+    assert fast
+    assert {log_id for _, _, log_id in tokens} == {1, 2}
+    assert ("u", "adm", 1) in tokens and ("d", "sig", 1) in tokens
+    assert len(fake_db.statements("sp_releaseapplock")) == 1
+
+
+def test_indexer_prunes_tokens_of_purged_logs(fake_db, monkeypatch):
+    monkeypatch.setattr(log_search, "SEARCH_INDEX_BATCH_SIZE", 2)
+    deleted = [2, 2, 1]
+
+    def handler(sql, params):
+        if "sp_getapplock" in sql:
+            return [(0,)]
+        if sql.startswith("SELECT (SELECT COALESCE(MAX(indexed_through_id)"):
+            return [(40, datetime(2024, 1, 1))]
+        if "DELETE TOP" in sql:
+            return [None] * deleted.pop(0)
+        return []
+
+    fake_db.handler = handler
+    index_logs()
+
+    prunes = [params for sql, params in fake_db.queries if "DELETE TOP" in sql]
+    assert prunes == [(2, 41)] * 3
+    assert "MIN(id) FROM audit2_logs_all" in fake_db.statements("DELETE TOP")[0]
+
+
+def test_indexer_reaches_logs_already_switched_to_the_archive(fake_db):
+    # Retention moved ids 1 and 2 into audit2_logs_archive before they were indexed
+    archived = [
+        (1, datetime(2023, 1, 5), "user_login", "admin", "Signed in"),
+        (2, datetime(2023, 1, 6), "export_logs", "bob", None),
+    ]
+
+    def handler(sql, params):
+        if "sp_getapplock" in sql:
+            return [(0,)]
+        if sql.startswith("SELECT (SELECT COALESCE(MAX(indexed_through_id)"):
+            return [(0, datetime(2024, 1, 1))]
+        if "FROM audit2_logs_all" in sql and "TOP (?)" in sql:
+            return [row for row in archived if row[0] > params[1]]
+        return []
+
+    fake_db.handler = handler
+    assert index_logs() == 2
+
+    (_, tokens, _), = fake_db.executemany_calls
+    # Both archived logs hold the trigrams an action or username search narrows to
+    assert {("a", "log", 1), ("u", "bob", 2)} <= set(tokens)
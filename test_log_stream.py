@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import threading
+
+from starlette.requests import Request
+
+import main
+from audit_writer import AuditWriter
+from log_stream import LogFilter, LogStreamBroker, event_stream
+
+
+def row(log_id, action="update_user", username="admin", severity="info", module="users", status="success"):
+    return (log_id, 1, username, action, "users", None, None, None, "2024-01-01 10:00:00.0000000",
+            status, severity, "", "", module)
+
+
+def events(chunks):
+    """The logs carried by SSE chunks, skipping retry and heartbeat lines"""
+    return [json.loads(chunk.split(b"data: ", 1)[1]) for chunk in chunks if chunk.startswith(b"id: ")]
+
+
+def test_filters_match_like_the_log_queries():
+    log_filter = LogFilter(severity="high", action="LOGIN", username="ad")
+    entry = dict(zip(["id", "action", "username", "severity", "module", "status"],
+                     [1, "failed_login", "Admin", "high", "auth", "failed"]))
+
+    assert log_filter.matches(entry)
+    assert not log_filter.matches({**entry, "severity": "info"})
+    assert not LogFilter(module="users").matches(entry)
+
+
+def test_live_entries_are_filtered_and_slow_clients_are_cut_off():
+    broker = LogStreamBroker(queue_size=3)
+
+    async def follow():
+        subscription = broker.subscribe(LogFilter(severity="high"))
+        stream = event_stream(broker, subscription, backlog=[], heartbeat=0.01)
+        assert await stream.__anext__() == b"retry: 3000\n\n"
+
+        # Writers publish from their own threads
+        writer = threading.Thread(target=broker.publish, args=([row(3, severity="high"), row(2), row(1, severity="high")],))
+        writer.start()
+        writer.join()
+        received = [await stream.__anext__() for _ in range(3)]
+        assert received[2] == b": heartbeat\n\n"
+        assert [entry["id"] for entry in events(received)] == [1, 3]
+
+        # A client that does not keep up loses its queue and its stream ends
+        broker.publish([row(n, severity="high") for n in range(10, 20)])
+        await asyncio.sleep(0)
+        rest = [chunk async for chunk in stream]
+        assert events(rest) == []
+        return subscription
+
+    subscription = asyncio.run(follow())
+    assert subscription.closed
+    assert broker.stats() == {"subscribers": 0, "published": 13, "overflows": 1}
+
+
+def test_reconnect_catches_up_from_last_event_id(fake_db):
+    def handler(sql, params):
+        if "WHERE id > ?" in sql:
+            return [row(6), row(7)]
+        return []
+
+    fake_db.handler = handler
+    request = Request({"type": "http", "method": "GET", "path": "/api/logs/stream", "query_string": b"",
+                       "headers": [(b"last-event-id", b"5")]})
+
+    async def reconnect():
+        response = await main.stream_logs(request, action="user")
+        stream = response.body_iterator
+        chunks = [await stream.__anext__() for _ in range(3)]
+        main.log_stream.publish([row(7), row(8), row(9, action="login")])
+        chunks.append(await stream.__anext__())
+        # Committed after 8; ids are not a commit order
+        main.log_stream.publish([row(4)])
+        chunks.append(await stream.__anext__())
+        await stream.aclose()
+        return response, chunks
+
+    response, chunks = asyncio.run(reconnect())
+
+    assert response.media_type == "text/event-stream"
+    assert [entry["id"] for entry in events(chunks)] == [6, 7, 8, 4]
+    assert chunks[1].startswith(b"id: 6\n")
+    (sql, params), = [(sql, params) for sql, params in fake_db.queries if "WHERE id > ?" in sql]
+    assert params[0] == 5 and params[-1] == main.LOG_STREAM_CATCHUP_LIMIT
+    assert not main.log_stream.listening
+
+
+def test_writes_publish_their_rows_only_while_someone_listens(fake_db, monkeypatch):
+    broker = LogStreamBroker()
+    published = []
+    monkeypatch.setattr(broker, "publish", published.extend)
+    monkeypatch.setattr(main, "log_stream", broker)
+    monkeypatch.setattr("audit_writer.log_stream", broker)
+    fake_db.handler = lambda sql, params: [row(42)] if "OUTPUT INSERTED.id" in sql else []
+
+    with main.get_db_connection() as conn:
+        main.log_activity(conn=conn, username="admin", action="update_user", resource="users")
+    assert published == [] and not fake_db.statements("OUTPUT INSERTED.id")
+
+    async def listen():
+        broker.subscribe(LogFilter())
+        with main.get_db_connection() as conn:
+            main.log_activity(conn=conn, username="admin", action="update_user", resource="users")
+
+        writer = AuditWriter(enabled=True, batch_size=10, flush_interval=5.0)
+        writer.start()
+        writer.enqueue((1, "admin", "export_logs", "logs", None, "info", "logs", None, None, "success"))
+        writer.stop()
+
+    asyncio.run(listen())
+
+    assert published == [row(42), row(42)]
+    batch_sql, = fake_db.statements("OPENJSON")
+    assert "OUTPUT INSERTED.id" in batch_sql
+    assert fake_db.executemany_calls == []
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import asyncio
+
+import pytest
+
+import main
+from test_password_hashing import NOW, PASSWORD, fast_bcrypt, login_handler
+
+
+@pytest.fixture
+def warm_rbac(fake_db):
+    fake_db.handler = login_handler(None)
+    main.rbac.invalidate()
+    main.rbac.snapshot()
+    fake_db.reset()
+
+
+def test_login_builds_response_from_batched_read(fake_db, fast_bcrypt, warm_rbac):
+    fake_db.handler = login_handler(fast_bcrypt.hash(PASSWORD))
+
+    response = asyncio.run(main.login(main.LoginRequest(username="admin", password=PASSWORD)))
+
+    assert response.user.username == "admin"
+    assert response.user.last_login == NOW
+    assert [role.name for role in response.user.roles] == ["admin"]
+    # One batched read, the last_login UPDATE and the audit INSERT; no re-read of the user
+    assert len(fake_db.queries) == 3
+    assert not fake_db.statements("FROM users WHERE id = ?")
+
+
+def test_roles_of_other_matching_users_are_ignored(fake_db, fast_bcrypt, warm_rbac):
+    base = login_handler(fast_bcrypt.hash(PASSWORD))
+
+    def handler(sql, params):
+        result = base(sql, params)
+        if "WHERE username = ? OR email = ?" in sql:
+            result.sets[1].append((2, 5, "viewer", "Viewer", None, True, NOW, NOW))
+        return result
+    fake_db.handler = handler
+
+    response = asyncio.run(main.login(main.LoginRequest(username="admin", password=PASSWORD)))
+
+    assert [role.id for role in response.user.roles] == [1]
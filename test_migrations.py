@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import os
+
+from migrations import discover_migrations, run_migrations, split_batches
+
+
+def write_migration(directory, filename, sql):
+    with open(os.path.join(directory, filename), "w") as f:
+        f.write(sql)
+
+
+def versioned_handler(state):
+    def handler(sql, params):
+        if "SELECT COALESCE(MAX(version), 0)" in sql:
+            return [(state["version"],)]
+        if sql.startswith("INSERT INTO schema_version"):
+            state["version"] = params[0]
+        return []
+    return handler
+
+
+def test_shipped_migrations_are_ordered_and_split():
+    shipped = discover_migrations()
+
+    assert [m.version for m in shipped] == sorted(m.version for m in shipped)
+    assert shipped[0].name == "initial_schema"
+    for migration in shipped:
+        with open(migration.path) as f:
+            batches = split_batches(f.read())
+        assert batches
+        assert not any(line.strip().upper() == "GO" for batch in batches for line in batch.splitlines())
+
+
+def test_split_batches_on_go_lines_only():
+    script = "CREATE TABLE a (go_live INT)\nGO\n\nSELECT 'GO'\n  go  \n"
+
+    assert split_batches(script) == ["CREATE TABLE a (go_live INT)", "SELECT 'GO'"]
+
+
+def test_current_schema_is_a_single_query(fake_db, tmp_path):
+    write_migration(tmp_path, "0001_first.sql", "CREATE TABLE a (id INT)\nGO\n")
+    write_migration(tmp_path, "0002_second.sql", "CREATE TABLE b (id INT)\nGO\n")
+    fake_db.handler = versioned_handler({"version": 2})
+
+    result = run_migrations(str(tmp_path))
+
+    assert result["status"] == "success"
+    assert len(fake_db.queries) == 1
+
+
+def test_pending_migrations_are_applied_in_order(fake_db, tmp_path):
+    write_migration(tmp_path, "0002_second.sql", "CREATE TABLE b (id INT)\nGO\nCREATE INDEX ix ON b (id)\nGO\n")
+    write_migration(tmp_path, "0001_first.sql", "CREATE TABLE a (id INT)\n")
+    write_migration(tmp_path, "0003_third.sql", "CREATE TABLE c (id INT)\n")
+    write_migration(tmp_path, "README.txt", "not a migration")
+    state = {"version": 1}
+    fake_db.handler = versioned_handler(state)
+
+    result = run_migrations(str(tmp_path))
+
+    assert result["status"] == "success"
+    assert state["version"] == 3
+    executed = [sql for sql, _ in fake_db.queries]
+    assert "CREATE TABLE a (id INT)" not in executed
+    assert executed.index("CREATE TABLE b (id INT)") < executed.index("CREATE INDEX ix ON b (id)")
+    assert executed.index("CREATE INDEX ix ON b (id)") < executed.index("CREATE TABLE c (id INT)")
+    assert len(fake_db.statements("sp_getapplock")) == 1
+    assert len(fake_db.statements("sp_releaseapplock")) == 1
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+from passlib.context import CryptContext
+
+import auth
+import main
+from conftest import ResultSets
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+PASSWORD = "correct horse"
+
+# Cheap enough for tests, slow enough that a burst would be visible on the loop
+TEST_ROUNDS = 8
+
+
+@pytest.fixture
+def fast_bcrypt(monkeypatch):
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=TEST_ROUNDS)
+    monkeypatch.setattr(auth, "pwd_context", context)
+    return context
+
+
+def login_handler(password_hash):
+    def handler(sql, params):
+        if "WHERE username = ? OR email = ?" in sql:
+            return ResultSets(
+                [(1, "admin", "admin@example.com", "Admin", password_hash, True, 0, None, NOW)],
+                [(1, 1, "admin", "Administrator", None, True, NOW, NOW)]
+            )
+        if "OUTPUT INSERTED.failed_login_attempts" in sql:
+            return [(1,)]
+        if "OUTPUT INSERTED.last_login" in sql:
+            return [(NOW,)]
+        if "FROM role_permissions" in sql and "FROM user_roles" in sql:
+            return ResultSets([], [], [], [])
+        return []
+    return handler
+
+
+def login(client, password=PASSWORD):
+    return client.post("/api/auth/login", json={"username": "admin", "password": password})
+
+
+def test_login_burst_does_not_delay_other_requests(fake_db, fast_bcrypt):
+    fake_db.handler = login_handler(fast_bcrypt.hash(PASSWORD))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.perf_counter()
+            burst = [asyncio.create_task(login(client)) for _ in range(40)]
+            await asyncio.sleep(0.01)
+
+            health_started = time.perf_counter()
+            health = await client.get("/api/health")
+            health_elapsed = time.perf_counter() - health_started
+
+            responses = await asyncio.gather(*burst)
+            return responses, health, health_elapsed, time.perf_counter() - started
+
+    responses, health, health_elapsed, burst_elapsed = asyncio.run(scenario())
+
+    assert all(response.status_code == 200 for response in responses)
+    assert health.status_code == 200
+    # The health check is served while the hashes are still queued on the password executor
+    assert health_elapsed < burst_elapsed / 4
+
+
+def test_login_rehashes_outdated_cost(fake_db, fast_bcrypt):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=TEST_ROUNDS - 2).hash(PASSWORD)
+    fake_db.handler = login_handler(old_hash)
+
+    response = asyncio.run(main.login(main.LoginRequest(username="admin", password=PASSWORD)))
+
+    assert response.access_token
+    (sql, params), = [(sql, params) for sql, params in fake_db.queries if "last_login = GETDATE()" in sql]
+    new_hash = params[0]
+    assert new_hash.startswith(f"$2b${TEST_ROUNDS:02d}$")
+    assert fast_bcrypt.verify(PASSWORD, new_hash)
+
+
+def test_current_cost_is_not_rehashed(fake_db, fast_bcrypt):
+    fake_db.handler = login_handler(fast_bcrypt.hash(PASSWORD))
+
+    asyncio.run(main.login(main.LoginRequest(username="admin", password=PASSWORD)))
+
+    (sql, params), = [(sql, params) for sql, params in fake_db.queries if "last_login = GETDATE()" in sql]
+    assert params[0] is None
+
+
+def test_wrong_password_increments_attempts_atomically(fake_db, fast_bcrypt):
+    fake_db.handler = login_handler(fast_bcrypt.hash(PASSWORD))
+
+    with pytest.raises(main.HTTPException) as excinfo:
+        asyncio.run(main.login(main.LoginRequest(username="admin", password="wrong")))
+
+    assert excinfo.value.status_code == 401
+    assert fake_db.statements("COALESCE(failed_login_attempts, 0) + 1")
+    assert not fake_db.statements("last_login = GETDATE()")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import asyncio
+
+import pytest
+
+import main
+from auth import create_refresh_token
+from conftest import ResultSets
+from models import PermissionCheck
+from rbac import RBACCache, RBACSnapshot
+
+ROLES = [(1, "admin", True), (2, "viewer", True), (3, "legacy", False)]
+PERMISSIONS = [
+    (10, "users.read", "users", "read"),
+    (11, "users.write", "users", "write"),
+    (12, "logs.read", "logs", "read"),
+]
+ROLE_PERMISSIONS = [(1, 10), (1, 11), (1, 12), (2, 10), (3, 12)]
+USER_ROLES = [(100, 2), (100, 3), (200, 1)]
+
+
+def rbac_handler(sql, params):
+    if "FROM role_permissions" in sql and "FROM user_roles" in sql:
+        return ResultSets(ROLES, PERMISSIONS, ROLE_PERMISSIONS, USER_ROLES)
+    return []
+
+
+@pytest.fixture
+def rbac_cache(fake_db, monkeypatch):
+    fake_db.handler = rbac_handler
+    cache = RBACCache(ttl=60)
+    monkeypatch.setattr(main, "rbac", cache)
+    return cache
+
+
+def test_snapshot_resolves_permissions_through_roles():
+    snapshot = RBACSnapshot(ROLES, PERMISSIONS, ROLE_PERMISSIONS, USER_ROLES)
+
+    assert snapshot.user_permissions(200) == ["users.read", "users.write", "logs.read"]
+    # Inactive roles still count for tokens, as the old join did
+    assert snapshot.user_permissions(100) == ["users.read", "logs.read"]
+    assert snapshot.user_permissions(999) == []
+
+
+def test_permission_check_ignores_inactive_roles():
+    snapshot = RBACSnapshot(ROLES, PERMISSIONS, ROLE_PERMISSIONS, USER_ROLES)
+
+    assert snapshot.check(100, "users", "read") == (["viewer"], ["users.read"])
+    assert snapshot.check(100, "logs", "read") == ([], [])
+    assert snapshot.check(200, "logs", "read") == (["admin"], ["logs.read"])
+
+
+def test_snapshot_is_loaded_once_until_invalidated(rbac_cache, fake_db):
+    for _ in range(3):
+        result = asyncio.run(main.check_user_permission(PermissionCheck(user_id=200, resource="users", action="write")))
+        assert result.has_permission
+
+    assert rbac_cache.loads == 1
+    assert len(fake_db.statements("FROM user_roles")) == 1
+
+    rbac_cache.invalidate()
+    asyncio.run(main.check_user_permission(PermissionCheck(user_id=200, resource="users", action="write")))
+    assert rbac_cache.loads == 2
+
+
+def test_refresh_token_uses_snapshot_without_queries(rbac_cache, fake_db):
+    rbac_cache.snapshot()
+    fake_db.reset()
+    fake_db.handler = rbac_handler
+    token = create_refresh_token({"sub": "200", "username": "admin"})
+
+    response = asyncio.run(main.refresh_token(main.RefreshTokenRequest(refresh_token=token)))
+
+    assert response["access_token"]
+    assert fake_db.queries == []
+
+
+def test_role_assignment_invalidates_snapshot(rbac_cache, fake_db):
+    rbac_cache.snapshot()
+    fake_db.handler = lambda sql, params: [("bob", "Bob")] if "FROM users WHERE id" in sql else rbac_handler(sql, params)
+
+    asyncio.run(main.assign_roles_to_user(
+        200, main.UserRoleAssign(user_id=200, role_ids=[2]), current_user={"id": 1, "username": "admin"}
+    ))
+    rbac_cache.snapshot()
+
+    assert rbac_cache.loads == 2
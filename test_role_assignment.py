@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+from datetime import datetime
+
+import main
+
+ADMIN = {"id": 1, "sub": "1", "username": "admin"}
+
+
+def assignment_handler(current_ids):
+    def handler(sql, params):
+        if "FROM roles WHERE id" in sql:
+            return [("editor", "Editor")]
+        if "FROM users WHERE id" in sql:
+            return [("bob", "Bob")]
+        if "WITH (UPDLOCK, HOLDLOCK)" in sql:
+            return [(member_id,) for member_id in current_ids]
+        return []
+    return handler
+
+
+def writes(fake_db, table):
+    return [(sql, params) for sql, params in fake_db.queries
+            if table in sql and ("DELETE" in sql or "INSERT" in sql)]
+
+
+def test_only_the_difference_is_written(fake_db):
+    fake_db.handler = assignment_handler([1, 2, 3])
+
+    result = asyncio.run(main.assign_permissions_to_role(
+        5, main.RolePermissionAssign(role_id=5, permission_ids=[2, 3, 4, 4, 6]), current_user=ADMIN
+    ))
+
+    assert (result["added"], result["removed"]) == ([4, 6], [1])
+    (delete_sql, delete_params), (insert_sql, insert_params) = writes(fake_db, "role_permissions")
+    assert delete_sql.strip().startswith("DELETE") and (delete_params[0], json.loads(delete_params[1])) == (5, [1])
+    assert insert_sql.strip().startswith("INSERT") and (insert_params[0], json.loads(insert_params[1])) == (5, [4, 6])
+
+    log = [params for sql, params in fake_db.queries if "INSERT INTO audit2_logs" in sql][0]
+    assert "Removed permissions: [1]" in log and "Added permissions: [4, 6]" in log
+
+
+def test_unchanged_assignment_is_a_no_op(fake_db):
+    fake_db.handler = assignment_handler([3, 2])
+
+    result = asyncio.run(main.assign_roles_to_user(
+        7, main.UserRoleAssign(user_id=7, role_ids=[2, 3]), current_user=ADMIN
+    ))
+
+    assert (result["added"], result["removed"]) == ([], [])
+    assert writes(fake_db, "user_roles") == []
+    assert not fake_db.statements("INSERT INTO audit2_logs")
+    assert not fake_db.statements("UPDATE catalog_versions")
+
+
+def test_user_update_syncs_roles_by_difference(fake_db):
+    def handler(sql, params):
+        if "SELECT username, email, full_name, is_active FROM users" in sql:
+            return [("bob", "bob@example.com", "Bob", True)]
+        if "SELECT id, username, email, full_name, is_active, created_at, last_login" in sql:
+            return [(7, "bob", "bob@example.com", "Bob", True, datetime(2024, 1, 1), None)]
+        return assignment_handler([1, 2])(sql, params)
+
+    fake_db.handler = handler
+    asyncio.run(main.update_user(7, main.UserUpdate(role_ids=[2, 5]), current_user=ADMIN))
+
+    (_, delete_params), (_, insert_params) = writes(fake_db, "user_roles")
+    assert json.loads(delete_params[1]) == [1] and json.loads(insert_params[1]) == [5]
+    log = [params for sql, params in fake_db.queries if "INSERT INTO audit2_logs" in sql][0]
+    assert any("roles added: [5], roles removed: [1]" in str(value) for value in log)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+from auth import VerifiedTokenCache, create_access_token, create_refresh_token, verify_token
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    auth.verified_tokens.clear()
+    yield
+    auth.verified_tokens.clear()
+
+
+def test_repeat_verification_skips_signature_check(monkeypatch):
+    token = create_access_token({"sub": "1", "username": "admin"})
+    calls = []
+    original_decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: calls.append(1) or original_decode(*args, **kwargs))
+
+    for _ in range(5):
+        assert verify_token(token)["username"] == "admin"
+
+    assert len(calls) == 1
+
+
+def test_cached_token_still_checks_type():
+    token = create_refresh_token({"sub": "1", "username": "admin"})
+
+    assert verify_token(token, "refresh") is not None
+    assert verify_token(token, "access") is None
+
+
+def test_expired_entries_are_not_served():
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put("old", {"exp": 1, "type": "access"})
+
+    assert cache.get("old") is None
+
+
+def test_cache_is_bounded_lru():
+    cache = VerifiedTokenCache(max_size=2)
+    payload = {"exp": 2 ** 40}
+    cache.put("a", payload)
+    cache.put("b", payload)
+    cache.get("a")
+    cache.put("c", payload)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is payload
+    assert cache.get("c") is payload
+
+
+def test_invalid_token_is_rejected_without_output(capsys):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="not.a.token")
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(auth.get_current_user(credentials))
+
+    assert excinfo.value.status_code == 401
+    assert capsys.readouterr().out == ""
+
+
+def test_expired_token_is_rejected():
+    token = create_access_token({"sub": "1", "username": "admin"}, expires_delta=timedelta(seconds=-1))
+
+    assert verify_token(token) is None
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+
+import main
+from auth import get_current_active_user
+from conftest import ResultSets
+from database import UnitOfWork, after_commit, connection_pool, current_unit_of_work
+from rbac import RBACCache
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def users_handler(sql, params):
+    if "SELECT username, email, full_name, is_active FROM users WHERE id = ?" in sql:
+        return [("bob", "bob@example.com", "Bob", True)]
+    if "FROM users WHERE id = ?" in sql:
+        return [(7, "bob", "bob@example.com", "Robert", True, NOW, None)]
+    if "FROM role_permissions" in sql and "FROM user_roles" in sql:
+        return ResultSets([], [], [], [])
+    return []
+
+
+@pytest.fixture
+def client(fake_db):
+    main.app.dependency_overrides[get_current_active_user] = lambda: {"id": 1, "sub": "1", "username": "admin"}
+
+    def request(method, url, **kwargs):
+        async def scenario():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await http.request(method, url, **kwargs)
+        return asyncio.run(scenario())
+
+    yield request
+    main.app.dependency_overrides.clear()
+
+
+def test_nested_loader_shares_the_request_connection(fake_db, client):
+    fake_db.handler = users_handler
+    borrows = connection_pool.stats()["borrows"]
+
+    response = client("PUT", "/api/users/7", json={"full_name": "Robert"})
+
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Robert"
+    # update_user and the load_user it calls ran on one connection, committed once
+    assert connection_pool.stats()["borrows"] - borrows == 1
+    assert fake_db.commits == 1
+    assert connection_pool.stats()["in_use"] == 0
+
+
+def test_failed_request_is_rolled_back(fake_db, client):
+    fake_db.handler = lambda sql, params: []
+
+    response = client("GET", "/api/users/404")
+
+    assert response.status_code == 500
+    assert fake_db.commits == 0
+    assert connection_pool.stats()["in_use"] == 0
+
+
+def test_requested_commit_survives_error_response(fake_db, client):
+    fake_db.handler = lambda sql, params: []
+
+    response = client("POST", "/api/auth/login", json={"username": "ghost", "password": "x"})
+
+    # The failed-login audit row is committed even though the request returns 401
+    assert response.status_code == 401
+    assert fake_db.statements("INSERT INTO audit2_logs")
+    assert fake_db.commits == 1
+
+
+def test_after_commit_callbacks_run_only_on_commit(fake_db):
+    calls = []
+
+    def work(success):
+        uow = UnitOfWork()
+        token = current_unit_of_work.set(uow)
+        try:
+            with main.get_db_connection() as conn:
+                conn.cursor().execute("UPDATE users SET is_active = 1")
+                conn.commit()
+            after_commit(lambda: calls.append(success))
+            assert success not in calls
+        finally:
+            current_unit_of_work.reset(token)
+        uow.commit_requested = success
+        uow.finish(success)
+
+    work(True)
+    work(False)
+
+    assert calls == [True]
+
+
+def test_after_commit_runs_immediately_outside_a_request():
+    calls = []
+
+    after_commit(lambda: calls.append(1))
+
+    assert calls == [1]
+
+
+def test_role_update_returns_permissions_from_its_own_transaction(fake_db, client, monkeypatch):
+    cache = RBACCache()
+    monkeypatch.setattr(main, "rbac", cache)
+    roles = [(1, "viewer", True), (2, "admin", True)]
+    permissions = [(10, "users.read", "users", "read"), (20, "admin.all", "admin", "all")]
+    role_permissions = [(1, 10), (2, 20)]
+    assigned = [(7, 1)]
+
+    def handler(sql, params):
+        if "FROM role_permissions" in sql and "FROM user_roles" in sql:
+            return ResultSets(roles, permissions, role_permissions, list(assigned))
+        if "WITH (UPDLOCK, HOLDLOCK)" in sql:
+            return [(1,)]
+        if "INSERT INTO user_roles" in sql:
+            assigned.append((7, 2))
+        return users_handler(sql, params)
+
+    fake_db.handler = handler
+    stale = cache.snapshot()
+
+    response = client("PUT", "/api/users/7", json={"role_ids": [1, 2]})
+
+    assert response.status_code == 200
+    assert response.json()["permissions"] == ["users.read", "admin.all"]
+    # The uncommitted read was not cached; the commit invalidated the old snapshot
+    assert cache.loads == 1 and cache._snapshot is stale
+    assert cache.snapshot().user_permissions(7) == ["users.read", "admin.all"]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import main
+from conftest import ResultSets
+from user_index import UserEntry, UserSearchIndex
+
+USERS = [
+    UserEntry(1, "jdoe", "john.doe@example.com", "John Doe", "Engineering", True),
+    UserEntry(2, "johnny", "johnny@example.com", "Johnny Smith", "Sales", True),
+    UserEntry(3, "asmith", "anna@example.com", "Anna Smith", "Engineering", False),
+    UserEntry(4, "bjohnson", "bj@example.com", "Bob Johnson", None, True),
+]
+
+
+@pytest.fixture
+def index(fake_db, monkeypatch):
+    index = UserSearchIndex()
+    index.build(USERS)
+    monkeypatch.setattr(main, "user_index", index)
+    return index
+
+
+def ids(entries):
+    return [entry.id for entry in entries]
+
+
+def test_matches_are_ranked_by_match_kind_and_field(index):
+    # Prefix matches (ties ordered by name) before Bob Johnson's word prefix
+    assert ids(index.search("john")) == [1, 2, 4]
+    assert ids(index.search("JOHNNY")) == [2]
+    assert ids(index.search("mith")) == [3, 2]
+
+
+def test_short_queries_match_word_prefixes_only(index):
+    assert ids(index.search("sm")) == [3, 2]
+    assert ids(index.search("oh")) == []
+
+
+def test_incremental_updates(index):
+    index.add(5, "zed", "zed@example.com", "Zed Johnston")
+    index.update(2, full_name="Johnny Walker", username=None)
+    index.remove(1)
+
+    assert ids(index.search("johns")) == [4, 5]
+    assert ids(index.search("walk")) == [2]
+    assert index.get(2).username == "johnny"
+    assert ids(index.search("doe")) == []
+
+
+def test_update_of_unknown_user_forces_a_reload(index):
+    assert index.fresh
+    index.update(99, full_name="Somebody")
+    assert not index.fresh
+
+
+def test_search_endpoint_hydrates_only_the_ranked_page(index, fake_db):
+    def handler(sql, params):
+        if "FROM users u WHERE u.id IN" in sql:
+            return [
+                (user_id, "u", "e", "n", True, datetime(2024, 1, 1), None, "Engineering", "Dev", "")
+                for user_id in params
+            ]
+        if "FROM role_permissions" in sql:
+            return ResultSets([(1, "admin", True)], [], [], [(1, 1), (4, 1)])
+        return []
+
+    fake_db.handler = handler
+    users = asyncio.run(main.search_all_users(
+        query="john", role="admin", status="active", department=None, skip=0, limit=1
+    ))
+
+    assert [user["id"] for user in users] == [1]
+    assert fake_db.statements("LIKE") == []
+    hydrate = [params for sql, params in fake_db.queries if "WHERE u.id IN" in sql]
+    assert hydrate == [(1,)]
+
+
+def test_suggest_uses_no_queries(index, fake_db):
+    suggestions = asyncio.run(main.suggest_users(query="smi", limit=5))
+
+    assert [s["username"] for s in suggestions] == ["asmith", "johnny"]
+    assert fake_db.queries == []